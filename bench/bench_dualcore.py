@@ -0,0 +1,174 @@
+#
+# UI responsiveness during a full-band seek: one core against the core 1 radio engine
+#
+# Copyright (c) 2025 ha864git
+#
+# License: MIT
+#
+# Runs on the emulator with host time and a bus that takes the modelled 100 kHz
+# transfer time of every transaction (time.sleep, so the other thread can run,
+# as the other core would). The band has no station, so the seek sweeps all
+# channels. A 10 ms UI ticker task measures how late it is woken while the seek
+# runs and a display task shows the frequency every 100 ms; the bus time spent
+# on core 0 (the UI thread) is counted:
+#
+#   blocking    radio.seek_up() on core 0, the original main loops
+#   async       start_seek() + tuner.wait() on core 0 (radioapp)
+#   dual        start_seek() + tuner.wait() on core 0, the bus on the engine thread
+#
+#   python bench/bench_dualcore.py [--step-ms 2]
+#
+import argparse
+import os
+import sys
+import time as host_time
+import _thread
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+
+import emulator
+from emulator.clock import Clock
+
+board = emulator.install(Clock())
+
+try:
+    import uasyncio as asyncio
+except ImportError:
+    import asyncio
+
+import i2cbus
+import oledview
+import radioengine
+import radioRDA5807
+import ssd1306
+import time
+from machine import I2C
+
+BUS_KHZ = 100
+TICK_MS = 10
+
+class TimedI2C:
+
+    """ I2C proxy taking the bus time of every transaction, counts the time spent by the UI thread """
+
+    def __init__(self, i2c, ui_thread):
+        self.i2c = i2c
+        self.ui_thread = ui_thread
+        self.ui_us = 0
+        self.ui_transactions = 0
+
+    def wait(self, nbytes):
+        us = ((nbytes + 1) * 9 + 2) * 1000 // BUS_KHZ
+        if _thread.get_ident() == self.ui_thread:
+            self.ui_us += us
+            self.ui_transactions += 1
+        host_time.sleep(us / 1000000)
+
+    def scan(self):
+        self.wait(0)
+        return self.i2c.scan()
+
+    def writeto(self, addr, buf, stop=True):
+        self.wait(len(buf))
+        return self.i2c.writeto(addr, buf, stop)
+
+    def writevto(self, addr, vector, stop=True):
+        self.wait(sum(len(b) for b in vector))
+        return self.i2c.writevto(addr, vector, stop)
+
+    def readfrom_into(self, addr, buf, stop=True):
+        self.wait(len(buf))
+        return self.i2c.readfrom_into(addr, buf, stop)
+
+    def readfrom_mem_into(self, addr, memaddr, buf, addrsize=8):
+        self.wait(len(buf) + 1)
+        return self.i2c.readfrom_mem_into(addr, memaddr, buf, addrsize)
+
+    def writeto_mem(self, addr, memaddr, buf, addrsize=8):
+        self.wait(len(buf) + 1)
+        return self.i2c.writeto_mem(addr, memaddr, buf, addrsize)
+
+async def display(radio, view, done):
+    view.add_field('tune', 0, 16)
+    while not done:
+        view.set_text('tune', radioRDA5807.format_khz(radio.read_status_block().khz) + 'MHz')
+        view.flush()
+        await asyncio.sleep(0.1)
+
+async def ticker(lateness, done):
+    while not done:
+        t = time.ticks_ms()
+        await asyncio.sleep(TICK_MS / 1000)
+        lateness.append(time.ticks_diff(time.ticks_ms(), t) - TICK_MS)
+
+def run(mode):
+    timed = TimedI2C(I2C(0), _thread.get_ident())
+    bus = i2cbus.BusManager(timed)
+    engine = None
+    if mode == 'dual':
+        engine = radioengine.RadioEngine(bus)
+        engine.start()
+        radio_i2c = engine.i2c()
+    else:
+        radio_i2c = bus.client(i2cbus.PRIO_TUNER, defer=True, pulse=radioRDA5807.is_pulse_write)
+    oled = ssd1306.SSD1306_I2C(128, 64, bus.client(i2cbus.PRIO_DISPLAY, defer=True, chunk=128))
+    radio = radioRDA5807.RadioRDA5807(radio_i2c)
+    radio.set_channel(0)
+    bus.flush()
+    lateness = []
+    done = []
+    result = {}
+
+    async def seek():
+        timed.ui_us = 0
+        timed.ui_transactions = 0
+        t = time.ticks_ms()
+        if mode == 'blocking':
+            await asyncio.sleep(0)
+            radio.seek_up()
+        else:
+            radio.tuner.start_seek(radioRDA5807.SEEK_UP)
+            await radio.tuner.wait()
+        result['seek_ms'] = time.ticks_diff(time.ticks_ms(), t)
+        result['ui_bus_ms'] = timed.ui_us // 1000
+        result['ui_transactions'] = timed.ui_transactions
+        done.append(True)
+
+    async def pump():
+        # the bus task of radioapp, on core 0 unless the engine pumps
+        while not done:
+            while bus.pump():
+                await asyncio.sleep(0)
+            await asyncio.sleep(0.005)
+
+    async def main():
+        tasks = [ticker(lateness, done), seek(), display(radio, oledview.OledView(oled), done)]
+        if engine is None:
+            tasks.append(pump())
+        await asyncio.gather(*tasks)
+
+    asyncio.run(main())
+    if engine is not None:
+        engine.stop()
+    result['ticks'] = len(lateness)
+    result['late_max_ms'] = max(lateness)
+    result['late_avg_ms'] = sum(lateness) / len(lateness)
+    return result
+
+def main():
+    parser = argparse.ArgumentParser(description='UI lateness during a full-band seek, single core and dual core')
+    parser.add_argument('--step-ms', type=int, default=2, help='emulated seek time per channel')
+    args = parser.parse_args()
+    board.radio.seek_step_us = args.step_ms * 1000
+
+    print('{:10s} {:>8s} {:>6s} {:>9s} {:>9s} {:>11s} {:>8s}'.format(
+        'mode', 'seek_ms', 'ticks', 'late_max', 'late_avg', 'core0_trans', 'core0_ms'))
+    for mode in ('blocking', 'async', 'dual'):
+        r = run(mode)
+        print('{:10s} {:8d} {:6d} {:9d} {:9.1f} {:11d} {:8d}'.format(
+            mode, r['seek_ms'], r['ticks'], r['late_max_ms'], r['late_avg_ms'], r['ui_transactions'], r['ui_bus_ms']))
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,315 @@
+#
+# I2C cost of every radio operation and main loop iteration, on the emulator
+#
+# Copyright (c) 2025 ha864git
+#
+# License: MIT
+#
+# The tuner and the OLED share I2C(0), so every transaction a hot path adds
+# delays the other device. Each operation is run through MeterI2C, which counts
+# transactions and bytes and models the bus time at 100 and 400 kHz.
+#
+#   python bench/bench_i2c.py                       table + check against bench/budgets.json
+#   python bench/bench_i2c.py --json out.json       also write the results
+#   python bench/bench_i2c.py --update              write the results as the new budgets
+#
+# Exits with 1 when an operation uses more transactions or bytes than its budget,
+# or when a check of the bus scheduler fails.
+#
+import argparse
+import json
+import os
+import sys
+import tempfile
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+sys.path.insert(0, os.path.join(os.path.dirname(HERE), 'picow'))
+
+import emulator
+from emulator.clock import Clock
+
+board = emulator.install(Clock(virtual=True))
+
+import bandscan
+import ble_simple_peripheral
+import bluetooth
+import button
+import i2cbus
+import radioapp
+import radioRDA5807
+import rds
+import siglog
+import sigmon
+import ssd1306
+import stationdb
+from machine import I2C
+from radioRDA5807b import radioRDA5807b
+
+BUDGETS_FILE = os.path.join(HERE, 'budgets.json')
+BUS_KHZ = (100, 400)
+
+class MeterI2C:
+
+    """ I2C proxy counting transactions, bytes and the modelled bus time """
+
+    def __init__(self, i2c):
+        self.i2c = i2c
+        self.reset()
+
+    def reset(self):
+        self.transactions = 0
+        self.bytes = 0
+        self.clocks = 0                     # SCL clocks: start, address + data bytes of 9 clocks, stop
+
+    def count(self, nbytes):
+        self.transactions += 1
+        self.bytes += nbytes
+        self.clocks += (nbytes + 1) * 9 + 2
+
+    def bus_us(self, khz):
+        return self.clocks * 1000 // khz
+
+    def scan(self):
+        self.count(0)
+        return self.i2c.scan()
+
+    def writeto(self, addr, buf, stop=True):
+        self.count(len(buf))
+        return self.i2c.writeto(addr, buf, stop)
+
+    def writevto(self, addr, vector, stop=True):
+        self.count(sum(len(b) for b in vector))
+        return self.i2c.writevto(addr, vector, stop)
+
+    def readfrom(self, addr, nbytes, stop=True):
+        self.count(nbytes)
+        return self.i2c.readfrom(addr, nbytes, stop)
+
+    def readfrom_into(self, addr, buf, stop=True):
+        self.count(len(buf))
+        return self.i2c.readfrom_into(addr, buf, stop)
+
+    def readfrom_mem(self, addr, memaddr, nbytes, addrsize=8):
+        self.count(1)
+        self.count(nbytes)
+        return self.i2c.readfrom_mem(addr, memaddr, nbytes, addrsize)
+
+    def readfrom_mem_into(self, addr, memaddr, buf, addrsize=8):
+        self.count(1)
+        self.count(len(buf))
+        return self.i2c.readfrom_mem_into(addr, memaddr, buf, addrsize)
+
+    def writeto_mem(self, addr, memaddr, buf, addrsize=8):
+        self.count(len(buf) + 1)
+        return self.i2c.writeto_mem(addr, memaddr, buf, addrsize)
+
+def measure(meter, function, results, name):
+    meter.reset()
+    function()
+    result = {'transactions': meter.transactions, 'bytes': meter.bytes}
+    for khz in BUS_KHZ:
+        result['bus_us_%dk' % khz] = meter.bus_us(khz)
+    results[name] = result
+
+def bench_operations(results):
+
+    """ Every public RadioRDA5807 operation from a settled state """
+
+    meter = MeterI2C(I2C(0))
+    measure(meter, lambda: radioRDA5807.RadioRDA5807(meter), results, 'radio.__init__')
+    radio = radioRDA5807b(meter)
+    radio.set_frequency_MHz(80.0)
+    operations = [
+        ('apply_profile', lambda: radio.apply_profile(radio.profile)),
+        ('set_frequency_MHz', lambda: radio.set_frequency_MHz(81.3)),
+        ('get_frequency_MHz', radio.get_frequency_MHz),
+        ('set_volume', lambda: radio.set_volume(7)),
+        ('get_volume', radio.get_volume),
+        ('mute', lambda: radio.mute(True)),
+        ('bass_boost', lambda: radio.bass_boost(True)),
+        ('mono', lambda: radio.mono(True)),
+        ('seek_up', radio.seek_up),
+        ('seek_down', radio.seek_down),
+        ('get_signal_strength', radio.get_signal_strength),
+        ('read_status_block', radio.read_status_block),
+        ('update_reg', lambda: radio.update_reg(radioRDA5807.RDA5807M_REG_VOLUME, 0x000f, 5)),
+        ('read_reg', lambda: radio.read_reg(radioRDA5807.RDA5807M_REG_CHIPID)),
+        ('write_reg', lambda: radio.write_reg(radioRDA5807.RDA5807M_REG_VOLUME, radio.read_reg_cached(radioRDA5807.RDA5807M_REG_VOLUME))),
+        ('read_regs', lambda: radio.read_regs(0, bytearray(32))),
+        ('get_status', radio.get_status),
+        ('set_frequency_khz', lambda: radio.set_frequency_khz(81500)),
+        ('get_frequency_khz', radio.get_frequency_khz),
+        ('set_channel', lambda: radio.set_channel(50)),
+        ('get_channel', radio.get_channel),
+    ]
+    for name, function in operations:
+        measure(meter, function, results, 'radio.' + name)
+
+def make_app(ble):
+    i2c = MeterI2C(I2C(0))
+    bus = i2cbus.BusManager(i2c)
+    oled = ssd1306.SSD1306_I2C(128, 64, bus.client(i2cbus.PRIO_DISPLAY, defer=True, chunk=128))
+    stations = stationdb.StationDB(os.path.join(os.path.dirname(HERE), 'pico', stationdb.STATIONS_FILE))
+    profile = radioRDA5807.RadioProfile(band=stations.band, space=stations.space, volume=3, mono=True, bass=True, rds=True)
+    radio = radioRDA5807b(bus.client(i2cbus.PRIO_TUNER, defer=True, pulse=radioRDA5807.is_pulse_write), profile=profile)
+    buttons = button.ButtonDriver()
+    commands = [
+        (buttons.add(21, repeat=True), radioapp.CMD_VOLUME_UP),
+        (buttons.add(20, repeat=True), radioapp.CMD_VOLUME_DOWN),
+        (buttons.add(19), radioapp.CMD_SEEK_UP),
+        (buttons.add(18), radioapp.CMD_NEXT_STATION),
+    ]
+    index = bandscan.ChannelIndex(profile.band, profile.space)
+    p = None
+    if ble:
+        p = ble_simple_peripheral.BLESimplePeripheral(bluetooth.BLE())
+        p.connect()
+    app = radioapp.RadioApp(radio, oled, commands, stations, ble=p, button_driver=buttons,
+                            navigator=bandscan.StationNavigator(radio, index),
+                            rds_poller=rds.RDSPoller(radio, rds.RDSDecoder(), i2c=bus.client(i2cbus.PRIO_RDS)),
+                            monitor=sigmon.SignalMonitor(radio), bus=bus,
+                            # every monitor sample is logged, its records must cost no bus transaction
+                            signal_log=siglog.SignalLog(os.path.join(tempfile.mkdtemp(), siglog.LOG_FILE),
+                                                        profile.band, profile.space, interval_ms=0))
+    app.view.clear()
+    app.tune_channel(stations.channels[0])
+    app.radio.tuner.run()                   # what the tuner task does
+    return app, i2c
+
+def iteration(app):
+
+    """ One pass over every task of the app, what the event loop does in one tick """
+
+    app.poll_input()
+    cmd = app.commands.get_nowait()
+    while cmd is not None:
+        app.execute(cmd)
+        cmd = app.commands.get_nowait()
+    app.radio.tuner.run()
+    app.poll_status()
+    if not app.radio.tuner.busy():
+        app.rds_poller.poll()
+    if app.display_event.is_set():
+        app.display_event.clear()
+        app.render()
+    if app.ble is not None and app.ble_status_event.is_set():
+        app.ble_status_event.clear()
+        app.send_status()
+    app.bus.flush()
+
+def bench_loops(results):
+
+    """ One main loop iteration of pico/main.py and picow/main.py per scenario """
+
+    for name, ble in (('pico', False), ('picow', True)):
+        app, meter = make_app(ble)
+        station = board.radio.station()
+        for i in range(3):
+            iteration(app)                  # settle: first status, display and RDS
+
+        def rssi_change():
+            station.rssi += 8                               # above the hysteresis after smoothing
+            board.clock.advance(app.monitor.slow_ms * 1000)     # next monitor sample due
+            iteration(app)
+
+        def rssi_noise():
+            station.rssi += 1 if station.rssi & 1 else -1   # below the hysteresis
+            board.clock.advance(app.monitor.slow_ms * 1000)
+            iteration(app)
+
+        def button_press(pin):
+            def press():
+                board.press(pin)
+                iteration(app)
+                board.release(pin)
+                board.clock.advance(50000)  # past the debounce window
+                iteration(app)
+            return press
+
+        measure(meter, lambda: iteration(app), results, name + '.loop.idle')
+        measure(meter, rssi_change, results, name + '.loop.rssi_change')
+        for i in range(8):
+            rssi_noise()                    # let the smoothed value settle on the noise
+        measure(meter, rssi_noise, results, name + '.loop.rssi_noise')
+        measure(meter, button_press(21), results, name + '.loop.button_volume')
+
+        def volume_burst():
+            for i in range(4):
+                app.commands.put_nowait(radioapp.CMD_VOLUME_DOWN)
+            iteration(app)                  # the four writes of register 0x05 go out as one
+
+        measure(meter, volume_burst, results, name + '.loop.volume_burst')
+        measure(meter, button_press(18), results, name + '.loop.button_select')
+
+def check_pulses():
+
+    """ A queued SEEK or TUNE must reach the chip when a later write to its register is queued, returns the failures """
+
+    failed = []
+    bus = i2cbus.BusManager(I2C(0))
+    radio = radioRDA5807.RadioRDA5807(bus.client(i2cbus.PRIO_TUNER, defer=True, pulse=radioRDA5807.is_pulse_write))
+    bus.flush()
+    chip = board.radio
+    seeks = chip.seeks
+    radio.tuner.start_seek(radioRDA5807.SEEK_UP)
+    radio.mute(True)                        # CONFIG again before the bus task runs
+    bus.flush()
+    if chip.seeks != seeks + 1:
+        failed.append('seek then mute: {} seeks sent, expected 1'.format(chip.seeks - seeks))
+    radio.tuner.run()
+    tunes = chip.tunes
+    radio.tuner.start_tune(radio.khz_to_channel(81300))
+    radio.write_reg(radioRDA5807.RDA5807M_REG_TUNING, radio.read_reg_cached(radioRDA5807.RDA5807M_REG_TUNING) & ~radioRDA5807.RDA5807M_REG_TUNING_FLG_TUNE)
+    bus.flush()
+    if chip.tunes != tunes + 1:
+        failed.append('tune then TUNING write: {} tunes sent, expected 1'.format(chip.tunes - tunes))
+    return failed
+
+def check(results, budgets):
+    failed = []
+    for name, result in results.items():
+        budget = budgets.get(name)
+        if budget is None:
+            continue
+        for key in ('transactions', 'bytes'):
+            if result[key] > budget[key]:
+                failed.append('{} {} {} > budget {}'.format(name, key, result[key], budget[key]))
+    return failed
+
+def main():
+    parser = argparse.ArgumentParser(description='I2C cost of radio operations and main loop iterations')
+    parser.add_argument('--json', help='write the results to this file')
+    parser.add_argument('--budgets', default=BUDGETS_FILE, help='budget file')
+    parser.add_argument('--update', action='store_true', help='write the results as the new budgets')
+    args = parser.parse_args()
+
+    board.radio.load_stations(os.path.join(os.path.dirname(HERE), 'pico', stationdb.STATIONS_FILE))
+    results = {}
+    bench_operations(results)
+    bench_loops(results)
+
+    print('{:32s} {:>5s} {:>6s} {:>9s} {:>9s}'.format('operation', 'trans', 'bytes', 'us@100k', 'us@400k'))
+    for name, r in results.items():
+        print('{:32s} {:5d} {:6d} {:9d} {:9d}'.format(name, r['transactions'], r['bytes'], r['bus_us_100k'], r['bus_us_400k']))
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=1, sort_keys=True)
+    if args.update:
+        budgets = {name: {'transactions': r['transactions'], 'bytes': r['bytes']} for name, r in results.items()}
+        with open(args.budgets, 'w') as f:
+            json.dump(budgets, f, indent=1, sort_keys=True)
+            f.write('\n')
+        return 0
+    with open(args.budgets) as f:
+        failed = check(results, json.load(f))
+    for line in failed:
+        print('OVER BUDGET', line)
+    pulses = check_pulses()
+    for line in pulses:
+        print('FAILED', line)
+    failed += pulses
+    return 1 if failed else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
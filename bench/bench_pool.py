@@ -0,0 +1,108 @@
+#
+# Station change with a RadioPool of two tuners against one tuner, on the emulator
+#
+# Copyright (c) 2025 ha864git
+#
+# License: MIT
+#
+# Two emulated RDA5807M on I2C(0) and I2C(1) hear the stations of
+# pico/stations.json. The scanner sweeps the whole band once (virtual clock),
+# then the same stations are selected three ways:
+#
+#   direct      the listener tunes, audio is off until STC (one tuner)
+#   prepare     RadioPool.select() of a verified station: the scanner tunes
+#               muted while the listener plays, then the roles swap
+#   swap        RadioPool.select() of the channel the scanner is measuring
+#
+# latency is select to the new station playing, silence the part of it without audio.
+#
+#   python bench/bench_pool.py [--tune-ms 10]
+#
+import argparse
+import os
+import sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+
+import emulator
+from emulator.clock import Clock
+
+board = emulator.install(Clock(virtual=True), tuners=2)
+
+import bandscan
+import radioRDA5807
+import radiopool
+import stationdb
+import time
+from machine import I2C
+
+def step(pool):
+    pool.poll()
+    board.clock.advance(max(1, pool.ms_until_poll()) * 1000)
+
+def until(pool, condition, limit_ms=60000):
+    t = time.ticks_ms()
+    while not condition():
+        if time.ticks_diff(time.ticks_ms(), t) > limit_ms:
+            raise RuntimeError('timeout')
+        step(pool)
+    return time.ticks_diff(time.ticks_ms(), t)
+
+def main():
+    parser = argparse.ArgumentParser(description='Station change latency with one tuner and with a RadioPool of two')
+    parser.add_argument('--tune-ms', type=int, default=10, help='emulated time from TUNE to STC')
+    args = parser.parse_args()
+
+    stations = stationdb.StationDB(os.path.join(os.path.dirname(HERE), 'pico', stationdb.STATIONS_FILE))
+    board.radio.load_stations(os.path.join(os.path.dirname(HERE), 'pico', stationdb.STATIONS_FILE))
+    for tuner in board.tuners:
+        tuner.tune_us = args.tune_ms * 1000
+    profile = radioRDA5807.RadioProfile(band=stations.band, space=stations.space, volume=5, rds=True)
+    radios = [radioRDA5807.RadioRDA5807(I2C(0), profile=profile, khz=stations.khz[0]),
+              radioRDA5807.RadioRDA5807(I2C(1), profile=profile)]
+    index = bandscan.ChannelIndex(profile.band, profile.space)
+    pool = radiopool.RadioPool(radios, index)
+
+    for bus in board.buses.values():
+        bus.reset_stats()
+    sweep_ms = until(pool, lambda: index.sweeps > 0)
+    print('sweep {} channels {} ms, listener bus {} transactions, scanner bus {} transactions'.format(
+        index.nchan, sweep_ms, board.buses[0].transactions, board.buses[1].transactions))
+
+    print('{:10s} {:>10s} {:>10s} {:>8s}'.format('mode', 'latency_ms', 'silence_ms', 'stations'))
+    chans = [pool.listener.khz_to_channel(khz) for khz in stations.khz[1:]]
+
+    total = 0
+    for chan in chans:
+        tuner = pool.listener.tuner
+        t = time.ticks_ms()
+        tuner.start_tune(chan)
+        tuner.run()
+        total += time.ticks_diff(time.ticks_ms(), t)
+    print('{:10s} {:10.1f} {:10.1f} {:8d}'.format('direct', total / len(chans), total / len(chans), len(chans)))
+
+    total = 0
+    for chan in chans:
+        swaps = pool.swaps
+        t = time.ticks_ms()
+        if pool.select(chan) != radiopool.SELECT_PREPARE:
+            raise RuntimeError('not verified: {}'.format(chan))
+        until(pool, lambda: pool.swaps > swaps)
+        total += time.ticks_diff(time.ticks_ms(), t)
+    print('{:10s} {:10.1f} {:10.1f} {:8d}'.format('prepare', total / len(chans), 0, len(chans)))
+
+    total = 0
+    for chan in chans:
+        scanner = pool.scanners[1 - pool.listening]
+        until(pool, lambda: scanner.state == bandscan.SCAN_SETTLING and scanner.chan == chan)
+        t = time.ticks_ms()
+        if pool.select(chan) != radiopool.SELECT_SWAP:
+            raise RuntimeError('no swap: {}'.format(chan))
+        total += time.ticks_diff(time.ticks_ms(), t)
+    print('{:10s} {:10.1f} {:10.1f} {:8d}'.format('swap', total / len(chans), 0, len(chans)))
+    print('pool', pool.stats())
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
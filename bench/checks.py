@@ -0,0 +1,364 @@
+#
+# Assert-based checks of the radio code on the emulator
+#
+# Copyright (c) 2025 ha864git
+#
+# License: MIT
+#
+# Every check runs the real modules against the emulated board and fails with
+# an AssertionError; the benchmarks measure, these only pass or fail:
+#
+#   python bench/checks.py                  all checks
+#   python bench/checks.py ble_bus_error    the named ones
+#
+# Exits with 1 when a check fails.
+#
+import argparse
+import os
+import struct
+import sys
+import tempfile
+import time
+import traceback
+import types
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+
+import emulator
+
+board = emulator.install()                  # a new board for every check, run_main halts it
+
+REPO = os.path.dirname(HERE)
+CHECKS = []
+
+def check(function):
+    CHECKS.append(function)
+    return function
+
+def sent_text(peripheral):
+    return [data.decode('latin-1') for data in peripheral.sent]
+
+@check
+def ble_bus_error():
+
+    """ A bus error inside a BLE command is answered with 'error <command>' and the app keeps running """
+
+    def write_reg(b):
+        b.buses[0].fail(0x11)               # RANDOM_ACCESS_ADDRESS: the write or its read back
+        b.peripheral.write('write reg 5 34959\n')
+
+    events = [
+        (0.3, lambda b: b.peripheral.connect()),
+        (1.0, write_reg),
+        (1.5, lambda b: b.peripheral.write('volume 4\n')),
+    ]
+    emulator.run_main(os.path.join(REPO, 'picow', 'main.py'), 2.5, board, events)
+    sent = sent_text(board.peripheral)
+    assert 'error write' in sent, sent
+    assert 'volume 4' in sent[sent.index('error write'):], sent
+
+@check
+def engine_keeps_tune():
+
+    """ A TUNING write posted to the core 1 engine after a TUNE does not swallow the TUNE """
+
+    import i2cbus
+    import radioengine
+    import radioRDA5807
+    from machine import I2C
+
+    radio = radioRDA5807.RadioRDA5807(I2C(0))
+    tuning = radioRDA5807.RDA5807M_REG_TUNING
+    value = (radio.khz_to_channel(81300) << 6) | radio.tuning_bits
+    engine = radioengine.RadioEngine(i2cbus.BusManager(I2C(0)))
+    tunes = board.radio.tunes
+    engine.post(tuning, value | radioRDA5807.RDA5807M_REG_TUNING_FLG_TUNE)
+    engine.post(tuning, value)              # queued before core 1 took the TUNE
+    engine.start()
+    try:
+        while engine.pending():
+            time.sleep(0.001)
+    finally:
+        engine.stop()
+    assert board.radio.tunes == tunes + 1, board.radio.tunes - tunes
+
+@check
+def ble_binary_frames():
+
+    """ Binary frames: a version mismatch is answered with OP_ERROR, records after a truncated one are
+        dropped, no notification exceeds the mtu """
+
+    import bleproto
+
+    def frame(version, *records):
+        data = bytearray((bleproto.MAGIC, version))
+        for opcode, payload in records:
+            data += bytes((opcode, len(payload))) + bytes(payload)
+        return bytes(data)
+
+    events = [
+        (0.3, lambda b: b.peripheral.connect()),
+        (0.5, lambda b: b.peripheral.write(frame(bleproto.VERSION + 1, (bleproto.OP_HELLO, b'')))),
+        (0.8, lambda b: b.peripheral.write(frame(bleproto.VERSION, (bleproto.OP_HELLO, b'')))),
+        (1.2, lambda b: b.peripheral.write(frame(bleproto.VERSION, (bleproto.OP_DUMP, b''), (bleproto.OP_LOG, bytes(4))))),
+        (1.5, lambda b: b.peripheral.write(frame(bleproto.VERSION, (bleproto.OP_VOLUME, b'\x05'))
+                                           + bytes((bleproto.OP_VOLUME, 2, 9)))),
+    ]
+    emulator.run_main(os.path.join(REPO, 'picow', 'main.py'), 2.0, board, events)
+    frames = [data for data in board.peripheral.sent if data[0] == bleproto.MAGIC]
+    error = bytes((bleproto.MAGIC, bleproto.VERSION, bleproto.OP_ERROR, 2, bleproto.ERR_VERSION, bleproto.VERSION))
+    assert frames and frames[0] == error, frames[:1]
+    assert any(data[2] == bleproto.OP_HELLO for data in frames[1:]), frames
+    assert any(data[2] == bleproto.OP_REGS for data in frames), frames
+    assert all(len(data) <= 20 for data in frames), [len(data) for data in frames]
+    volume = bytes((bleproto.OP_VOLUME, 1))
+    assert any(volume + b'\x05' in data for data in frames), frames
+    assert not any(volume + b'\x09' in data for data in frames), frames
+
+    proto = bleproto.BinaryProtocol(types.SimpleNamespace(radio=None, ble=None), mtu=20)
+    proto.begin()
+    proto.record(bleproto.OP_LOG, bytes(16))            # 2 + 2 + 16: fills the frame
+    try:
+        proto.record(bleproto.OP_LOG, bytes(17))
+    except ValueError:
+        pass
+    else:
+        raise AssertionError('record of 17 bytes accepted at mtu 20')
+
+@check
+def ble_seek_and_config():
+
+    """ 'seek' with a bad direction is an error, a raw CONFIG write updates the mute flag """
+
+    import radioRDA5807
+
+    config = radioRDA5807.RDA5807M_REG_CONFIG
+    events = [
+        (0.3, lambda b: b.peripheral.connect()),
+        (0.6, lambda b: b.peripheral.write('seek sideways\n')),
+        (1.0, lambda b: b.peripheral.write('write reg %d %d\n' % (config, radioRDA5807.RDA5807M_REG_CONFIG_FLG_ENABLE))),
+    ]
+    emulator.run_main(os.path.join(REPO, 'picow', 'main.py'), 1.5, board, events)
+    sent = sent_text(board.peripheral)
+    assert 'error seek' in sent, sent
+    status = [text for text in sent[sent.index('write reg %d 1' % config):] if text.startswith('status ')]
+    assert status and ' mute ' in status[-1], status
+
+@check
+def buttons_wait_for_irq():
+
+    """ The input task sleeps on the button irq: a held button still repeats, an idle one is not polled """
+
+    import button
+    import radioRDA5807
+
+    polls = [0]
+    poll = button.ButtonDriver.poll
+
+    def counted(self):
+        polls[0] += 1
+        poll(self)
+
+    volume = lambda b: b.radio.regs[radioRDA5807.RDA5807M_REG_VOLUME] & 0xf
+    seen = {}
+    events = [
+        (0.5, lambda b: seen.setdefault('start', volume(b))),
+        (0.6, lambda b: b.press(21)),       # volume up, hold to ramp
+        (1.5, lambda b: b.release(21)),
+        (1.7, lambda b: seen.setdefault('held', volume(b))),
+        (2.0, lambda b: b.press(20)),       # volume down, one step
+        (2.1, lambda b: b.release(20)),
+        (2.4, lambda b: seen.setdefault('end', volume(b))),
+    ]
+    button.ButtonDriver.poll = counted
+    try:
+        emulator.run_main(os.path.join(REPO, 'pico', 'main.py'), 4.0, board, events)
+    finally:
+        button.ButtonDriver.poll = poll
+    assert seen['held'] >= min(15, seen['start'] + 3), seen
+    assert seen['end'] == seen['held'] - 1, seen
+    # 4 s at 20 ms are 200 polls, held and debouncing buttons need about 60
+    assert polls[0] < 100, polls[0]
+
+@check
+def bus_keeps_pulses():
+
+    """ A deferred TUNE or CONFIG write is never replaced by a later one, a VOLUME write is """
+
+    import i2cbus
+    import radioRDA5807
+    from machine import I2C
+
+    bus = i2cbus.BusManager(I2C(0))
+    client = bus.client(i2cbus.PRIO_TUNER, defer=True, pulse=radioRDA5807.is_pulse_write)
+    addr = radioRDA5807.RANDOM_ACCESS_ADDRESS
+    tuning = radioRDA5807.RDA5807M_REG_TUNING
+    chan = board.radio.chan
+    config = radioRDA5807.RDA5807M_REG_CONFIG_FLG_DMUTE | radioRDA5807.RDA5807M_REG_CONFIG_FLG_ENABLE
+    tune = ((chan + 5) << 6) | radioRDA5807.RDA5807M_REG_TUNING_FLG_TUNE
+    tunes = board.radio.tunes
+    client.writeto_mem(addr, radioRDA5807.RDA5807M_REG_CONFIG, bytes((config >> 8, config & 0xff)))
+    client.writeto_mem(addr, radioRDA5807.RDA5807M_REG_CONFIG, bytes((config >> 8, config & 0xff)))
+    client.writeto_mem(addr, tuning, bytes((tune >> 8, tune & 0xff)))
+    client.writeto_mem(addr, tuning, bytes((tune >> 8, tune & 0xc0)))
+    client.writeto_mem(addr, radioRDA5807.RDA5807M_REG_VOLUME, b'\x88\x81')
+    client.writeto_mem(addr, radioRDA5807.RDA5807M_REG_VOLUME, b'\x88\x82')
+    assert bus.pending() == 5 and bus.combined == 1, bus.stats()
+    bus.flush()
+    assert board.radio.tunes == tunes + 1 and board.radio.regs[tuning] >> 6 == chan + 5, board.radio.tunes - tunes
+    assert board.radio.regs[radioRDA5807.RDA5807M_REG_VOLUME] == 0x8882, hex(board.radio.regs[radioRDA5807.RDA5807M_REG_VOLUME])
+
+@check
+def journal_round_trip():
+
+    """ The journal restores its last valid record: after a torn or corrupt append, a compaction
+        and a compaction cut off before the rename """
+
+    import statejournal
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, statejournal.STATE_FILE)
+        journal = statejournal.StateJournal(path, debounce_ms=0, max_records=4)
+        assert not journal.load()
+        states = [(87500 + 100 * i, i, i & 1, False, True, i - 1) for i in range(6)]
+        for state in states[:3]:
+            journal.note(*state)
+            assert journal.flush()
+        journal.note(*states[2])
+        assert not journal.flush()                  # unchanged: nothing written
+        assert os.path.getsize(path) == 3 * statejournal.RECORD_SIZE
+
+        def restored():
+            loaded = statejournal.StateJournal(path, max_records=4)
+            return loaded, (loaded.khz, loaded.volume, loaded.flags, loaded.preset)
+
+        def expected(state):
+            khz, volume, mute, mono, bass, preset = state
+            return (khz, volume, (statejournal.FLG_MUTE if mute else 0) | (statejournal.FLG_MONO if mono else 0)
+                    | (statejournal.FLG_BASS if bass else 0), preset)
+
+        assert restored()[1] == expected(states[2]), restored()[1]
+        with open(path, 'r+b') as f:                # a bit flip in the newest record fails the check
+            f.seek(2 * statejournal.RECORD_SIZE + 3)
+            byte = f.read(1)[0]
+            f.seek(-1, 1)
+            f.write(bytes((byte ^ 0x10,)))
+        assert restored()[1] == expected(states[1]), restored()[1]
+        with open(path, 'ab') as f:                 # torn append: a short tail
+            f.write(b'\xa5\x07\x00')
+        journal, state = restored()
+        assert state == expected(states[1]), state
+        journal.note(*states[3])
+        assert journal.flush() and journal.compactions == 1
+        assert os.path.getsize(path) == statejournal.RECORD_SIZE
+        assert restored()[1] == expected(states[3]), restored()[1]
+        for state in states[4:]:
+            journal.note(*state)
+            journal.flush()
+        os.rename(path, path + '.tmp')              # power cut between the compaction write and the rename
+        assert restored()[1] == expected(states[5]) and os.path.exists(path), restored()[1]
+
+@check
+def index_round_trip():
+
+    """ A saved channel index loads back equal; another band, a truncated or foreign file give an empty one """
+
+    import bandscan
+    import radioRDA5807
+
+    band, space = radioRDA5807.BAND_WIDE, radioRDA5807.SPACE_100K
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, bandscan.INDEX_FILE)
+        index = bandscan.ChannelIndex(band, space)
+        index.record(0, 12, False, False)
+        index.record(15, 48, True, True)
+        index.record(index.nchan - 1, 33, True, False)
+        index.sweep_done()
+        index.save(path)
+        assert not index.dirty and os.listdir(tmp) == [bandscan.INDEX_FILE], os.listdir(tmp)
+        with open(path, 'rb') as f:
+            data = f.read()
+        header = bandscan.INDEX_HEADER
+        assert len(data) == struct.calcsize(header) + 2 * index.nchan, len(data)
+        assert struct.unpack_from(header, data) == (bandscan.INDEX_MAGIC, bandscan.INDEX_VERSION, band, space, 0,
+                                                    index.nchan, 1), struct.unpack_from(header, data)
+        loaded = bandscan.ChannelIndex.load(path, band, space)
+        assert loaded.rssi == index.rssi and loaded.flags == index.flags and loaded.sweeps == 1
+        assert loaded.known(15) and loaded.fm_true(15) and loaded.stereo(15) and loaded.age(15) == 0
+        assert not loaded.known(1) and loaded.age(1) == bandscan.AGE_MAX
+
+        def empty(index):
+            return not any(index.known(chan) for chan in range(index.nchan)) and index.sweeps == 0
+
+        assert empty(bandscan.ChannelIndex.load(path, radioRDA5807.BAND_US_EU, space))
+        assert empty(bandscan.ChannelIndex.load(os.path.join(tmp, 'missing.bin'), band, space))
+        with open(path, 'wb') as f:
+            f.write(data[:-1])
+        assert empty(bandscan.ChannelIndex.load(path, band, space))
+        with open(path, 'wb') as f:
+            f.write(b'CHIY' + data[4:])
+        assert empty(bandscan.ChannelIndex.load(path, band, space))
+
+@check
+def siglog_ring_wrap():
+
+    """ The log file stays at blocks * BLOCK_SIZE, reads resume at the oldest record kept, a reload continues
+        the serials with the next boot """
+
+    import siglog
+
+    blocks = 3
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, siglog.LOG_FILE)
+        log = siglog.SignalLog(path, blocks=blocks, interval_ms=0, flush_ms=0)
+        total = siglog.BLOCK_RECORDS * (blocks + 2) + 5
+        for serial in range(total):
+            status = types.SimpleNamespace(channel=serial, rssi=serial & 0x7f, stereo=serial & 1, fm_true=True)
+            assert log.sample(status)
+            log.poll()
+        assert log.overruns == 0 and log.end() == total, log.stats()
+        log.flush()
+        assert os.path.getsize(path) == blocks * siglog.BLOCK_SIZE, os.path.getsize(path)
+        oldest = log.oldest()
+        assert oldest == siglog.BLOCK_RECORDS * 3, oldest
+
+        def records(log, first):
+            buf = bytearray(siglog.RECORD_SIZE * 2 * siglog.BLOCK_RECORDS)
+            serials = []
+            while True:
+                serial, n = log.read(first, buf)
+                if n == 0:
+                    return serials
+                for i in range(n):
+                    t, channel, rssi, flags = struct.unpack_from(siglog.RECORD, buf, i * siglog.RECORD_SIZE)
+                    assert channel == serial + i and t >> siglog.BOOT_SHIFT == 0, (serial + i, channel, t)
+                    serials.append(channel)
+                first = serial + n
+
+        assert records(log, 0) == list(range(oldest, total))
+        reloaded = siglog.SignalLog(path, blocks=blocks)
+        assert reloaded.end() == total and reloaded.oldest() == oldest and reloaded.boot == 1, reloaded.stats()
+        assert records(reloaded, 0) == list(range(oldest, total))
+
+def main():
+    parser = argparse.ArgumentParser(description='Assert-based checks of the radio code on the emulator')
+    parser.add_argument('names', nargs='*', help='checks to run (default: all)')
+    args = parser.parse_args()
+    global board
+    failed = 0
+    for function in CHECKS:
+        if args.names and function.__name__ not in args.names:
+            continue
+        board = emulator.install()
+        try:
+            function()
+            print('ok    ', function.__name__)
+        except Exception:
+            failed += 1
+            print('FAILED', function.__name__)
+            traceback.print_exc()
+    return 1 if failed else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,73 @@
+#
+# Replay a recorded RDS group stream through the decoder and check the result
+#
+# Copyright (c) 2025 ha864git
+#
+# License: MIT
+#
+# The stream (bench/rds_groups.txt) has one group per line, block A B C D in
+# hex, and '# expect <field> <value>' lines checking the decoder at that point:
+#   pi <hex>                    PI code
+#   ps <text>                   ps_text()
+#   rt <text>                   rt_text()
+#   ct <mjd> <hour> <minute> <offset>
+#
+#   python bench/replay_rds.py [stream]
+#
+# Exits with 1 when an expectation fails.
+#
+import argparse
+import os
+import sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(os.path.dirname(HERE), 'pico'))
+
+import rds
+
+STREAM_FILE = os.path.join(HERE, 'rds_groups.txt')
+
+def actual(decoder, field):
+    if field == 'pi':
+        return '{:04X}'.format(decoder.pi)
+    if field == 'ps':
+        return decoder.ps_text()
+    if field == 'rt':
+        return decoder.rt_text()
+    if field == 'ct':
+        return '{} {} {} {}'.format(decoder.mjd, decoder.hour, decoder.minute, decoder.offset)
+    raise ValueError('unknown field ' + field)
+
+def replay(path):
+
+    """ Replay the stream, returns the failed expectations as text lines """
+
+    decoder = rds.RDSDecoder()
+    failed = []
+    checks = 0
+    with open(path) as f:
+        for number, line in enumerate(f, 1):
+            line = line.rstrip('\n')
+            if line.startswith('# expect '):
+                field, _, expected = line[len('# expect '):].partition(' ')
+                value = actual(decoder, field)
+                checks += 1
+                if value != expected.strip():
+                    failed.append('{}:{} {} {!r} != expected {!r}'.format(os.path.basename(path), number, field, value, expected.strip()))
+            elif line and not line.startswith('#'):
+                a, b, c, d = (int(word, 16) for word in line.split())
+                decoder.decode(a, b, c, d)
+    print('{} groups, {} checks, {} failed'.format(decoder.groups, checks, len(failed)))
+    return failed
+
+def main():
+    parser = argparse.ArgumentParser(description='Replay a recorded RDS group stream through rds.RDSDecoder')
+    parser.add_argument('stream', nargs='?', default=STREAM_FILE, help='group stream file')
+    args = parser.parse_args()
+    failed = replay(args.stream)
+    for line in failed:
+        print('FAILED', line)
+    return 1 if failed else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
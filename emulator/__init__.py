@@ -0,0 +1,120 @@
+#
+# CPython emulator of the Pico FM radio hardware
+#
+# Copyright (c) 2025 ha864git
+#
+# License: MIT
+#
+# Provides the MicroPython modules the radio code imports (machine, time.ticks_*,
+# micropython, framebuf, ssd1306, bluetooth, ble_simple_peripheral) backed by a
+# register-level RDA5807M and an SSD1306 that records frames, so radioRDA5807,
+# swf and both main programs run unmodified on a PC:
+#
+#   board = emulator.install()              # before importing radio code
+#   import radioRDA5807
+#   radio = radioRDA5807.RadioRDA5807(machine.I2C(0))
+#
+#   python -m emulator pico/main.py --seconds 5 --press 19@2
+#
+import os
+import runpy
+import shutil
+import sys
+import tempfile
+import threading
+
+from emulator.clock import Clock
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PICO_DIR = os.path.join(REPO, 'pico')
+
+def install(clock=None, board=None, radio=True, oled=True, tuners=1):
+
+    """ Register the emulated MicroPython modules and wire a Board, returns the board
+
+    arguments:
+    clock                   - emulator.clock.Clock (default: host time)
+    board                   - Board to use instead of a new one
+    radio, oled             - devices of a new board
+    tuners                  - RDA5807M of a new board, tuner i on the bus of I2C(i)
+
+    """
+
+    from emulator import micropython, framebuf
+    sys.modules['micropython'] = micropython
+    sys.modules['framebuf'] = framebuf
+    from emulator import machine, bluetooth, ble_simple_peripheral, ssd1306
+    from emulator.board import Board
+    if board is None:
+        board = Board(clock if clock is not None else Clock(), radio=radio, oled=oled, tuners=tuners)
+    board.clock.install()
+    machine.board = board
+    sys.modules['machine'] = machine
+    sys.modules['bluetooth'] = bluetooth
+    sys.modules['ble_simple_peripheral'] = ble_simple_peripheral
+    sys.modules['ssd1306'] = ssd1306
+    if PICO_DIR not in sys.path:
+        sys.path.insert(0, PICO_DIR)
+    return board
+
+def flash(*dirs):
+
+    """ A temporary directory with the data files (stations.json, ...) of dirs, like the device flash """
+
+    fs = tempfile.mkdtemp(prefix='picofs-')
+    for d in dirs:
+        for name in os.listdir(d):
+            path = os.path.join(d, name)
+            if os.path.isfile(path) and not name.endswith('.py'):
+                shutil.copy(path, fs)
+    return fs
+
+def run_main(path, seconds=None, board=None, events=()):
+
+    """ Run a main program until it returns or for seconds, returns the board
+
+    The program runs in a thread with the flash directory as working directory,
+    the board is halted at the end (its next I2C transaction raises machine.Halt).
+    events are (seconds, function(board)) called while it runs, e.g. button presses.
+
+    """
+
+    if board is None:
+        board = install()
+    from emulator import machine
+    script = os.path.abspath(path)
+    here = os.path.dirname(script)
+    if here not in sys.path:
+        sys.path.insert(0, here)
+    fs = flash(PICO_DIR, here)
+    cwd = os.getcwd()
+    os.chdir(fs)
+    if board.radio is not None and not board.radio.stations:
+        board.radio.load_stations('stations.json')
+    errors = []
+
+    def target():
+        try:
+            runpy.run_path(script, run_name='__main__')
+        except machine.Halt:
+            pass
+        except BaseException as e:
+            errors.append(e)
+
+    timers = [threading.Timer(t, function, (board,)) for t, function in events]
+    thread = threading.Thread(target=target, daemon=True)
+    try:
+        thread.start()
+        for timer in timers:
+            timer.start()
+        thread.join(seconds)
+    finally:
+        for timer in timers:
+            timer.cancel()
+        board.halt()
+        thread.join(1)
+        os.chdir(cwd)
+        shutil.rmtree(fs, ignore_errors=True)
+    if errors:
+        raise errors[0]
+    return board
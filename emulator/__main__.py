@@ -0,0 +1,54 @@
+#
+# python -m emulator <main.py> [options]
+#
+# Copyright (c) 2025 ha864git
+#
+# License: MIT
+#
+import argparse
+
+import emulator
+
+def at(text):
+    what, _, when = text.rpartition('@')
+    return what, float(when)
+
+def main():
+    parser = argparse.ArgumentParser(prog='python -m emulator', description='Run a radio main program on the emulated board')
+    parser.add_argument('main', help='pico/main.py or picow/main.py')
+    parser.add_argument('--seconds', type=float, default=5.0, help='run time')
+    parser.add_argument('--no-radio', action='store_true', help='boot without the RDA5807M')
+    parser.add_argument('--press', type=at, action='append', default=[], metavar='PIN@S',
+                        help='press the button on GPIO PIN for 100 ms at S seconds')
+    parser.add_argument('--connect', type=float, metavar='S', help='connect a BLE central at S seconds')
+    parser.add_argument('--write', type=at, action='append', default=[], metavar='TEXT@S',
+                        help='BLE write TEXT at S seconds (after --connect)')
+    args = parser.parse_args()
+
+    board = emulator.install(radio=not args.no_radio)
+    events = []
+    for pin, t in args.press:
+        events.append((t, lambda b, pin=int(pin): b.press(pin)))
+        events.append((t + 0.1, lambda b, pin=int(pin): b.release(pin)))
+    if args.connect is not None:
+        events.append((args.connect, lambda b: b.peripheral.connect()))
+    for text, t in args.write:
+        events.append((t, lambda b, text=text: b.peripheral.write(text + '\n')))
+    emulator.run_main(args.main, args.seconds, board, events)
+
+    bus = board.buses[0]
+    print('--- emulator ---')
+    print('i2c transactions', bus.transactions, 'bytes', bus.bytes, 'bus time', bus.bus_us // 1000, 'ms')
+    for addr in sorted(bus.per_address):
+        print('  0x{:02X} transactions {} bytes {}'.format(addr, *bus.per_address[addr]))
+    if board.radio is not None:
+        radio = board.radio
+        print('radio', radio.khz(), 'kHz', 'tunes', radio.tunes, 'seeks', radio.seeks)
+    if board.oled is not None:
+        print('oled frames', board.oled.frame_count, 'data bytes', board.oled.data_bytes)
+    if board.peripheral is not None:
+        print('ble notifications', len(board.peripheral.sent), 'bytes', board.peripheral.sent_bytes)
+        for data in board.peripheral.sent[-5:]:
+            print('  ', data)
+
+main()
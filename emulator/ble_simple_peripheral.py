@@ -0,0 +1,54 @@
+#
+# BLESimplePeripheral (Nordic UART service) for the emulator
+#
+# Copyright (c) 2025 ha864git
+#
+# License: MIT
+#
+# Same interface as the MicroPython example driver used by picow/main.py.
+# A test plays the central: connect(), write() a command, read sent.
+#
+from emulator import machine
+
+class BLESimplePeripheral:
+
+    def __init__(self, ble, name="mpy-uart"):
+        if machine.board is not None:
+            machine.board.peripheral = self
+        self.ble = ble
+        self.name = name
+        ble.active(True)
+        self.connected = False
+        self.write_callback = None
+        self.sent = []                      # notifications sent while connected
+        self.sent_bytes = 0
+
+    def is_connected(self):
+        return self.connected
+
+    def send(self, data):
+        if not self.connected:
+            return
+        data = data.encode() if isinstance(data, str) else bytes(data)
+        self.sent.append(data)
+        self.sent_bytes += len(data)
+
+    def on_write(self, callback):
+        self.write_callback = callback
+
+    # -- the central --
+
+    def connect(self):
+        self.connected = True
+
+    def disconnect(self):
+        self.connected = False
+
+    def write(self, data):
+
+        """ A write of the central to the RX characteristic """
+
+        if isinstance(data, str):
+            data = data.encode()
+        if self.write_callback is not None:
+            self.write_callback(data)
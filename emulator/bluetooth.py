@@ -0,0 +1,47 @@
+#
+# MicroPython bluetooth module for the emulator
+#
+# Copyright (c) 2025 ha864git
+#
+# License: MIT
+#
+# Only what BLESimplePeripheral needs to be constructed; the connection itself
+# is emulated by emulator.ble_simple_peripheral.
+#
+FLAG_READ = 0x0002
+FLAG_WRITE_NO_RESPONSE = 0x0004
+FLAG_WRITE = 0x0008
+FLAG_NOTIFY = 0x0010
+
+class UUID:
+
+    def __init__(self, value):
+        self.value = value
+
+    def __eq__(self, other):
+        return isinstance(other, UUID) and other.value == self.value
+
+    def __hash__(self):
+        return hash(self.value)
+
+class BLE:
+
+    def __init__(self):
+        self.enabled = False
+        self.handler = None
+
+    def active(self, active=None):
+        if active is not None:
+            self.enabled = bool(active)
+        return self.enabled
+
+    def irq(self, handler):
+        self.handler = handler
+
+    def config(self, *args, **kwargs):
+        if args and args[0] == 'mtu':
+            return 23
+        return None
+
+    def gap_advertise(self, interval_us, adv_data=None, resp_data=None, connectable=True):
+        pass
@@ -0,0 +1,137 @@
+#
+# The emulated Pico board: I2C buses, pins and the devices wired to them
+#
+# Copyright (c) 2025 ha864git
+#
+# License: MIT
+#
+# Default wiring, as in pico/main.py and picow/main.py:
+#   I2C 0 (GP4/GP5)     RDA5807M at 0x10/0x11, SSD1306 at 0x3C
+#   I2C 1, SoftI2C      further RDA5807M tuners (tuners=, add_tuner()), they
+#                       receive the station map of the first one
+#   GP18-GP21           buttons to GND (pull-ups), Pin.drive() presses them
+#
+# Bus.fail(addr) makes the next transaction to addr raise OSError(EIO).
+#
+import errno
+
+from emulator import machine
+from emulator.rda5807 import RDA5807M
+
+class Bus:
+
+    """ Devices on one I2C bus and the traffic they saw """
+
+    def __init__(self, board):
+        self.board = board
+        self.devices = {}                   # address -> device
+        self.transactions = 0
+        self.bytes = 0
+        self.bus_us = 0                     # transfer time at the bus frequency
+        self.per_address = {}               # address -> [transactions, bytes]
+        self.faults = {}                    # address -> transactions still to fail with EIO
+
+    def attach(self, device):
+        for addr in device.addresses:
+            self.devices[addr] = device
+        return device
+
+    def check(self):
+        if self.board.halted:
+            raise machine.Halt('board halted')
+
+    def count(self, addr, nbytes, write, freq):
+        self.check()
+        if self.faults.get(addr):
+            self.faults[addr] -= 1
+            raise OSError(errno.EIO)
+        self.transactions += 1
+        self.bytes += nbytes
+        stats = self.per_address.setdefault(addr, [0, 0])
+        stats[0] += 1
+        stats[1] += nbytes
+        # start + address byte + data bytes, 9 clocks each, + stop
+        us = ((nbytes + 1) * 9 + 2) * 1000000 // freq
+        self.bus_us += us
+        self.board.clock.advance(us)
+
+    def fail(self, addr, count=1):
+
+        """ Let the next count transactions to addr fail with OSError(EIO), a glitch on the bus """
+
+        self.faults[addr] = count
+
+    def reset_stats(self):
+        self.transactions = 0
+        self.bytes = 0
+        self.bus_us = 0
+        self.per_address.clear()
+
+class Board:
+
+    """ A Pico with the radio and the OLED on I2C 0
+
+    arguments:
+    clock                   - emulator.clock.Clock
+    radio                   - attach an RDA5807M (False = 'Check the power switch')
+    oled                    - attach an SSD1306
+    tuners                  - RDA5807M in all, tuner i on the bus of I2C(i)
+
+    """
+
+    def __init__(self, clock, radio=True, oled=True, tuners=1):
+        self.clock = clock
+        self.halted = False
+        self.buses = {0: Bus(self), 1: Bus(self)}
+        self.pins = {}
+        self.radio = None
+        self.tuners = []                    # every RDA5807M, board.radio first
+        self.oled = None
+        self.peripheral = None              # BLESimplePeripheral created by the program
+        if radio:
+            self.radio = self.add_tuner(0)
+            for i in range(1, tuners):
+                self.add_tuner(i)
+        if oled:
+            from emulator.ssd1306 import SSD1306
+            self.oled = self.buses[0].attach(SSD1306(clock))
+
+    def i2c_bus(self, id):
+
+        """ The bus of I2C(id), or of a SoftI2C keyed by ('soft', scl pin), made on first use """
+
+        bus = self.buses.get(id)
+        if bus is None:
+            bus = self.buses[id] = Bus(self)
+        return bus
+
+    def add_tuner(self, bus_id):
+
+        """ Attach an RDA5807M to bus bus_id, returns it; all tuners hear the same stations """
+
+        tuner = RDA5807M(self.clock)
+        if self.tuners:
+            tuner.stations = self.tuners[0].stations
+        self.tuners.append(tuner)
+        return self.i2c_bus(bus_id).attach(tuner)
+
+    def pin(self, id):
+        pin = self.pins.get(id)
+        if pin is None:
+            pin = self.pins[id] = machine.Pin.create(id)
+        return pin
+
+    def press(self, id, level=0):
+
+        """ Press the button on pin id (active low) """
+
+        self.pin(id).drive(level)
+
+    def release(self, id):
+        self.pin(id).drive(None)
+
+    def halt(self):
+
+        """ Make the next bus transaction raise machine.Halt """
+
+        self.halted = True
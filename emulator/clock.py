@@ -0,0 +1,90 @@
+#
+# MicroPython time.ticks_* on CPython
+#
+# Copyright (c) 2025 ha864git
+#
+# License: MIT
+#
+# Ticks wrap like on the RP2040 port (TICKS_PERIOD = 2**30), so code that
+# subtracts ticks instead of using ticks_diff() fails here as it would on the
+# device once the counter wraps.
+#
+import time
+
+TICKS_PERIOD = 1 << 30
+TICKS_MAX = TICKS_PERIOD - 1
+TICKS_HALFPERIOD = TICKS_PERIOD // 2
+
+def ticks_add(ticks, delta):
+    return (ticks + delta) & TICKS_MAX
+
+def ticks_diff(ticks1, ticks2):
+    diff = (ticks1 - ticks2) & TICKS_MAX
+    return diff - TICKS_PERIOD if diff >= TICKS_HALFPERIOD else diff
+
+class Clock:
+
+    """ Microsecond clock behind the emulated ticks_ms/ticks_us/sleep_ms
+
+    arguments:
+    virtual                 - False: follow the host monotonic clock (needed by asyncio programs)
+                              True: time only moves on sleep_ms/sleep_us/advance, runs are repeatable
+    read_cost_us            - virtual time consumed by every ticks read, so polling loops make progress
+    start_ms                - initial ticks_ms, set close to the wrap to test ticks arithmetic
+
+    """
+
+    def __init__(self, virtual=False, read_cost_us=10, start_ms=0):
+        self.virtual = virtual
+        self.read_cost_us = read_cost_us
+        self.offset_us = start_ms * 1000
+        self.now_us = self.offset_us
+        self.origin = time.monotonic_ns()
+
+    def us(self):
+
+        """ Microseconds since the clock was created (not wrapped) """
+
+        if self.virtual:
+            self.now_us += self.read_cost_us
+            return self.now_us
+        return self.offset_us + (time.monotonic_ns() - self.origin) // 1000
+
+    def advance(self, us):
+
+        """ Move a virtual clock forward """
+
+        if self.virtual:
+            self.now_us += us
+
+    def ticks_ms(self):
+        return (self.us() // 1000) & TICKS_MAX
+
+    def ticks_us(self):
+        return self.us() & TICKS_MAX
+
+    def ticks_cpu(self):
+        return self.us() & TICKS_MAX
+
+    def sleep_us(self, us):
+        if us <= 0:
+            return
+        if self.virtual:
+            self.now_us += us
+        else:
+            time.sleep(us / 1000000)
+
+    def sleep_ms(self, ms):
+        self.sleep_us(ms * 1000)
+
+    def install(self):
+
+        """ Add the MicroPython functions to the time module of CPython """
+
+        time.ticks_ms = self.ticks_ms
+        time.ticks_us = self.ticks_us
+        time.ticks_cpu = self.ticks_cpu
+        time.ticks_add = ticks_add
+        time.ticks_diff = ticks_diff
+        time.sleep_ms = self.sleep_ms
+        time.sleep_us = self.sleep_us
@@ -0,0 +1,112 @@
+#
+# MicroPython framebuf for the emulator (MONO_VLSB only, the SSD1306 format)
+#
+# Copyright (c) 2025 ha864git
+#
+# License: MIT
+#
+# text() draws 8x8 placeholder glyphs derived from the character code, so
+# different strings give different pixels; the text itself is kept in
+# FrameBuffer.texts for assertions.
+#
+MONO_VLSB = 0
+MONO_HLSB = 3
+MONO_HMSB = 4
+
+class FrameBuffer:
+
+    def __init__(self, buffer, width, height, format=MONO_VLSB, stride=None):
+        if format != MONO_VLSB:
+            raise ValueError('only MONO_VLSB is emulated')
+        self.buf = buffer
+        self.width = width
+        self.height = height
+        self.texts = {}                     # (x, y) -> last string drawn there
+
+    def pixel(self, x, y, c=None):
+        if not (0 <= x < self.width and 0 <= y < self.height):
+            return None
+        i = (y >> 3) * self.width + x
+        bit = 1 << (y & 7)
+        if c is None:
+            return 1 if self.buf[i] & bit else 0
+        if c:
+            self.buf[i] |= bit
+        else:
+            self.buf[i] &= ~bit
+
+    def fill(self, c):
+        v = 0xff if c else 0
+        for i in range((self.height + 7) // 8 * self.width):
+            self.buf[i] = v
+        self.texts.clear()
+
+    def fill_rect(self, x, y, w, h, c):
+        for yy in range(max(0, y), min(self.height, y + h)):
+            for xx in range(max(0, x), min(self.width, x + w)):
+                self.pixel(xx, yy, c)
+        for key in list(self.texts):
+            if x <= key[0] < x + w and y <= key[1] < y + h:
+                del self.texts[key]
+
+    def hline(self, x, y, w, c):
+        self.fill_rect(x, y, w, 1, c)
+
+    def vline(self, x, y, h, c):
+        self.fill_rect(x, y, 1, h, c)
+
+    def rect(self, x, y, w, h, c, f=False):
+        if f:
+            self.fill_rect(x, y, w, h, c)
+            return
+        self.hline(x, y, w, c)
+        self.hline(x, y + h - 1, w, c)
+        self.vline(x, y, h, c)
+        self.vline(x + w - 1, y, h, c)
+
+    def line(self, x0, y0, x1, y1, c):
+        dx = abs(x1 - x0)
+        dy = -abs(y1 - y0)
+        sx = 1 if x0 < x1 else -1
+        sy = 1 if y0 < y1 else -1
+        err = dx + dy
+        while True:
+            self.pixel(x0, y0, c)
+            if x0 == x1 and y0 == y1:
+                return
+            e2 = 2 * err
+            if e2 >= dy:
+                err += dy
+                x0 += sx
+            if e2 <= dx:
+                err += dx
+                y0 += sy
+
+    def text(self, s, x, y, c=1):
+        self.texts[(x, y)] = s
+        for n, ch in enumerate(s):
+            code = ord(ch)
+            if code == 0x20:
+                continue
+            for col in range(1, 7):
+                bits = ((code * 0x9e3779b1) >> (col * 4)) & 0x7e
+                for row in range(8):
+                    if bits & (1 << row):
+                        self.pixel(x + n * 8 + col, y + row, c)
+
+    def scroll(self, xstep, ystep):
+        old = bytes(self.buf)
+        src = FrameBuffer(bytearray(old), self.width, self.height)
+        for y in range(self.height):
+            for x in range(self.width):
+                sx = x - xstep
+                sy = y - ystep
+                if 0 <= sx < self.width and 0 <= sy < self.height:
+                    self.pixel(x, y, src.pixel(sx, sy))
+
+    def blit(self, fbuf, x, y, key=-1, palette=None):
+        for yy in range(fbuf.height):
+            for xx in range(fbuf.width):
+                c = fbuf.pixel(xx, yy)
+                if c != key:
+                    self.pixel(x + xx, y + yy, c)
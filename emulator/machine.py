@@ -0,0 +1,180 @@
+#
+# MicroPython machine module for the emulator (I2C, Pin)
+#
+# Copyright (c) 2025 ha864git
+#
+# License: MIT
+#
+# I2C(id) and Pin(id) are connected to the emulator.board.Board set by
+# emulator.install(). Every transaction is counted per bus address and, on a
+# virtual clock, takes its transfer time at the bus frequency.
+#
+import errno
+
+board = None                        # emulator.board.Board, set by emulator.install()
+
+class Halt(BaseException):
+
+    """ Raised by the board hardware to stop a running main program """
+
+def disable_irq():
+    return 0
+
+def enable_irq(state=0):
+    pass
+
+def freq(hz=None):
+    return 125000000
+
+def unique_id():
+    return b'\xe6\x61\x38\x00\x00\x00\x00\x00'
+
+def reset():
+    raise Halt('machine.reset()')
+
+def soft_reset():
+    raise Halt('machine.soft_reset()')
+
+def idle():
+    pass
+
+class Pin:
+
+    IN = 0
+    OUT = 1
+    OPEN_DRAIN = 2
+    PULL_UP = 1
+    PULL_DOWN = 2
+    IRQ_FALLING = 4
+    IRQ_RISING = 8
+
+    def __new__(cls, id, mode=-1, pull=-1, value=None):
+        pin = board.pin(id)
+        pin.init(mode, pull, value)
+        return pin
+
+    @classmethod
+    def create(cls, id):
+        pin = object.__new__(cls)
+        pin.id = id
+        pin.mode = cls.IN
+        pin.pull = None
+        pin.level = None                    # level driven from outside, None = floating
+        pin.out = 0
+        pin.handler = None
+        pin.trigger = 0
+        pin.changes = 0
+        return pin
+
+    def __init__(self, id, mode=-1, pull=-1, value=None):
+        pass
+
+    def init(self, mode=-1, pull=-1, value=None):
+        if mode != -1:
+            self.mode = mode
+        if pull != -1:
+            self.pull = pull
+        if value is not None:
+            self.out = 1 if value else 0
+
+    def value(self, v=None):
+        if v is None:
+            if self.mode == self.OUT:
+                return self.out
+            if self.level is not None:
+                return self.level
+            return 1 if self.pull == self.PULL_UP else 0
+        v = 1 if v else 0
+        if v != self.out:
+            self.changes += 1
+        self.out = v
+
+    def on(self):
+        self.value(1)
+
+    def off(self):
+        self.value(0)
+
+    def toggle(self):
+        self.value(1 - self.out)
+
+    def irq(self, handler=None, trigger=IRQ_FALLING | IRQ_RISING, hard=False):
+        self.handler = handler
+        self.trigger = trigger
+
+    def drive(self, level):
+
+        """ Drive an input from outside (a button), the irq handler runs on a matching edge """
+
+        old = self.value()
+        self.level = None if level is None else (1 if level else 0)
+        new = self.value()
+        if self.handler is None or new == old:
+            return
+        if (new and self.trigger & self.IRQ_RISING) or (not new and self.trigger & self.IRQ_FALLING):
+            self.handler(self)
+
+class I2C:
+
+    """ machine.I2C on an emulated bus
+
+    Missing devices raise OSError(EIO) like the RP2040 port.
+
+    """
+
+    def __init__(self, id, scl=None, sda=None, freq=400000, timeout=50000):
+        self.id = id
+        self.freq = freq
+        self.bus = board.i2c_bus(id)
+
+    def device(self, addr):
+        device = self.bus.devices.get(addr)
+        if device is None:
+            raise OSError(errno.EIO)
+        return device
+
+    def transfer(self, addr, nbytes, write):
+        self.bus.count(addr, nbytes, write, self.freq)
+
+    def scan(self):
+        self.bus.check()
+        return sorted(self.bus.devices)
+
+    def writeto(self, addr, buf, stop=True):
+        device = self.device(addr)
+        data = bytes(buf)
+        self.transfer(addr, len(data), True)
+        device.write(addr, data)
+        return len(data) + 1
+
+    def writevto(self, addr, vector, stop=True):
+        return self.writeto(addr, b''.join(bytes(b) for b in vector), stop)
+
+    def readfrom(self, addr, nbytes, stop=True):
+        device = self.device(addr)
+        self.transfer(addr, nbytes, False)
+        return bytes(device.read(addr, nbytes))
+
+    def readfrom_into(self, addr, buf, stop=True):
+        buf[:] = self.readfrom(addr, len(buf), stop)
+
+    def writeto_mem(self, addr, memaddr, buf, addrsize=8):
+        self.writeto(addr, bytes((memaddr,)) + bytes(buf))
+
+    def readfrom_mem(self, addr, memaddr, nbytes, addrsize=8):
+        device = self.device(addr)
+        self.transfer(addr, 1, True)
+        device.write(addr, bytes((memaddr,)))
+        return self.readfrom(addr, nbytes)
+
+    def readfrom_mem_into(self, addr, memaddr, buf, addrsize=8):
+        buf[:] = self.readfrom_mem(addr, memaddr, len(buf), addrsize)
+
+class SoftI2C(I2C):
+
+    """ machine.SoftI2C, one emulated bus per SCL pin: board.i2c_bus(('soft', scl)) """
+
+    def __init__(self, scl, sda, freq=400000, timeout=50000):
+        self.id = ('soft', scl.id)
+        self.freq = freq
+        self.bus = board.i2c_bus(self.id)
@@ -0,0 +1,28 @@
+#
+# MicroPython micropython module for the emulator
+#
+# Copyright (c) 2025 ha864git
+#
+# License: MIT
+#
+
+def const(value):
+    return value
+
+def native(function):
+    return function
+
+def viper(function):
+    return function
+
+def alloc_emergency_exception_buf(size):
+    pass
+
+def schedule(function, arg):
+    function(arg)
+
+def opt_level(level=None):
+    return 0
+
+def mem_info(verbose=False):
+    pass
@@ -0,0 +1,357 @@
+#
+# Register-level model of the RDA5807M FM tuner
+#
+# Copyright (c) 2025 ha864git
+#
+# License: MIT
+#
+# The model answers on both bus addresses of the chip:
+#   0x10 sequential access, writes start at 0x02, reads start at 0x0A
+#   0x11 random access, the first written byte is the register address
+#
+# Tune and seek take time (tune_ms, seek_step_ms per channel) measured on the
+# emulator clock; STC, SF, READCHAN, RSSI, FM_TRUE and ST follow the station
+# map. RDS groups arrive every group_ms while RDS is enabled and the tuned
+# station has groups; groups can also be injected with block error levels.
+#
+import json
+
+SEQUENTIAL_ACCESS_ADDRESS = 0x10
+RANDOM_ACCESS_ADDRESS = 0x11
+
+REG_CHIPID = 0x00
+REG_CONFIG = 0x02
+REG_TUNING = 0x03
+REG_VOLUME = 0x05
+REG_BLEND = 0x07
+REG_STATUS = 0x0A
+REG_RSSI = 0x0B
+REG_RDSA = 0x0C
+NREGS = 0x40
+
+CONFIG_SEEKUP = 0x0200
+CONFIG_SEEK = 0x0100
+CONFIG_SKMODE = 0x0080
+CONFIG_RDS = 0x0008
+CONFIG_RESET = 0x0002
+CONFIG_ENABLE = 0x0001
+TUNING_TUNE = 0x0010
+BLEND_65M_50M = 0x0200
+
+STATUS_RDSR = 0x8000
+STATUS_STC = 0x4000
+STATUS_SF = 0x2000
+STATUS_RDSS = 0x1000
+STATUS_ST = 0x0400
+RSSI_FMTRUE = 0x0100
+RSSI_FMREADY = 0x0080
+
+# power-on values from the datasheet
+DEFAULTS = {
+    0x00: 0x5804,
+    0x04: 0x0400,
+    0x05: 0x888b,
+    0x07: 0x4202,
+}
+
+BAND_START_KHZ = (87000, 76000, 76000, 65000)
+BAND_END_KHZ = (108000, 91000, 108000, 76000)
+SPACE_KHZ = (100, 200, 50, 25)
+
+OP_NONE = 0
+OP_TUNE = 1
+OP_SEEK = 2
+
+def ps_groups(pi, ps):
+
+    """ The four 0A groups of a PS name """
+
+    ps = (ps + ' ' * 8)[:8].encode()
+    return [(pi, addr, 0xe0cd, (ps[addr * 2] << 8) | ps[addr * 2 + 1]) for addr in range(4)]
+
+def rt_groups(pi, rt, ab=0):
+
+    """ The 2A groups of a RadioText, terminated by a carriage return when shorter than 64 """
+
+    rt = rt.encode()[:64]
+    if len(rt) < 64:
+        rt += b'\r'
+    rt += b' ' * (-len(rt) % 4)
+    groups = []
+    for addr in range(len(rt) // 4):
+        p = addr * 4
+        groups.append((pi, 0x2000 | (ab << 4) | addr, (rt[p] << 8) | rt[p + 1], (rt[p + 2] << 8) | rt[p + 3]))
+    return groups
+
+class Station:
+
+    """ A transmitter of the station map
+
+    arguments:
+    rssi                    - RSSI 0-127 on its channel
+    stereo                  - pilot tone present
+    snr                     - compared with SEEKTH by seek (default rssi // 4)
+    pi                      - RDS PI code, None = no RDS
+    ps, rt                  - PS name and RadioText sent as 0A and 2A groups
+    bler                    - block error level (0-3) of its groups
+
+    """
+
+    def __init__(self, rssi=50, stereo=True, snr=None, pi=None, ps=None, rt=None, bler=0):
+        self.rssi = rssi
+        self.stereo = stereo
+        self.snr = rssi // 4 if snr is None else snr
+        self.pi = pi
+        self.bler = bler
+        self.groups = []
+        if pi is not None:
+            if ps:
+                self.groups += ps_groups(pi, ps)
+            if rt:
+                self.groups += rt_groups(pi, rt)
+
+class RDA5807M:
+
+    """ RDA5807M on an emulated I2C bus
+
+    arguments:
+    clock                   - emulator.clock.Clock
+    tune_ms                 - time from TUNE to STC
+    seek_step_ms            - time per channel of a seek
+    group_ms                - RDS group interval (11.4 groups/s)
+    noise_rssi              - RSSI of a channel without a station
+
+    """
+
+    addresses = (SEQUENTIAL_ACCESS_ADDRESS, RANDOM_ACCESS_ADDRESS)
+
+    def __init__(self, clock, tune_ms=10, seek_step_ms=10, group_ms=88, noise_rssi=8):
+        self.clock = clock
+        self.tune_us = tune_ms * 1000
+        self.seek_step_us = seek_step_ms * 1000
+        self.group_us = group_ms * 1000
+        self.noise_rssi = noise_rssi
+        self.stations = {}                  # kHz -> Station
+        self.regs = [0] * NREGS
+        self.pointer = 0                    # random access register pointer
+        self.injected = []                  # (a, b, c, d, blera, blerb) delivered before the station groups
+        self.tunes = 0
+        self.seeks = 0
+        self.reads = 0
+        self.writes = 0
+        self.reset()
+
+    def reset(self):
+        for i in range(NREGS):
+            self.regs[i] = DEFAULTS.get(i, 0)
+        self.chan = 0
+        self.op = OP_NONE
+        self.op_us = 0                      # next tune/seek event
+        self.seek_start = 0
+        self.tuned_us = 0
+        self.group_slot = 0
+        self.group_index = 0
+        self.rds_valid = False
+
+    # -- station map --
+
+    def add_station(self, khz, **kwargs):
+
+        """ Put a Station(**kwargs) on khz, returns it """
+
+        station = Station(**kwargs)
+        self.stations[khz] = station
+        return station
+
+    def load_stations(self, path, region=None, rssi=48):
+
+        """ Stations of a stations.json region, PS names are the OLED names """
+
+        with open(path) as f:
+            data = json.load(f)
+        presets = data['regions'][region or data['default_region']]['stations']
+        for i, (khz, name, label) in enumerate(presets):
+            self.add_station(khz, rssi=rssi + (i * 7) % 24, stereo=(i % 3) != 0, pi=0x1000 + i, ps=name[:8], rt=label)
+
+    def inject(self, a, b, c, d, blera=0, blerb=0):
+
+        """ Deliver a group at the next group slots, ahead of the station groups """
+
+        self.injected.append((a, b, c, d, blera, blerb))
+
+    # -- channel arithmetic --
+
+    def band(self):
+        return (self.regs[REG_TUNING] >> 2) & 0x03
+
+    def space_khz(self):
+        return SPACE_KHZ[self.regs[REG_TUNING] & 0x03]
+
+    def start_khz(self):
+        band = self.band()
+        if band == 3 and not self.regs[REG_BLEND] & BLEND_65M_50M:
+            return 50000
+        return BAND_START_KHZ[band]
+
+    def nchan(self):
+        return (BAND_END_KHZ[self.band()] - self.start_khz()) // self.space_khz() + 1
+
+    def khz(self, chan=None):
+        return self.start_khz() + (self.chan if chan is None else chan) * self.space_khz()
+
+    def station(self, chan=None):
+        return self.stations.get(self.khz(chan))
+
+    def rssi(self):
+        station = self.station()
+        return station.rssi if station is not None else self.noise_rssi
+
+    # -- time --
+
+    def update(self):
+
+        """ Advance tune, seek and RDS to the current time """
+
+        now = self.clock.us()
+        regs = self.regs
+        if self.op == OP_TUNE and now >= self.op_us:
+            self.chan = (regs[REG_TUNING] >> 6) % self.nchan()
+            regs[REG_TUNING] &= ~TUNING_TUNE
+            self.complete(now, False)
+        while self.op == OP_SEEK and now >= self.op_us:
+            self.seek_step(now)
+        if self.op == OP_NONE and self.rds_on():
+            slot = (now - self.tuned_us) // self.group_us
+            while self.group_slot < slot:
+                self.group_slot += 1
+                self.next_group()
+        regs[REG_STATUS] = self.status()
+        regs[REG_RSSI] = (regs[REG_RSSI] & 0x000f) | self.rssi_bits()
+
+    def complete(self, now, failed):
+        regs = self.regs
+        regs[REG_STATUS] = (regs[REG_STATUS] & ~STATUS_SF) | STATUS_STC | (STATUS_SF if failed else 0)
+        regs[REG_CONFIG] &= ~CONFIG_SEEK
+        self.op = OP_NONE
+        self.tuned_us = now
+        self.group_slot = 0
+        self.group_index = 0
+        self.rds_valid = False
+
+    def seek_step(self, now):
+        regs = self.regs
+        nchan = self.nchan()
+        step = 1 if regs[REG_CONFIG] & CONFIG_SEEKUP else -1
+        chan = self.chan + step
+        if chan < 0 or chan >= nchan:
+            if regs[REG_CONFIG] & CONFIG_SKMODE:
+                self.complete(self.op_us, True)     # stop at the band limit
+                return
+            chan %= nchan
+        self.chan = chan
+        self.op_us += self.seek_step_us
+        station = self.station()
+        seekth = (regs[REG_VOLUME] >> 8) & 0x0f
+        if station is not None and station.snr >= seekth:
+            self.complete(self.op_us, False)
+        elif chan == self.seek_start:
+            self.complete(self.op_us, True)         # wrapped around without a station
+
+    def rds_on(self):
+        return (self.regs[REG_CONFIG] & (CONFIG_RDS | CONFIG_ENABLE)) == (CONFIG_RDS | CONFIG_ENABLE)
+
+    def next_group(self):
+        regs = self.regs
+        if self.injected:
+            a, b, c, d, blera, blerb = self.injected.pop(0)
+        else:
+            station = self.station()
+            if station is None or not station.groups:
+                return
+            a, b, c, d = station.groups[self.group_index % len(station.groups)]
+            self.group_index += 1
+            blera = blerb = station.bler
+        regs[REG_RDSA] = a
+        regs[REG_RDSA + 1] = b
+        regs[REG_RDSA + 2] = c
+        regs[REG_RDSA + 3] = d
+        regs[REG_RSSI] = (regs[REG_RSSI] & ~0x000f) | (blera << 2) | blerb
+        self.rds_valid = True
+
+    def status(self):
+        regs = self.regs
+        st = regs[REG_STATUS] & (STATUS_STC | STATUS_SF)
+        if self.op != OP_NONE:
+            st = 0
+        station = self.station()
+        if station is not None and station.stereo and self.op == OP_NONE:
+            st |= STATUS_ST
+        if self.rds_valid and self.rds_on():
+            st |= STATUS_RDSR | STATUS_RDSS
+        return st | self.chan
+
+    def rssi_bits(self):
+        if not self.regs[REG_CONFIG] & CONFIG_ENABLE:
+            return 0
+        bits = (self.rssi() << 9) | RSSI_FMREADY
+        if self.station() is not None:
+            bits |= RSSI_FMTRUE
+        return bits
+
+    # -- register writes --
+
+    def store(self, reg, value):
+        regs = self.regs
+        old = regs[reg]
+        regs[reg] = value
+        if reg == REG_CONFIG:
+            if value & CONFIG_RESET:
+                self.reset()
+                regs[REG_CONFIG] = value & ~CONFIG_RESET
+                return
+            if value & CONFIG_SEEK and not old & CONFIG_SEEK and value & CONFIG_ENABLE:
+                self.seeks += 1
+                self.op = OP_SEEK
+                self.seek_start = self.chan
+                self.op_us = self.clock.us() + self.seek_step_us
+                regs[REG_STATUS] &= ~(STATUS_STC | STATUS_SF)
+            elif not value & CONFIG_SEEK and self.op == OP_SEEK:
+                self.op = OP_NONE           # seek stopped by the host
+        elif reg == REG_TUNING and value & TUNING_TUNE and regs[REG_CONFIG] & CONFIG_ENABLE:
+            self.tunes += 1
+            self.op = OP_TUNE
+            self.op_us = self.clock.us() + self.tune_us
+            regs[REG_STATUS] &= ~(STATUS_STC | STATUS_SF)
+
+    # -- I2C device interface --
+
+    def write(self, addr, data):
+        self.update()
+        self.writes += 1
+        if addr == SEQUENTIAL_ACCESS_ADDRESS:
+            reg = REG_CONFIG
+            words = data
+        else:
+            if not data:
+                return
+            reg = data[0]
+            words = data[1:]
+            self.pointer = reg
+        for i in range(0, len(words) - 1, 2):
+            self.store(reg % NREGS, (words[i] << 8) | words[i + 1])
+            reg += 1
+        self.update()
+
+    def read(self, addr, n):
+        self.update()
+        self.reads += 1
+        reg = REG_STATUS if addr == SEQUENTIAL_ACCESS_ADDRESS else self.pointer
+        out = bytearray(n)
+        for i in range(0, n - 1, 2):
+            value = self.regs[reg % NREGS]
+            out[i] = value >> 8
+            out[i + 1] = value & 0xff
+            reg += 1
+        if addr == RANDOM_ACCESS_ADDRESS:
+            self.pointer = reg % NREGS
+        return out
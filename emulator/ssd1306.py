@@ -0,0 +1,232 @@
+#
+# SSD1306 for the emulator: the MicroPython driver and a model of the display
+#
+# Copyright (c) 2025 ha864git
+#
+# License: MIT
+#
+# SSD1306_I2C has the interface of the MicroPython ssd1306 driver and sends the
+# same I2C transactions. SSD1306 is the display on the bus: it interprets the
+# command stream (addressing window, display on/off, ...), keeps the display
+# RAM and records a frame after every data transfer.
+#
+from micropython import const
+import framebuf
+
+SET_CONTRAST = const(0x81)
+SET_ENTIRE_ON = const(0xA4)
+SET_NORM_INV = const(0xA6)
+SET_DISP = const(0xAE)
+SET_MEM_ADDR = const(0x20)
+SET_COL_ADDR = const(0x21)
+SET_PAGE_ADDR = const(0x22)
+SET_DISP_START_LINE = const(0x40)
+SET_SEG_REMAP = const(0xA0)
+SET_MUX_RATIO = const(0xA8)
+SET_IREF_SELECT = const(0xAD)
+SET_COM_OUT_DIR = const(0xC0)
+SET_DISP_OFFSET = const(0xD3)
+SET_COM_PIN_CFG = const(0xDA)
+SET_DISP_CLK_DIV = const(0xD5)
+SET_PRECHARGE = const(0xD9)
+SET_VCOM_DESEL = const(0xDB)
+SET_CHARGE_PUMP = const(0x8D)
+
+ADDRESS = 0x3C
+
+# argument bytes of the commands with arguments
+COMMAND_ARGS = {
+    SET_CONTRAST: 1, SET_MEM_ADDR: 1, SET_COL_ADDR: 2, SET_PAGE_ADDR: 2, SET_MUX_RATIO: 1,
+    SET_IREF_SELECT: 1, SET_DISP_OFFSET: 1, SET_COM_PIN_CFG: 1, SET_DISP_CLK_DIV: 1,
+    SET_PRECHARGE: 1, SET_VCOM_DESEL: 1, SET_CHARGE_PUMP: 1,
+}
+
+class SSD1306_I2C(framebuf.FrameBuffer):
+
+    """ MicroPython ssd1306.SSD1306_I2C """
+
+    def __init__(self, width, height, i2c, addr=ADDRESS, external_vcc=False):
+        self.i2c = i2c
+        self.addr = addr
+        self.temp = bytearray(2)
+        self.write_list = [b'\x40', None]   # Co=0, D/C#=1
+        self.width = width
+        self.height = height
+        self.external_vcc = external_vcc
+        self.pages = self.height // 8
+        self.buffer = bytearray(self.pages * self.width)
+        super().__init__(self.buffer, self.width, self.height, framebuf.MONO_VLSB)
+        self.init_display()
+
+    def init_display(self):
+        for cmd in (
+            SET_DISP,
+            SET_MEM_ADDR, 0x00,
+            SET_DISP_START_LINE,
+            SET_SEG_REMAP | 0x01,
+            SET_MUX_RATIO, self.height - 1,
+            SET_COM_OUT_DIR | 0x08,
+            SET_DISP_OFFSET, 0x00,
+            SET_COM_PIN_CFG, 0x02 if self.width > 2 * self.height else 0x12,
+            SET_DISP_CLK_DIV, 0x80,
+            SET_PRECHARGE, 0x22 if self.external_vcc else 0xF1,
+            SET_VCOM_DESEL, 0x30,
+            SET_CONTRAST, 0xFF,
+            SET_ENTIRE_ON,
+            SET_NORM_INV,
+            SET_IREF_SELECT, 0x30,
+            SET_CHARGE_PUMP, 0x10 if self.external_vcc else 0x14,
+            SET_DISP | 0x01,
+        ):
+            self.write_cmd(cmd)
+        self.fill(0)
+        self.show()
+
+    def poweroff(self):
+        self.write_cmd(SET_DISP)
+
+    def poweron(self):
+        self.write_cmd(SET_DISP | 0x01)
+
+    def contrast(self, contrast):
+        self.write_cmd(SET_CONTRAST)
+        self.write_cmd(contrast)
+
+    def invert(self, invert):
+        self.write_cmd(SET_NORM_INV | (invert & 1))
+
+    def rotate(self, rotate):
+        self.write_cmd(SET_COM_OUT_DIR | ((rotate & 1) << 3))
+        self.write_cmd(SET_SEG_REMAP | (rotate & 1))
+
+    def show(self):
+        x0 = 0
+        x1 = self.width - 1
+        if self.width != 128:
+            col_offset = (128 - self.width) // 2
+            x0 += col_offset
+            x1 += col_offset
+        self.write_cmd(SET_COL_ADDR)
+        self.write_cmd(x0)
+        self.write_cmd(x1)
+        self.write_cmd(SET_PAGE_ADDR)
+        self.write_cmd(0)
+        self.write_cmd(self.pages - 1)
+        self.write_data(self.buffer)
+
+    def write_cmd(self, cmd):
+        self.temp[0] = 0x80                 # Co=1, D/C#=0
+        self.temp[1] = cmd
+        self.i2c.writeto(self.addr, self.temp)
+
+    def write_data(self, buf):
+        self.write_list[1] = buf
+        self.i2c.writevto(self.addr, self.write_list)
+
+class SSD1306:
+
+    """ 128x64 SSD1306 on an emulated I2C bus, horizontal addressing mode
+
+    arguments:
+    clock                   - emulator.clock.Clock, frames are stamped with ticks_us
+    max_frames              - frames kept in frames (oldest dropped)
+
+    """
+
+    addresses = (ADDRESS,)
+
+    def __init__(self, clock, width=128, height=64, max_frames=256):
+        self.clock = clock
+        self.width = width
+        self.pages = height // 8
+        self.ram = bytearray(width * self.pages)
+        self.max_frames = max_frames
+        self.frames = []                    # (ticks_us, bytes of the display RAM)
+        self.frame_count = 0
+        self.data_bytes = 0
+        self.cmd_bytes = 0
+        self.on = False
+        self.contrast = 0x7f
+        self.pending = []                   # command waiting for its arguments
+        self.col0 = 0
+        self.col1 = width - 1
+        self.page0 = 0
+        self.page1 = self.pages - 1
+        self.col = 0
+        self.page = 0
+
+    def command(self, byte):
+        self.cmd_bytes += 1
+        pending = self.pending
+        if not pending:
+            if byte in COMMAND_ARGS:
+                pending.append(byte)
+            elif byte & 0xfe == SET_DISP:
+                self.on = (byte & 1) != 0
+            return
+        pending.append(byte)
+        if len(pending) <= COMMAND_ARGS[pending[0]]:
+            return
+        cmd = pending[0]
+        if cmd == SET_COL_ADDR:
+            self.col0, self.col1 = pending[1] & 0x7f, pending[2] & 0x7f
+            self.col = self.col0
+        elif cmd == SET_PAGE_ADDR:
+            self.page0, self.page1 = pending[1] & 0x07, pending[2] & 0x07
+            self.page = self.page0
+        elif cmd == SET_CONTRAST:
+            self.contrast = pending[1]
+        pending.clear()
+
+    def data(self, byte):
+        self.data_bytes += 1
+        if self.col < self.width and self.page < self.pages:
+            self.ram[self.page * self.width + self.col] = byte
+        if self.col >= self.col1:
+            self.col = self.col0
+            self.page = self.page0 if self.page >= self.page1 else self.page + 1
+        else:
+            self.col += 1
+
+    # -- I2C device interface --
+
+    def write(self, addr, data):
+        i = 0
+        while i < len(data):
+            control = data[i]
+            i += 1
+            if control & 0x40:                      # D/C# = 1, data until the end
+                for byte in data[i:]:
+                    self.data(byte)
+                self.record()
+                return
+            if i < len(data):
+                self.command(data[i])
+                i += 1
+            if not control & 0x80:                  # Co = 0, only commands follow
+                for byte in data[i:]:
+                    self.command(byte)
+                return
+
+    def read(self, addr, n):
+        return bytes(n)                             # status byte, not used
+
+    def record(self):
+        self.frame_count += 1
+        self.frames.append((self.clock.ticks_us(), bytes(self.ram)))
+        if len(self.frames) > self.max_frames:
+            self.frames.pop(0)
+
+    def pixel(self, x, y):
+        return (self.ram[(y >> 3) * self.width + x] >> (y & 7)) & 1
+
+    def render(self, frame=None):
+
+        """ The display RAM (or a recorded frame) as text, '#' = pixel on """
+
+        ram = self.ram if frame is None else frame
+        lines = []
+        for y in range(self.pages * 8):
+            lines.append(''.join('#' if (ram[(y >> 3) * self.width + x] >> (y & 7)) & 1 else '.'
+                                 for x in range(self.width)))
+        return '\n'.join(lines)
@@ -0,0 +1,402 @@
+#
+# Band scan engine and persistent channel-quality index
+#
+# Copyright (c) 2025 ha864git
+#
+# License: MIT
+#
+# ChannelIndex keeps two bytes per channel:
+#   rssi[chan]   RSSI 0-127, RSSI_UNKNOWN = never measured
+#   flags[chan]  bit0 FM_TRUE, bit1 stereo, bits[7:2] age in steps of age_ms (saturating)
+# Entries age by time, not by sweeps: a radio that is always playing never
+# sweeps, and its entries still have to go stale.
+#
+# Index file format (version 1, big endian):
+#   'CHIX' version(B) band(B) space(B) reserved(B) nchan(H) sweeps(H) rssi[nchan] flags[nchan]
+#
+try:
+    import uasyncio as asyncio
+except ImportError:
+    import asyncio
+import os
+import struct
+import time
+
+import radioRDA5807
+
+RSSI_UNKNOWN = 0xff
+FLG_FMTRUE = 0x01
+FLG_STEREO = 0x02
+AGE_SHIFT = 2
+AGE_MAX = 0x3f
+
+INDEX_MAGIC = b'CHIX'
+INDEX_VERSION = 1
+INDEX_HEADER = '>4sBBBBHH'
+INDEX_FILE = 'chindex.bin'
+AGE_MS = 900000                 # every entry gets one step older every 15 minutes
+
+def band_channels(band, space):
+
+    """ Number of addressable channels of a BAND/SPACE setting, 321 for 76–108 MHz at 100 kHz """
+
+    span = radioRDA5807.BAND_END_KHZ[band] - radioRDA5807.BAND_START_KHZ[band]
+    return min(span // radioRDA5807.SPACE_KHZ[space], radioRDA5807.CHAN_MAX) + 1
+
+class ChannelIndex:
+
+    """ Per-channel RSSI, FM_TRUE and stereo of a band
+
+    arguments:
+    band, space             - BAND_/SPACE_ setting of the channel numbers
+    age_ms                  - time for one age step of every entry
+
+    """
+
+    def __init__(self, band=radioRDA5807.BAND_WIDE, space=radioRDA5807.SPACE_100K, age_ms=AGE_MS):
+        self.band = band
+        self.space = space
+        self.nchan = band_channels(band, space)
+        self.rssi = bytearray(self.nchan)
+        self.flags = bytearray(self.nchan)
+        self.sweeps = 0
+        self.age_ms = age_ms
+        self.aged_ms = time.ticks_ms()
+        self.dirty = False
+        self.clear()
+
+    def clear(self):
+        for i in range(self.nchan):
+            self.rssi[i] = RSSI_UNKNOWN
+            self.flags[i] = AGE_MAX << AGE_SHIFT
+
+    def matches(self, radio):
+
+        """ True if the index was built for the band and spacing of radio """
+
+        return self.band == radio.profile.band and self.space == radio.profile.space
+
+    def record(self, chan, rssi, fm_true, stereo):
+
+        """ Store a measurement of chan (age 0) """
+
+        if chan >= self.nchan:
+            return
+        self.rssi[chan] = rssi
+        self.flags[chan] = (FLG_FMTRUE if fm_true else 0) | (FLG_STEREO if stereo else 0)
+        self.dirty = True
+
+    def age(self, chan):
+        return self.flags[chan] >> AGE_SHIFT
+
+    def known(self, chan):
+        return self.rssi[chan] != RSSI_UNKNOWN
+
+    def fm_true(self, chan):
+        return (self.flags[chan] & FLG_FMTRUE) != 0
+
+    def stereo(self, chan):
+        return (self.flags[chan] & FLG_STEREO) != 0
+
+    def sweep_done(self):
+
+        """ A full sweep has completed """
+
+        self.sweeps = (self.sweeps + 1) & 0xffff
+        self.dirty = True
+
+    def poll_age(self):
+
+        """ Make every entry one step older per age_ms passed, returns True if they aged
+
+        Not marked dirty: ages alone are not worth a flash write, they are
+        saved with the next measurement.
+
+        """
+
+        steps = time.ticks_diff(time.ticks_ms(), self.aged_ms) // self.age_ms
+        if steps <= 0:
+            return False
+        self.aged_ms = time.ticks_add(self.aged_ms, steps * self.age_ms)
+        steps = min(steps, AGE_MAX)
+        flags = self.flags
+        for i in range(self.nchan):
+            age = min((flags[i] >> AGE_SHIFT) + steps, AGE_MAX)
+            flags[i] = (flags[i] & ((1 << AGE_SHIFT) - 1)) | (age << AGE_SHIFT)
+        return True
+
+    def save(self, path=INDEX_FILE):
+
+        """ Write the index to flash (write a temporary file, then rename) """
+
+        tmp = path + '.tmp'
+        with open(tmp, 'wb') as f:
+            f.write(struct.pack(INDEX_HEADER, INDEX_MAGIC, INDEX_VERSION, self.band, self.space, 0, self.nchan, self.sweeps))
+            f.write(self.rssi)
+            f.write(self.flags)
+        os.rename(tmp, path)
+        self.dirty = False
+
+    @classmethod
+    def load(cls, path=INDEX_FILE, band=radioRDA5807.BAND_WIDE, space=radioRDA5807.SPACE_100K):
+
+        """ Read an index file, returns a new empty index if it is missing, corrupt or for another band """
+
+        index = cls(band, space)
+        try:
+            with open(path, 'rb') as f:
+                header = f.read(struct.calcsize(INDEX_HEADER))
+                if len(header) != struct.calcsize(INDEX_HEADER):
+                    return index
+                magic, version, fband, fspace, reserved, nchan, sweeps = struct.unpack(INDEX_HEADER, header)
+                if magic != INDEX_MAGIC or version != INDEX_VERSION or fband != band or fspace != space or nchan != index.nchan:
+                    return index
+                if f.readinto(index.rssi) != nchan or f.readinto(index.flags) != nchan:
+                    index.clear()
+                    return index
+                index.sweeps = sweeps
+        except (OSError, ValueError):
+            index.clear()
+        return index
+
+SCAN_IDLE = 0
+SCAN_TUNING = 1
+SCAN_SETTLING = 2
+SCAN_RESTORING = 3              # tuning back to the channel the scan started on
+
+class BandScanner:
+
+    """ Steps the tuner through the band and records each channel in a ChannelIndex
+
+    arguments:
+    radio                   - RadioRDA5807
+    index                   - ChannelIndex for the band/spacing of radio
+    settle_ms               - wait after tune complete before RSSI/FM_TRUE/stereo are read
+    mute                    - mute the audio while scanning
+
+    """
+
+    def __init__(self, radio, index, settle_ms=30, mute=True):
+        self.radio = radio
+        self.index = index
+        self.settle_ms = settle_ms
+        self.mute = mute
+        self.state = SCAN_IDLE
+        self.cursor = 0                     # next channel of incremental scans
+        self.remaining = 0
+        self.chan = 0
+        self.restore_chan = None
+        self.was_muted = False
+        self.settle_until = 0
+        self.scanned = 0
+        self.on_measured = None             # called with (chan, RadioStatus) after each record
+
+    def busy(self):
+        return self.state != SCAN_IDLE
+
+    def start(self, count=None, restore=True):
+
+        """ Start scanning count channels from the cursor (None = the whole band) """
+
+        if count is None:
+            count = self.index.nchan
+        self.remaining = count
+        self.restore_chan = self.radio.read_status_block().channel if restore else None
+        self.was_muted = self.radio.mute_flag
+        if self.mute and not self.was_muted:
+            self.radio.mute(True)
+        self.next_channel()
+
+    def next_channel(self):
+        if self.remaining <= 0:
+            self.finish()
+            return
+        self.remaining -= 1
+        self.chan = self.cursor
+        self.cursor += 1
+        if self.cursor >= self.index.nchan:
+            self.cursor = 0
+        self.radio.tuner.start_tune(self.chan)
+        self.state = SCAN_TUNING
+
+    def stop(self):
+
+        """ Abandon the scan, the tuner stays where it is and is not unmuted """
+
+        self.state = SCAN_IDLE
+        self.remaining = 0
+
+    def finish(self):
+
+        """ Start the restore tune, poll() unmutes when it is done """
+
+        if self.restore_chan is not None:
+            self.radio.tuner.start_tune(self.restore_chan)
+            self.state = SCAN_RESTORING
+        else:
+            self.restored()
+
+    def restored(self):
+        self.state = SCAN_IDLE
+        if self.mute and not self.was_muted:
+            self.radio.mute(False)
+
+    def poll(self):
+
+        """ Advance the scan, returns True while scanning """
+
+        if self.state == SCAN_TUNING:
+            if self.radio.tuner.poll() >= radioRDA5807.ENGINE_COMPLETE:
+                self.settle_until = time.ticks_add(time.ticks_ms(), self.settle_ms)
+                self.state = SCAN_SETTLING
+        elif self.state == SCAN_SETTLING:
+            if time.ticks_diff(time.ticks_ms(), self.settle_until) >= 0:
+                st = self.radio.read_status_block()
+                self.index.record(self.chan, st.rssi, st.fm_true, st.stereo)
+                self.scanned += 1
+                if self.on_measured is not None:
+                    self.on_measured(self.chan, st)
+                if self.cursor == 0:
+                    self.index.sweep_done()
+                self.next_channel()
+        elif self.state == SCAN_RESTORING:
+            if self.radio.tuner.poll() >= radioRDA5807.ENGINE_COMPLETE:
+                self.restored()
+        return self.busy()
+
+    def ms_until_poll(self):
+        if self.state == SCAN_SETTLING:
+            return max(0, time.ticks_diff(self.settle_until, time.ticks_ms()))
+        return self.radio.tuner.ms_until_poll()
+
+    def scan(self, count=None, restore=True):
+
+        """ Blocking scan of count channels (None = the whole band) """
+
+        self.start(count, restore)
+        while self.poll():
+            time.sleep_ms(self.ms_until_poll())
+
+    async def run(self, count=None, restore=True):
+
+        """ Awaitable scan of count channels (None = the whole band) """
+
+        self.start(count, restore)
+        while self.poll():
+            await asyncio.sleep(self.ms_until_poll() / 1000)
+
+class StationNavigator:
+
+    """ Next/previous station from the channel index with one direct tune
+
+    Every successful tune and seek of the radio is recorded in the index. A
+    station is a channel with FM_TRUE, RSSI >= rssi_threshold and an age of at
+    most max_age steps of the index age_ms. Hardware seek is used only when the index has no such
+    channel or the direct tune finds no signal.
+
+    arguments:
+    radio                   - RadioRDA5807
+    index                   - ChannelIndex for the band/spacing of radio
+    rssi_threshold          - minimum RSSI of a station
+    max_age                 - entries older than this many age steps are stale
+    settle_ms               - wait after the direct tune before it is validated
+
+    """
+
+    def __init__(self, radio, index, rssi_threshold=20, max_age=8, settle_ms=20):
+        self.radio = radio
+        self.index = index
+        self.rssi_threshold = rssi_threshold
+        self.max_age = max_age
+        self.settle_ms = settle_ms
+        self.direct_tunes = 0
+        self.hardware_seeks = 0
+        radio.tuner.on_tuned = self.learn
+
+    def learn(self, status):
+        self.index.record(status.channel, status.rssi, status.fm_true, status.stereo)
+
+    def is_station(self, chan):
+        index = self.index
+        return (index.known(chan) and index.fm_true(chan) and index.rssi[chan] >= self.rssi_threshold
+                and index.age(chan) <= self.max_age)
+
+    def find(self, chan, direction):
+
+        """ Nearest station above (SEEK_UP) or below chan, wrapping at the band edge, None if none """
+
+        self.index.poll_age()
+        nchan = self.index.nchan
+        step = 1 if direction == radioRDA5807.SEEK_UP else nchan - 1
+        for i in range(nchan - 1):
+            chan = (chan + step) % nchan
+            if self.is_station(chan):
+                return chan
+        return None
+
+    def step(self, direction, on_progress=None, on_complete=None, wait=True):
+
+        """ Go to the next station in direction (SEEK_UP/SEEK_DOWN), blocks for the direct tune
+
+        Returns ENGINE_COMPLETE after a good direct tune, otherwise the hardware
+        seek is started and ENGINE_SEEKING (wait=False) or its final state is returned.
+
+        """
+
+        tuner = self.radio.tuner
+        chan = self.find(self.radio.read_status_block().channel, direction)
+        if chan is not None:
+            tuner.start_tune(chan)
+            if tuner.run() == radioRDA5807.ENGINE_COMPLETE:
+                time.sleep_ms(self.settle_ms)
+                if self.validate(on_complete):
+                    return radioRDA5807.ENGINE_COMPLETE
+        self.hardware_seeks += 1
+        tuner.start_seek(direction, on_progress, on_complete)
+        if wait:
+            return tuner.run()
+        return tuner.state
+
+    async def run(self, direction, on_progress=None, on_complete=None):
+
+        """ Awaitable step(), other tasks run during the direct tune and the settle time
+
+        Returns the final state, or the state of a tune or seek started by
+        someone else meanwhile (that one is not followed).
+
+        """
+
+        tuner = self.radio.tuner
+        chan = self.find(self.radio.read_status_block().channel, direction)
+        if chan is not None:
+            tuner.start_tune(chan)
+            if await tuner.wait() == radioRDA5807.ENGINE_COMPLETE:
+                await asyncio.sleep(self.settle_ms / 1000)
+                if tuner.state != radioRDA5807.ENGINE_COMPLETE:
+                    return tuner.state
+                if self.validate(on_complete):
+                    return radioRDA5807.ENGINE_COMPLETE
+            elif tuner.state == radioRDA5807.ENGINE_IDLE:
+                return tuner.state              # aborted
+        self.hardware_seeks += 1
+        tuner.start_seek(direction, on_progress, on_complete)
+        return await tuner.wait()
+
+    def validate(self, on_complete):
+
+        """ Re-validate the entry of a direct tune, True (and on_complete called) if it is a station """
+
+        st = self.radio.read_status_block()
+        self.learn(st)
+        if st.fm_true and st.rssi >= self.rssi_threshold:
+            self.direct_tunes += 1
+            if on_complete:
+                on_complete(radioRDA5807.ENGINE_COMPLETE)
+            return True
+        return False
+
+    def next_station(self, on_progress=None, on_complete=None, wait=True):
+        return self.step(radioRDA5807.SEEK_UP, on_progress, on_complete, wait)
+
+    def prev_station(self, on_progress=None, on_complete=None, wait=True):
+        return self.step(radioRDA5807.SEEK_DOWN, on_progress, on_complete, wait)
@@ -0,0 +1,99 @@
+#
+# Heap allocation of the register I/O hot path, measured with gc.mem_alloc()
+#
+# On the emulator: python -m emulator pico/bench_alloc.py --seconds 60
+# (CPython has no gc.mem_alloc(), tracemalloc reports the memory the calls
+# keep instead of all they allocate)
+#
+# Copyright (c) 2025 ha864git
+#
+# License: MIT
+#
+# Runs each polling operation of the main loop many times with the garbage
+# collector disabled and reports the heap growth. The hot path should report
+# 0 bytes; anything else shows up as GC pauses on the device. The operations
+# run on the bare I2C and again through i2cbus clients.
+#
+import gc
+import i2cbus
+import radioRDA5807
+
+from machine import Pin, I2C
+
+ROUNDS = 1000
+
+try:
+    mem_alloc = gc.mem_alloc
+except AttributeError:                  # CPython (emulator): no gc.mem_alloc, trace the heap instead
+    import os
+    import tracemalloc
+    mem_alloc = None
+    # only what the radio modules allocate, not the emulated board or this script
+    TRACED = (tracemalloc.Filter(True, os.path.join(os.path.dirname(radioRDA5807.__file__), '*')),
+              tracemalloc.Filter(False, __file__))
+
+def allocated(func, rounds):
+    if mem_alloc is None:
+        # reference counting frees a temporary at once: what is left is the
+        # memory the calls keep (queues, lists that grow), the garbage they
+        # make on the device only gc.mem_alloc() sees
+        tracemalloc.start()
+        for i in range(rounds):         # the values it replaces are traced from here on, counters
+            func()                      # are past the small int cache (MicroPython: no objects)
+        before = tracemalloc.take_snapshot().filter_traces(TRACED)
+        for i in range(rounds):
+            func()
+        after = tracemalloc.take_snapshot().filter_traces(TRACED)
+        tracemalloc.stop()
+        return sum(stat.size_diff for stat in after.compare_to(before, 'filename'))
+    before = mem_alloc()
+    for i in range(rounds):
+        func()
+    return mem_alloc() - before
+
+def measure(name, func, rounds=ROUNDS):
+    func()                              # first call may allocate (attribute caches, ...)
+    gc.collect()
+    gc.disable()
+    delta = allocated(func, rounds)
+    gc.enable()
+    print('{:24s} {:6d} bytes / {} calls {}'.format(name, delta, rounds, 'ok' if delta == 0 else 'ALLOCATES'))
+    return delta
+
+def run_radio(prefix, i2c, rds_i2c=None):
+    radio = radioRDA5807.RadioRDA5807(i2c)
+    if not radio.address_found:
+        print('RDA5807 not found')
+        return None
+    radio.set_frequency_khz(80000)
+    volume = radio.get_volume()
+    buf = bytearray(radioRDA5807.STATUS_BLOCK_REGS * 2)
+    total = 0
+    total += measure(prefix + 'read_status_block', radio.read_status_block)
+    total += measure(prefix + 'get_signal_strength', radio.get_signal_strength)
+    total += measure(prefix + 'get_frequency_khz', radio.get_frequency_khz)
+    total += measure(prefix + 'get_channel', radio.get_channel)
+    total += measure(prefix + 'read_reg', lambda: radio.read_reg(radioRDA5807.RDA5807M_REG_VOLUME))
+    total += measure(prefix + 'write_reg', lambda: radio.write_reg(radioRDA5807.RDA5807M_REG_VOLUME, radio.shadow[radioRDA5807.RDA5807M_REG_VOLUME]))
+    total += measure(prefix + 'read_regs', lambda: radio.read_regs(radioRDA5807.RDA5807M_REG_STATUS, buf))
+    total += measure(prefix + 'get_volume', radio.get_volume)
+    total += measure(prefix + 'set_volume', lambda: radio.set_volume(volume))
+    total += measure(prefix + 'tuner.poll', radio.tuner.poll)
+    if rds_i2c is not None:
+        total += measure(prefix + 'rds read', lambda: radio.read_status_block(rds_i2c))
+        total += measure(prefix + 'rds rdsr', lambda: radio.read_rdsr(rds_i2c))
+    return total
+
+def run(i2c):
+    total = run_radio('', i2c)
+    if total is None:
+        return
+    # the same through the BusClients of the app; immediate clients, since a
+    # deferred write queues a job by design
+    bus = i2cbus.BusManager(i2c)
+    total += run_radio('bus.', bus.client(i2cbus.PRIO_TUNER), bus.client(i2cbus.PRIO_RDS))
+    print('PASS' if total == 0 else 'FAIL')
+    return total
+
+if __name__ == '__main__':
+    run(I2C(0, sda=Pin(4), scl=Pin(5)))
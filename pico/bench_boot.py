@@ -0,0 +1,150 @@
+#
+# Benchmark of RDA5807 bring-up: the legacy random access write sequence
+# against the sequential access RadioProfile burst, and the time the event loop
+# stalls in each flash write of the app's flash task
+#
+# On the emulator: python -m emulator pico/bench_boot.py
+#
+# Copyright (c) 2025 ha864git
+#
+# License: MIT
+#
+import bandscan
+import os
+import radioRDA5807
+import siglog
+import statejournal
+import time
+
+from machine import Pin, I2C
+
+class CountingI2C:
+
+    """ I2C proxy counting transactions and bytes """
+
+    def __init__(self, i2c):
+        self.i2c = i2c
+        self.reset()
+
+    def reset(self):
+        self.transactions = 0
+        self.bytes = 0
+
+    def scan(self):
+        self.transactions += 1
+        return self.i2c.scan()
+
+    def writeto(self, addr, buf):
+        self.transactions += 1
+        self.bytes += len(buf)
+        return self.i2c.writeto(addr, buf)
+
+    def readfrom(self, addr, nbytes):
+        self.transactions += 1
+        self.bytes += nbytes
+        return self.i2c.readfrom(addr, nbytes)
+
+    def readfrom_into(self, addr, buf):
+        self.transactions += 1
+        self.bytes += len(buf)
+        return self.i2c.readfrom_into(addr, buf)
+
+    def writeto_mem(self, addr, memaddr, buf):
+        self.transactions += 1
+        self.bytes += len(buf) + 1
+        return self.i2c.writeto_mem(addr, memaddr, buf)
+
+    def readfrom_mem_into(self, addr, memaddr, buf):
+        self.transactions += 2              # address write, repeated start, read
+        self.bytes += len(buf) + 1
+        return self.i2c.readfrom_mem_into(addr, memaddr, buf)
+
+def legacy_init(radio):
+
+    """ Register writes of the original RadioRDA5807.__init__ """
+
+    config = radioRDA5807.RDA5807M_REG_CONFIG_FLG_DHIZ | radioRDA5807.RDA5807M_REG_CONFIG_FLG_DMUTE | radioRDA5807.RDA5807M_REG_CONFIG_FLG_ENABLE
+    radio.write_reg(radioRDA5807.RDA5807M_REG_CONFIG, config | radioRDA5807.RDA5807M_REG_CONFIG_FLG_RESET)
+    radio.write_reg(radioRDA5807.RDA5807M_REG_TUNING, radioRDA5807.RDA5807M_REG_TUNING_BAND_WIDE | radioRDA5807.RDA5807M_REG_TUNING_SPACE_100K)
+    radio.write_reg(radioRDA5807.RDA5807M_REG_GPIO, radioRDA5807.RDA5807M_REG_GPIO_FLG_DE | radioRDA5807.RDA5807M_REG_GPIO_FLG_SOFTMUTE_EN)
+    radio.write_reg(radioRDA5807.RDA5807M_REG_VOLUME, radioRDA5807.RDA5807M_REG_VOLUME_FLG_INTMODE | radioRDA5807.RDA5807M_REG_VOLUME_DATA_SEEKTH | radioRDA5807.RDA5807M_REG_VOLUME_DATA_VOLUME)
+    radio.write_reg(radioRDA5807.RDA5807M_REG_I2S, radioRDA5807.RDA5807M_REG_I2S_DATA_DEFAULT)
+    radio.write_reg(radioRDA5807.RDA5807M_REG_BLEND, radioRDA5807.RDA5807M_REG_BLEND_DATA_TH_SOFRBLEND | radioRDA5807.RDA5807M_REG_BLEND_FLG_SOFTBLEND_EN)
+    radio.write_reg(radioRDA5807.RDA5807M_REG_CONFIG, config | radioRDA5807.RDA5807M_REG_CONFIG_FLG_NEW)
+    # the boot sequence of main.py
+    radio.set_volume(3)
+    radio.mono(True)
+    radio.bass_boost(True)
+
+def profile_init(radio):
+
+    """ Soft reset followed by one burst of the boot profile """
+
+    config = radioRDA5807.RDA5807M_REG_CONFIG_FLG_DHIZ | radioRDA5807.RDA5807M_REG_CONFIG_FLG_DMUTE | radioRDA5807.RDA5807M_REG_CONFIG_FLG_ENABLE
+    radio.write_reg(radioRDA5807.RDA5807M_REG_CONFIG, config | radioRDA5807.RDA5807M_REG_CONFIG_FLG_RESET)
+    radio.apply_profile(radioRDA5807.RadioProfile(volume=3, mono=True, bass=True))
+
+def measure(name, func, radio, bus, rounds=20):
+    bus.reset()
+    t = time.ticks_us()
+    for i in range(rounds):
+        func(radio)
+    elapsed = time.ticks_diff(time.ticks_us(), t) / rounds
+    transactions = bus.transactions / rounds
+    print('{:8s} {:5.1f} transactions {:6.1f} bytes {:8.1f} us'.format(name, transactions, bus.bytes / rounds, elapsed))
+    return transactions, elapsed
+
+def measure_flash(name, func, rounds=8):
+    worst = 0
+    total = 0
+    for i in range(rounds):
+        t = time.ticks_us()
+        func(i)
+        us = time.ticks_diff(time.ticks_us(), t)
+        total += us
+        worst = max(worst, us)
+    print('{:16s} {:8d} us avg {:8d} us max'.format(name, total // rounds, worst))
+
+def run_flash():
+
+    """ Each kind of flash write the flash task does, on scratch files """
+
+    journal = statejournal.StateJournal('bench_state.bin', max_records=4)
+
+    def journal_write(i):
+        journal.note(80000 + i * 100, 3, False, True, True, -1)
+        journal.flush()                     # every 4th write compacts: tmp file and rename
+
+    log = siglog.SignalLog('bench_log.bin', blocks=4, interval_ms=0)
+    status = radioRDA5807.RadioStatus()
+
+    def log_block(i):
+        for j in range(siglog.BLOCK_RECORDS):
+            log.sample(status)
+        log.poll()
+
+    index = bandscan.ChannelIndex()
+
+    def index_save(i):
+        index.save('bench_index.bin')
+
+    measure_flash('journal', journal_write)
+    measure_flash('siglog block', log_block)
+    measure_flash('index save', index_save)
+    for path in ('bench_state.bin', 'bench_log.bin', 'bench_index.bin'):
+        os.remove(path)
+
+def run(i2c):
+    bus = CountingI2C(i2c)
+    radio = radioRDA5807.RadioRDA5807(bus, shadow=False)
+    if not radio.address_found:
+        print('RDA5807 not found')
+        return
+    legacy = measure('legacy', legacy_init, radio, bus)
+    radio.shadow_enabled = True
+    burst = measure('profile', profile_init, radio, bus)
+    print('transactions x{:.1f}, time x{:.1f}'.format(legacy[0] / burst[0], legacy[1] / burst[1]))
+
+if __name__ == '__main__':
+    run(I2C(0, sda=Pin(4), scl=Pin(5)))
+    run_flash()
@@ -0,0 +1,296 @@
+#
+# Compact binary BLE protocol, runs alongside the text protocol
+#
+# Copyright (c) 2025 ha864git
+#
+# License: MIT
+#
+# A binary frame starts with MAGIC (never the first byte of a text command) and
+# the protocol version, followed by records [opcode, length, payload]:
+#
+#   frame   = MAGIC VERSION record*
+#   record  = opcode(B) length(B) payload[length]
+#
+# The frame and record layout and OP_ERROR stay the same in every version, so a
+# client speaking another version still understands the OP_ERROR reply. A
+# record always fits one frame of mtu bytes.
+#
+# Requests (WebBLE -> device)
+#   OP_HELLO       -                          answered with OP_HELLO version(B), full status follows
+#   OP_STATUS      -                          full status
+#   OP_DUMP        -                          OP_REGS records of registers 0x00-0x0F
+#   OP_TUNE        kHz(>I)
+#   OP_SEEK        direction(B)               SEEK_UP/SEEK_DOWN
+#   OP_VOLUME      volume(B)
+#   OP_SET_FLAGS   mask(B) value(B)           FLG_MUTE/FLG_BASS/FLG_MONO
+#   OP_WRITE_REG   reg(B) value(>H)           answered with the OP_REGS record of reg
+#   OP_HISTORY     [first(B)]                 OP_HISTORY records from sample first (0 = oldest)
+#   OP_LOG         [first(>I)]                OP_LOG records of up to LOG_CHUNK log records from
+#                                             serial first (0 = oldest kept)
+#
+# Notifications (device -> WebBLE), only changed fields are sent and several
+# records share one notification of at most mtu bytes
+#   OP_FREQ        kHz(>I)
+#   OP_RSSI        rssi(B)
+#   OP_VOLUME      volume(B)
+#   OP_FLAGS       flags(B)                   FLG_STEREO/FLG_MUTE/FLG_BASS/FLG_MONO/FLG_FMTRUE
+#   OP_REGS        first(B) value(>H)*        consecutive registers
+#   OP_HISTORY     first(B) total(B) sample*  RSSI history, bits[6:0] RSSI, bit7 stereo,
+#                                             complete when first + samples == total
+#   OP_LOG         first(>I) end(>I) record*  siglog records (8 bytes each) from serial first,
+#                                             ask again from first + records until it reaches end
+#   OP_ERROR       code(B) detail(B)          ERR_VERSION: the frame had another version,
+#                                             detail = the device's version
+#
+import struct
+
+MAGIC = 0xB5
+VERSION = 1
+
+OP_HELLO = 0x01
+OP_STATUS = 0x02
+OP_DUMP = 0x03
+OP_TUNE = 0x10
+OP_SEEK = 0x11
+OP_VOLUME = 0x12
+OP_SET_FLAGS = 0x13
+OP_WRITE_REG = 0x14
+OP_HISTORY = 0x15
+OP_LOG = 0x16
+OP_FREQ = 0x20
+OP_RSSI = 0x21
+OP_FLAGS = 0x22
+OP_REGS = 0x23
+OP_ERROR = 0x24
+
+FLG_STEREO = 0x01
+FLG_MUTE = 0x02
+FLG_BASS = 0x04
+FLG_MONO = 0x08
+FLG_FMTRUE = 0x10
+
+ERR_VERSION = 1
+
+# shortest payload of each request with arguments, shorter records are skipped
+PAYLOAD_MIN = {
+    OP_TUNE: 4,
+    OP_SEEK: 1,
+    OP_VOLUME: 1,
+    OP_SET_FLAGS: 2,
+    OP_WRITE_REG: 3,
+}
+
+DUMP_REGS = 16
+LOG_CHUNK = 16
+LOG_RECORD_SIZE = 8             # siglog.RECORD_SIZE
+
+class BinaryProtocol:
+
+    """ Binary frames of one BLE connection
+
+    arguments:
+    app                     - radioapp.RadioApp
+    mtu                     - notification payload size, at least 20 (20 fits the default ATT MTU)
+
+    """
+
+    def __init__(self, app, mtu=20):
+        self.app = app
+        self.radio = app.radio
+        self.mtu = mtu
+        self.frame = bytearray(mtu)
+        self.length = 0
+        self.reg_buf = bytearray(DUMP_REGS * 2)
+        self.history_buf = bytearray(mtu - 6)
+        self.log_buf = bytearray(max(1, (mtu - 12) // LOG_RECORD_SIZE) * LOG_RECORD_SIZE)
+        self.active = False                 # the client has spoken binary
+        self.frames_sent = 0
+        self.bytes_sent = 0
+        self.forget()
+
+    def forget(self):
+
+        """ Forget what the client knows, the next status is sent in full """
+
+        self.khz = -1
+        self.rssi = -1
+        self.volume = -1
+        self.flags = -1
+
+    def is_frame(self, data):
+        return len(data) >= 2 and data[0] == MAGIC
+
+    def coalesce_key(self, data):
+
+        """ Queue key of a frame holding a single OP_TUNE or OP_VOLUME record, else None """
+
+        if len(data) >= 4 and len(data) == 4 + data[3] and (data[2] == OP_TUNE or data[2] == OP_VOLUME):
+            return data[2]
+        return None
+
+    # -- outgoing --
+
+    def begin(self):
+        self.frame[0] = MAGIC
+        self.frame[1] = VERSION
+        self.length = 2
+
+    def record(self, opcode, payload):
+
+        """ Append a record, the frame is sent first if the record does not fit, raises ValueError if no frame holds it """
+
+        n = len(payload) + 2
+        if n > self.mtu - 2:
+            raise ValueError('record larger than the mtu')
+        if self.length + n > self.mtu:
+            self.flush()
+        frame = self.frame
+        frame[self.length] = opcode
+        frame[self.length + 1] = len(payload)
+        frame[self.length + 2:self.length + n] = payload
+        self.length += n
+
+    def flush(self):
+        if self.length > 2:
+            self.app.ble.send(self.frame[:self.length])
+            self.frames_sent += 1
+            self.bytes_sent += self.length
+        self.begin()
+
+    def status(self):
+
+        """ Send the fields that changed since the last status (one status block read) """
+
+        radio = self.radio
+        st = radio.read_status_block()
+        khz = st.khz
+        flags = ((FLG_STEREO if st.stereo else 0) | (FLG_MUTE if radio.mute_flag else 0) |
+                 (FLG_BASS if radio.bass_boost_flag else 0) | (FLG_MONO if radio.mono_flag else 0) |
+                 (FLG_FMTRUE if st.fm_true else 0))
+        volume = radio.get_volume()
+        self.begin()
+        if khz != self.khz:
+            self.khz = khz
+            self.record(OP_FREQ, struct.pack('>I', khz))
+        if st.rssi != self.rssi:
+            self.rssi = st.rssi
+            self.record(OP_RSSI, bytes((st.rssi,)))
+        if volume != self.volume:
+            self.volume = volume
+            self.record(OP_VOLUME, bytes((volume,)))
+        if flags != self.flags:
+            self.flags = flags
+            self.record(OP_FLAGS, bytes((flags,)))
+        self.flush()
+
+    def regs(self, first, count):
+
+        """ Send registers first..first+count-1 as OP_REGS records, split to the mtu """
+
+        buf = memoryview(self.reg_buf)[:count * 2]
+        self.radio.read_regs(first, buf)
+        per_record = (self.mtu - 2 - 3) // 2
+        i = 0
+        while i < count:
+            n = min(per_record, count - i)
+            self.record(OP_REGS, bytes((first + i,)) + bytes(buf[i * 2:(i + n) * 2]))
+            i += n
+
+    def history(self, first):
+
+        """ Send the RSSI history from sample first as OP_HISTORY records, split to the mtu """
+
+        monitor = self.app.monitor
+        if monitor is None:
+            self.record(OP_HISTORY, bytes((0, 0)))
+            return
+        total = monitor.count
+        buf = self.history_buf
+        while True:
+            n = monitor.history(buf, first)
+            self.record(OP_HISTORY, bytes((first, total)) + bytes(buf[:n]))
+            first += n
+            if first >= total or n == 0:
+                break
+
+    def log(self, first):
+
+        """ Send up to LOG_CHUNK records of the signal log from serial first as OP_LOG records """
+
+        signal_log = self.app.signal_log
+        if signal_log is None:
+            self.record(OP_LOG, bytes(8))
+            return
+        end = signal_log.end()
+        buf = self.log_buf
+        sent = 0
+        while True:
+            first, n = signal_log.read(first, memoryview(buf)[:min(len(buf), (LOG_CHUNK - sent) * LOG_RECORD_SIZE)])
+            self.record(OP_LOG, struct.pack('>II', first, end) + bytes(buf[:n * LOG_RECORD_SIZE]))
+            first += n
+            sent += n
+            if n == 0 or sent >= LOG_CHUNK or first >= end:
+                break
+
+    # -- incoming --
+
+    def handle(self, data):
+
+        """ Execute every record of a received frame """
+
+        self.active = True
+        if data[1] != VERSION:
+            self.begin()
+            self.record(OP_ERROR, bytes((ERR_VERSION, VERSION)))
+            self.flush()
+            return
+        app = self.app
+        radio = self.radio
+        pos = 2
+        self.begin()
+        while pos + 2 <= len(data):
+            opcode = data[pos]
+            end = pos + 2 + data[pos + 1]
+            if end > len(data):
+                break                       # truncated record
+            payload = data[pos + 2:end]
+            pos = end
+            if len(payload) < PAYLOAD_MIN.get(opcode, 0):
+                continue
+            if opcode == OP_HELLO:
+                self.record(OP_HELLO, bytes((VERSION,)))
+                self.forget()
+                app.update()
+            elif opcode == OP_STATUS:
+                self.forget()
+                app.update()
+            elif opcode == OP_DUMP:
+                self.regs(0, DUMP_REGS)
+            elif opcode == OP_TUNE:
+                app.tune_channel(radio.khz_to_channel(struct.unpack_from('>I', payload)[0]))
+            elif opcode == OP_SEEK:
+                if not radio.tuner.busy() or app.scanning():
+                    app.start_seek(payload[0])
+            elif opcode == OP_VOLUME:
+                app.set_volume(payload[0])
+            elif opcode == OP_SET_FLAGS:
+                mask, value = payload[0], payload[1]
+                if mask & FLG_MUTE:
+                    radio.mute((value & FLG_MUTE) != 0)
+                if mask & FLG_BASS:
+                    radio.bass_boost((value & FLG_BASS) != 0)
+                if mask & FLG_MONO:
+                    radio.mono((value & FLG_MONO) != 0)
+                app.update()
+            elif opcode == OP_WRITE_REG:
+                reg = payload[0]
+                value = (payload[1] << 8) | payload[2]
+                radio.write_reg(reg, value)
+                if radio.config_flags(reg, value):
+                    app.update()
+                self.regs(reg, 1)
+            elif opcode == OP_HISTORY:
+                self.history(payload[0] if payload else 0)
+            elif opcode == OP_LOG:
+                self.log(struct.unpack_from('>I', payload)[0] if len(payload) >= 4 else 0)
+        self.flush()
@@ -0,0 +1,59 @@
+#
+# Boot milestones in ticks_ms, reported on the console and over BLE
+#
+# Copyright (c) 2025 ha864git
+#
+# License: MIT
+#
+# main.py creates the BootLog before its other imports and marks each step of
+# the bring-up. ticks_ms() counts from reset, so the report shows both the time
+# since reset and the time since main.py started:
+#
+#   boot main 412 0
+#   boot audio 468 56           <- time to first audio
+#   ...
+#   boot end
+#
+import time
+
+class BootLog:
+
+    """ Named ticks_ms timestamps of the boot sequence
+
+    arguments:
+    size                    - milestones kept at most
+
+    """
+
+    def __init__(self, size=12):
+        self.size = size
+        self.names = []
+        self.ticks = [0] * size
+        self.mark('main')
+
+    def mark(self, name):
+
+        """ Record milestone name now """
+
+        n = len(self.names)
+        if n < self.size:
+            self.ticks[n] = time.ticks_ms()
+            self.names.append(name)
+
+    def ms(self, name):
+
+        """ Milliseconds from the start of main.py to milestone name, -1 if not reached """
+
+        for i in range(len(self.names)):
+            if self.names[i] == name:
+                return time.ticks_diff(self.ticks[i], self.ticks[0])
+        return -1
+
+    def report(self, out=print):
+
+        """ Send 'boot <name> <ms since reset> <ms since main>' lines to out """
+
+        start = self.ticks[0]
+        for i in range(len(self.names)):
+            out('boot {} {} {}'.format(self.names[i], self.ticks[i], time.ticks_diff(self.ticks[i], start)))
+        out('boot end')
@@ -0,0 +1,167 @@
+#
+#  interrupt driven button driver with timestamp debounce
+#
+#  Edges are taken in Pin.irq, debounced by a ticks_ms lockout window and
+#  queued in a preallocated ring buffer, so no press is lost between polls.
+#  Long press and auto-repeat are generated by poll(). Every edge sets the
+#  driver's flag, so the task taking the events only polls while idle() is False.
+#
+import machine
+import time
+from array import array
+
+EVT_PRESS = 1
+EVT_RELEASE = 2
+EVT_LONG = 3
+EVT_REPEAT = 4
+
+class Button(object):
+
+    """ One button of a ButtonDriver, is_on_edge() is compatible with swf.swf """
+
+    def __init__(self, driver, button_id, port, activate_value, repeat):
+        self.driver = driver
+        self.id = button_id
+        self.activate_value = activate_value
+        self.repeat = repeat
+        self.sw = machine.Pin(port, machine.Pin.IN, machine.Pin.PULL_UP)
+        self.pressed = self.sw.value() == activate_value
+        self.edge_ms = time.ticks_add(time.ticks_ms(), -driver.debounce_ms)   # last accepted edge
+        self.next_ms = 0                        # next long press / repeat event
+        self.long_sent = False
+        self.edges = 0                          # presses and repeats not yet taken by is_on_edge()
+        self.sw.irq(handler=self.irq, trigger=machine.Pin.IRQ_FALLING | machine.Pin.IRQ_RISING)
+
+    def irq(self, pin):
+        flag = self.driver.flag
+        if flag is not None:
+            flag.set()                          # also a bounce, poll() catches the level after the lockout
+        now = time.ticks_ms()
+        if time.ticks_diff(now, self.edge_ms) < self.driver.debounce_ms:
+            return                              # bounce inside the lockout window
+        self.driver.level(self, pin.value() == self.activate_value, now)
+
+    def is_on_edge(self):
+
+        """ True once for every press (and auto-repeat) since the last call """
+
+        state = machine.disable_irq()
+        edge = self.edges > 0
+        if edge:
+            self.edges -= 1
+        machine.enable_irq(state)
+        return edge
+
+class ButtonDriver(object):
+
+    """ Buttons sharing one event ring buffer
+
+    arguments:
+    size                    - ring buffer size in events
+    debounce_ms             - edges within this time of the last accepted edge are ignored
+    long_ms                 - hold time for EVT_LONG
+    repeat_delay_ms         - hold time before the first EVT_REPEAT
+    repeat_ms               - EVT_REPEAT interval
+
+    flag, when set (e.g. a ThreadSafeFlag), is set from the irq on every edge.
+
+    """
+
+    def __init__(self, size=32, debounce_ms=20, long_ms=800, repeat_delay_ms=400, repeat_ms=120):
+        self.debounce_ms = debounce_ms
+        self.long_ms = long_ms
+        self.repeat_delay_ms = repeat_delay_ms
+        self.repeat_ms = repeat_ms
+        self.buttons = []
+        self.size = size
+        self.codes = array('H', [0] * size)     # button_id << 4 | event
+        self.stamps = array('L', [0] * size)    # ticks_ms of the event
+        self.head = 0
+        self.count = 0
+        self.overflows = 0
+        self.flag = None
+
+    def add(self, port, activate_value=0, repeat=False):
+
+        """ Add a button on GPIO port, returns the Button (its id is the order of adding) """
+
+        button = Button(self, len(self.buttons), port, activate_value, repeat)
+        self.buttons.append(button)
+        return button
+
+    def push(self, button, event, now):
+        if event == EVT_PRESS or event == EVT_REPEAT:
+            button.edges += 1
+        if self.count >= self.size:
+            self.overflows += 1
+            return
+        i = (self.head + self.count) % self.size
+        self.codes[i] = (button.id << 4) | event
+        self.stamps[i] = now
+        self.count += 1
+
+    def level(self, button, pressed, now):
+
+        """ Accept a debounced level of button (called from irq and poll) """
+
+        if pressed == button.pressed:
+            return
+        button.pressed = pressed
+        button.edge_ms = now
+        if pressed:
+            button.long_sent = False
+            button.next_ms = time.ticks_add(now, self.repeat_delay_ms if button.repeat else self.long_ms)
+            self.push(button, EVT_PRESS, now)
+        else:
+            self.push(button, EVT_RELEASE, now)
+
+    def poll(self):
+
+        """ Catch edges lost in a lockout window and generate long press / repeat events """
+
+        now = time.ticks_ms()
+        for button in self.buttons:
+            if time.ticks_diff(now, button.edge_ms) >= self.debounce_ms:
+                state = machine.disable_irq()
+                self.level(button, button.sw.value() == button.activate_value, now)
+                machine.enable_irq(state)
+            if not button.pressed or time.ticks_diff(now, button.next_ms) < 0:
+                continue
+            state = machine.disable_irq()
+            if button.repeat:
+                self.push(button, EVT_REPEAT, now)
+                button.next_ms = time.ticks_add(now, self.repeat_ms)
+            elif not button.long_sent:
+                self.push(button, EVT_LONG, now)
+                button.long_sent = True
+            machine.enable_irq(state)
+
+    def idle(self):
+
+        """ True when poll() has nothing to do before the next edge: no button held, none in its lockout window """
+
+        now = time.ticks_ms()
+        for button in self.buttons:
+            if button.pressed or time.ticks_diff(now, button.edge_ms) < self.debounce_ms:
+                return False
+        return True
+
+    def pop(self):
+
+        """ Oldest event code (button_id << 4 | event) or -1 when empty """
+
+        state = machine.disable_irq()
+        if self.count == 0:
+            machine.enable_irq(state)
+            return -1
+        code = self.codes[self.head]
+        self.head = (self.head + 1) % self.size
+        self.count -= 1
+        machine.enable_irq(state)
+        return code
+
+    def last_stamp(self):
+
+        """ ticks_ms of the event returned by the last pop() """
+
+        return self.stamps[(self.head - 1) % self.size]
@@ -0,0 +1,259 @@
+#
+# Prioritised, write-combining scheduler of the shared I2C bus
+#
+# Copyright (c) 2025 ha864git
+#
+# License: MIT
+#
+# The tuner and the OLED share I2C(0). Every device gets a BusClient, which has
+# the interface of machine.I2C, from one BusManager:
+#
+#   bus = i2cbus.BusManager(i2c)
+#   radio = radioRDA5807.RadioRDA5807(bus.client(i2cbus.PRIO_TUNER, defer=True, pulse=radioRDA5807.is_pulse_write))
+#   rds_poller = rds.RDSPoller(radio, decoder, i2c=bus.client(i2cbus.PRIO_RDS))
+#   oled = ssd1306.SSD1306_I2C(128, 64, bus.client(i2cbus.PRIO_DISPLAY, defer=True, chunk=128))
+#
+# Reads and address probes (empty writes) are always done at once. Writes of a deferred client are queued and
+# sent by pump() (the bus task) in priority order, lowest PRIO_ first:
+#   - a write to the same register as the client's last queued write replaces
+#     it (volume ramps, sliders), unless the client's pulse(memaddr, data) says
+#     the queued write has an effect of its own (radioRDA5807.is_pulse_write:
+#     RESET, SEEK, TUNE)
+#   - a vector write [header, data] is sent in chunks of at most chunk data
+#     bytes, each with the header, one chunk per pump(), so a 1 KB framebuffer
+#     never holds up a tuner status poll for more than one chunk
+#   - a read first sends the queued writes of its own and higher priorities,
+#     so a device always sees its writes before the read
+# Every transaction and every queue change is done under one lock (a _thread
+# lock), so tasks and threads can share the bus without interleaving.
+#
+# Payloads up to COPY_MAX bytes are copied when queued; larger ones (frame
+# buffers) are referenced and may be sent with newer contents.
+#
+try:
+    import uasyncio as asyncio
+except ImportError:
+    import asyncio
+import _thread
+
+PRIO_TUNER = 0                  # tune/seek writes and status polls
+PRIO_RDS = 1                    # RDS group polls
+PRIO_DISPLAY = 2                # OLED commands and frame data
+
+JOB_WRITETO = 0
+JOB_WRITEVTO = 1
+JOB_WRITE_MEM = 2
+
+COPY_MAX = 16
+MAX_JOBS = 32
+
+class BusClient:
+
+    """ machine.I2C interface of one device on a BusManager
+
+    arguments:
+    bus                     - BusManager
+    priority                - PRIO_TUNER, PRIO_RDS or PRIO_DISPLAY
+    defer                   - queue writes for pump() instead of sending them at once
+    chunk                   - data bytes per transaction of a vector write, 0 = not split
+    pulse                   - function(memaddr, data), True if a queued register write must not be replaced
+
+    The polling transfers (readfrom_into, readfrom_mem_into and an immediate
+    writeto_mem) take the bus lock themselves instead of going through
+    BusManager.transfer(): no bound method, argument tuple or context manager,
+    so they do not allocate.
+
+    """
+
+    def __init__(self, bus, priority, defer=False, chunk=0, pulse=None):
+        self.bus = bus
+        self.priority = priority
+        self.defer = defer
+        self.chunk = chunk
+        self.pulse = pulse
+
+    def scan(self):
+        return self.bus.transfer(self, self.bus.i2c.scan)
+
+    def writeto(self, addr, buf, stop=True):
+        if self.defer and buf:              # an empty write is a probe, its NAK must reach the caller
+            return self.bus.submit(self, JOB_WRITETO, addr, 0, None, buf)
+        return self.bus.transfer(self, self.bus.i2c.writeto, addr, buf)
+
+    def writevto(self, addr, vector, stop=True):
+        if self.defer:
+            if len(vector) == 2:
+                return self.bus.submit(self, JOB_WRITEVTO, addr, 0, vector[0], vector[1])
+            return self.bus.submit(self, JOB_WRITETO, addr, 0, None, b''.join(vector))
+        return self.bus.transfer(self, self.bus.i2c.writevto, addr, vector)
+
+    def writeto_mem(self, addr, memaddr, buf, addrsize=8):
+        if self.defer:
+            return self.bus.submit(self, JOB_WRITE_MEM, addr, memaddr, None, buf)
+        bus = self.bus
+        bus.lock.acquire()
+        try:
+            bus.flush_locked(self.priority)
+            bus.sent += 1
+            bus.i2c.writeto_mem(addr, memaddr, buf)
+        finally:
+            bus.lock.release()
+
+    def readfrom(self, addr, nbytes, stop=True):
+        return self.bus.transfer(self, self.bus.i2c.readfrom, addr, nbytes)
+
+    def readfrom_into(self, addr, buf, stop=True):
+        bus = self.bus
+        bus.lock.acquire()
+        try:
+            bus.flush_locked(self.priority)
+            bus.sent += 1
+            bus.i2c.readfrom_into(addr, buf)
+        finally:
+            bus.lock.release()
+
+    def readfrom_mem(self, addr, memaddr, nbytes, addrsize=8):
+        return self.bus.transfer(self, self.bus.i2c.readfrom_mem, addr, memaddr, nbytes)
+
+    def readfrom_mem_into(self, addr, memaddr, buf, addrsize=8):
+        bus = self.bus
+        bus.lock.acquire()
+        try:
+            bus.flush_locked(self.priority)
+            bus.sent += 1
+            bus.i2c.readfrom_mem_into(addr, memaddr, buf)
+        finally:
+            bus.lock.release()
+
+class BusManager:
+
+    """ Owner of one I2C bus, schedules the transactions of its clients
+
+    arguments:
+    i2c                     - machine.I2C
+    max_jobs                - queued writes at most, a full queue is pumped by the writer
+
+    """
+
+    def __init__(self, i2c, max_jobs=MAX_JOBS):
+        self.i2c = i2c
+        self.max_jobs = max_jobs
+        self.lock = _thread.allocate_lock()
+        self.event = asyncio.Event()
+        self.jobs = []                  # [priority, seq, client, kind, addr, memaddr, header, data, offset]
+        self.seq = 0
+        self.sent = 0
+        self.chunks = 0
+        self.combined = 0
+        self.high_water = 0
+
+    def client(self, priority, defer=False, chunk=0, pulse=None):
+        return BusClient(self, priority, defer, chunk, pulse)
+
+    def transfer(self, client, function, *args):
+
+        """ Do one transaction at once, after the queued writes of the same or higher priority """
+
+        with self.lock:
+            self.flush_locked(client.priority)
+            self.sent += 1
+            return function(*args)
+
+    def submit(self, client, kind, addr, memaddr, header, data):
+
+        """ Queue a write, or replace the client's last queued write to the same register """
+
+        if len(data) <= COPY_MAX:
+            data = bytes(data)
+        while len(self.jobs) >= self.max_jobs:
+            self.pump()
+        with self.lock:
+            if kind == JOB_WRITE_MEM:
+                last = None
+                for job in self.jobs:
+                    if job[2] is client:
+                        last = job
+                if (last is not None and last[3] == JOB_WRITE_MEM and last[4] == addr and last[5] == memaddr
+                        and (client.pulse is None or not client.pulse(memaddr, last[7]))):
+                    last[7] = data
+                    self.combined += 1
+                    return
+            self.jobs.append([client.priority, self.seq, client, kind, addr, memaddr, header, data, 0])
+            self.seq += 1
+            if len(self.jobs) > self.high_water:
+                self.high_water = len(self.jobs)
+        self.event.set()
+
+    def next_job(self, priority):
+        best = None
+        for job in self.jobs:
+            if job[0] <= priority and (best is None or job[0] < best[0] or (job[0] == best[0] and job[1] < best[1])):
+                best = job
+        return best
+
+    def send(self, job):
+
+        """ Send a job or its next chunk, returns True when the job is done """
+
+        i2c = self.i2c
+        kind = job[3]
+        self.sent += 1
+        if kind == JOB_WRITE_MEM:
+            i2c.writeto_mem(job[4], job[5], job[7])
+            return True
+        if kind == JOB_WRITETO:
+            i2c.writeto(job[4], job[7])
+            return True
+        data = job[7]
+        chunk = job[2].chunk
+        offset = job[8]
+        if chunk == 0 or len(data) - offset <= chunk:
+            i2c.writevto(job[4], (job[6], memoryview(data)[offset:] if offset else data))
+            return True
+        i2c.writevto(job[4], (job[6], memoryview(data)[offset:offset + chunk]))
+        job[8] = offset + chunk
+        self.chunks += 1
+        return False
+
+    def flush_locked(self, priority):
+        job = self.next_job(priority)
+        while job is not None:
+            if self.send(job):
+                self.jobs.remove(job)
+            job = self.next_job(priority)
+
+    def pump(self):
+
+        """ Send the most urgent queued write (one chunk of a vector write), returns True if more are queued """
+
+        with self.lock:
+            job = self.next_job(PRIO_DISPLAY)
+            if job is not None and self.send(job):
+                self.jobs.remove(job)
+            return len(self.jobs) > 0
+
+    def flush(self):
+
+        """ Send everything queued """
+
+        with self.lock:
+            self.flush_locked(PRIO_DISPLAY)
+
+    def pending(self):
+        return len(self.jobs)
+
+    def stats(self):
+
+        """ 'pending max sent chunks combined' """
+
+        return '{} {} {} {} {}'.format(len(self.jobs), self.high_water, self.sent, self.chunks, self.combined)
+
+    async def run(self):
+
+        """ Bus task: sends the queue one transaction per step, other tasks run in between """
+
+        while True:
+            await self.event.wait()
+            self.event.clear()
+            while self.pump():
+                await asyncio.sleep(0)
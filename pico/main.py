@@ -1,51 +1,64 @@
+import bootlog
+# boot milestones in ticks_ms, printed when the app starts: time to first audio
+boot = bootlog.BootLog()
+
 import radioRDA5807
-import swf
-import ssd1306
+import stationdb
+import statejournal
+import i2cbus
 
 from machine import Pin, I2C
-import time
-
-stations = [
-    [76.4,"RADIO BERRY"],
-    [79.5,"NACK5"],
-    [78.0,"bayfm"],
-    [80.0,"TOKYO FM"],
-    [80.3,"NHK FM UTUNOMIYA"],
-    [80.7,"NHK FM CHIBA"],
-    [81.3,"J-WAVE"],
-    [81.6,"NHK FM GUNMA"],
-    [81.9,"NHK FM KANAGAWA"],
-    [82.5,"NHK FM TOKYO"],
-    [83.0,"FM-Fuji"],
-    [83.2,"NHK FM IBARAKI"],
-    [84.7,"Fm yokohama"],
-    [85.1,"NHK FM SAITAMA"],
-    [85.6,"NHK FM YAMANASHI"],
-    [86.3,"FM GUNMA"],
-    [89.7,"Inter FM"],
-    [90.5,"TBS RADIO"],
-    [90.9,"YAMANASHI HOUSOU"],
-    [91.6,"BUNKA HOUSOU"],
-    [92.4,"R-F-RADIO NIPPON"],
-    [93.0,"NIPPON HOUSOU"],
-    [94.1,"TOCHIGI HOUSOU"],
-    [94.6,"LuckyFM IBARAKI"]
-]
+
+# True: the radio engine owns the bus on core 1, the UI and BLE on core 0 never wait for I2C
+DUAL_CORE = False
+
+OLED_ADDRESS = 0x3C
 
 # setup the I2C communication
 i2c = I2C(0, sda=Pin(4), scl=Pin(5))
-
-# Set up the OLED display (128x64 pixels) on the I2C bus
+# the tuner and the OLED share the bus: tuner writes first, frame data in chunks, volume ramps combined
+bus = i2cbus.BusManager(i2c)
+
+# station presets shared with the WebBLE page (stations.json)
+stations = stationdb.StationDB(stationdb.STATIONS_FILE)
+
+# initialize RDA5807 with the boot profile in one burst write
+profile = radioRDA5807.RadioProfile(
+    band=stations.band,         # band and spacing of the preset region
+    space=stations.space,
+    volume=3,                   # volume(0 - 15)
+    mono=True,                  # force mono
+    bass=True,                  # enable bass boost
+    rds=True)                   # enable RDS/RBDS
+# last station, volume and flags: restored into the profile, tuned in the same burst
+journal = statejournal.StateJournal(statejournal.STATE_FILE)
+khz = journal.restore(profile)
+if khz is None and len(stations):
+    khz = stations.khz[0]       # first boot: the first preset
+if DUAL_CORE:
+    import radioengine
+    engine = radioengine.RadioEngine(bus)
+    engine.start()
+    radio_i2c = engine.i2c()
+else:
+    radio_i2c = bus.client(i2cbus.PRIO_TUNER, defer=True, pulse=radioRDA5807.is_pulse_write)
+radio = radioRDA5807.RadioRDA5807(radio_i2c, profile=profile, khz=khz)
+
+boot.mark('audio' if radio.address_found else 'no radio')
+
+# Set up the OLED display (128x64 pixels) on the I2C bus, after the radio is playing
 # SSD1306_I2C is a subclass of FrameBuffer. FrameBuffer provides support for graphics primitives.
 # http://docs.micropython.org/en/latest/pyboard/library/framebuf.html
-oled = ssd1306.SSD1306_I2C(128, 64, i2c)
+import ssd1306
+oled_i2c = bus.client(i2cbus.PRIO_DISPLAY, defer=True, chunk=128)
+if not radioRDA5807.probe(oled_i2c, OLED_ADDRESS):
+    print("OLED not found")
+oled = ssd1306.SSD1306_I2C(128, 64, oled_i2c)
 
 # Clear the display by filling it with black
 oled.fill(0)
 oled.show()
-
-# initialize RDA5807
-radio = radioRDA5807.RadioRDA5807(i2c)
+boot.mark('oled')
 
 # RDA5807 check
 if not radio.address_found:
@@ -54,83 +67,48 @@ if not radio.address_found:
         oled.text("Check the power", 0, 0)
         oled.text("switch.", 0, 16)
         oled.show()
+        bus.flush()
+
+# the rest is not needed for audio
+import bandscan
+import button
+import radioapp
+import rds
+import siglog
+import sigmon
+
+buttons = button.ButtonDriver()
+volume_up = buttons.add(21, repeat=True)    # button volume up      --> GP21 (hold to ramp)
+volume_down = buttons.add(20, repeat=True)  # button volume down    --> GP20 (hold to ramp)
+seek_station = buttons.add(19)              # button seek station   --> GP19
+select_station = buttons.add(18)            # button select station --> GP18 
+
+commands = [
+    (volume_up, radioapp.CMD_VOLUME_UP),
+    (volume_down, radioapp.CMD_VOLUME_DOWN),
+    (seek_station, radioapp.CMD_SEEK_UP),
+    (select_station, radioapp.CMD_NEXT_STATION),
+]
 
-radio.set_volume(3)             # volume(0 - 15)
-radio.mono(True)                # force mono
-radio.bass_boost(True)          # enable bass boost
-
-station = 0
-radio.set_frequency_MHz(stations[station][0])
-name = stations[station][1]
-fout = radio.get_frequency_MHz()
-print(fout, name)
-
-vm = radio.get_volume()
-print(vm)
-
-volume_up = swf.swf(21)         # button volume up      --> GP21
-volume_down = swf.swf(20)       # button volume down    --> GP20
-seek_station = swf.swf(19)      # button seek station   --> GP19
-select_station = swf.swf(18)    # button select station --> GP18 
-
-update_disp = True
-last_rssi = 0
-
-while True:
-
-    if volume_up.is_on_edge():
-        if vm < 15:
-            vm += 1
-            radio.set_volume(vm)
-            vm = radio.get_volume()
-            print(vm)
-            update_disp = True
-
-    if volume_down.is_on_edge():
-        if vm > 0:
-            vm -= 1
-            radio.set_volume(vm)
-            vm = radio.get_volume()
-            print(vm)
-            update_disp = True
-
-    if seek_station.is_on_edge():
-        oled.fill(0)
-        oled.text("-- seek up --", 0, 0)
-        oled.show()
-        radio.seek_up()
-        fout = radio.get_frequency_MHz()
-        name = ""
-        station = -1
-        for i in range(len(stations)):
-            if fout == stations[i][0]:
-                name = stations[i][1]
-                station = i
-                break
-        print(fout, name)
-        update_disp = True
-        
-    if select_station.is_on_edge():
-        station += 1
-        if station >= len(stations):
-            station = 0
-        radio.set_frequency_MHz(stations[station][0])
-        name = stations[station][1]
-        fout = radio.get_frequency_MHz()
-        print(fout, name)
-        update_disp = True
-
-    rssi = radio.get_signal_strength()
-    if rssi != last_rssi:
-        last_rssi = rssi
-        update_disp = True
-    
-    if update_disp:
-        oled.fill(0)
-        oled.text('RSSI:' + str(rssi), 0, 0)
-        oled.text(str(fout) + 'MHz Vol:' + str(vm), 0, 16)
-        oled.text(name, 0, 32)
-        oled.show()
-        update_disp = False
-
-    time.sleep(0.1)
\ No newline at end of file
+# channel-quality index, refreshed by idle rescans while muted
+index = bandscan.ChannelIndex.load(bandscan.INDEX_FILE, profile.band, profile.space)
+scanner = bandscan.BandScanner(radio, index)
+# seek button jumps to the next known station, learned from every tune and seek
+navigator = bandscan.StationNavigator(radio, index)
+# RDS groups, the PS name is shown for stations without a preset
+# (read at PRIO_RDS: after the queued tuner writes, never behind OLED frame chunks;
+# with the engine the status mailbox serves them)
+rds_poller = rds.RDSPoller(radio, rds.RDSDecoder(), i2c=None if DUAL_CORE else bus.client(i2cbus.PRIO_RDS))
+# smoothed RSSI sampled fast after a tune and slower when stable, with the sparkline history
+monitor = sigmon.SignalMonitor(radio)
+# channel, RSSI, stereo and FM_TRUE every 5 s into a 16 KB ring file, from the monitor samples
+# (export on the serial console after Ctrl-C: signal_log.export(print, 0, 100000))
+signal_log = siglog.SignalLog(siglog.LOG_FILE, profile.band, profile.space)
+
+app = radioapp.RadioApp(radio, oled, commands, stations, button_driver=buttons, scanner=scanner,
+                        navigator=navigator, rds_poller=rds_poller, monitor=monitor,
+                        bus=None if DUAL_CORE else bus, journal=journal,
+                        signal_log=signal_log)
+boot.mark('app')
+boot.report()
+app.run()
@@ -0,0 +1,173 @@
+#
+# Dirty-region renderer for the SSD1306 OLED
+#
+# Copyright (c) 2025 ha864git
+#
+# License: MIT
+#
+# Text fields are drawn into the framebuffer of ssd1306.SSD1306_I2C and only the
+# changed columns of the changed 8-pixel pages are sent, using the SSD1306
+# column/page address window, instead of the whole 1 KB framebuffer. A sparkline
+# keeps the bar heights on screen and only redraws the bars that changed.
+#
+import time
+
+SET_COL_ADDR = 0x21
+SET_PAGE_ADDR = 0x22
+WINDOW_CMD_BYTES = 12               # 6 commands, each sent with a control byte
+
+class OledView:
+
+    """ Text fields on an SSD1306 with page-level partial updates
+
+    arguments:
+    oled                    - ssd1306.SSD1306_I2C
+    max_fps                 - frame-rate cap of flush()
+    budget_bytes            - bytes sent per frame at most, the rest stays dirty for the next frame
+
+    """
+
+    def __init__(self, oled, max_fps=20, budget_bytes=512):
+        self.oled = oled
+        self.pages = oled.height // 8
+        self.col_offset = (128 - oled.width) // 2 if oled.width != 128 else 0
+        self.buffer = memoryview(oled.buffer)
+        self.lo = bytearray(self.pages)     # first dirty column of each page
+        self.hi = bytearray(self.pages)     # last dirty column of each page
+        self.clean()
+        self.fields = {}
+        self.sparklines = {}
+        self.frame_ms = 1000 // max_fps
+        self.budget_bytes = budget_bytes
+        self.last_frame_ms = time.ticks_add(time.ticks_ms(), -self.frame_ms)
+        self.bytes_last_frame = 0
+        self.bytes_total = 0
+        self.frames = 0
+
+    def clean(self):
+        for p in range(self.pages):
+            self.lo[p] = 0xff
+            self.hi[p] = 0
+
+    def add_field(self, name, x, y, chars=16):
+
+        """ Define a text field of chars characters at x, y """
+
+        self.fields[name] = [x, y, chars, None]
+
+    def set_text(self, name, text):
+
+        """ Draw text into field name, nothing is marked if the text did not change """
+
+        field = self.fields[name]
+        if field[3] == text:
+            return
+        field[3] = text
+        x, y, chars = field[0], field[1], field[2]
+        width = min(chars * 8, self.oled.width - x)
+        self.oled.fill_rect(x, y, width, 8, 0)
+        self.oled.text(text[:chars], x, y)
+        self.mark(x, y, x + width - 1, y + 7)
+
+    def add_sparkline(self, name, x, y, w, h, full_scale=64):
+
+        """ Define a w x h bar graph at x, y, values are clipped to full_scale """
+
+        self.sparklines[name] = (x, y, w, h, full_scale, bytearray(w))
+
+    def set_sparkline(self, name, values, n):
+
+        """ Draw values[0:n] (newest at the right edge), only the pixels of changed bars are drawn and marked """
+
+        x, y, w, h, full_scale, bars = self.sparklines[name]
+        oled = self.oled
+        n = min(n, w)
+        first = w - n
+        bottom = y + h
+        for i in range(w):
+            bar = 0
+            if i >= first:
+                v = values[i - first]
+                if v > full_scale:
+                    v = full_scale
+                bar = v * h // full_scale
+            old = bars[i]
+            if bar == old:
+                continue
+            bars[i] = bar
+            if bar > old:
+                oled.vline(x + i, bottom - bar, bar - old, 1)
+                self.mark(x + i, bottom - bar, x + i, bottom - old - 1)
+            else:
+                oled.vline(x + i, bottom - old, old - bar, 0)
+                self.mark(x + i, bottom - old, x + i, bottom - bar - 1)
+
+    def mark(self, x0, y0, x1, y1):
+
+        """ Mark the rectangle x0, y0 - x1, y1 (inclusive) as changed """
+
+        for p in range(y0 // 8, min(y1 // 8, self.pages - 1) + 1):
+            if x0 < self.lo[p]:
+                self.lo[p] = x0
+            if x1 > self.hi[p]:
+                self.hi[p] = x1
+
+    def mark_all(self):
+        self.mark(0, 0, self.oled.width - 1, self.oled.height - 1)
+
+    def clear(self):
+
+        """ Blank the screen and forget all field contents """
+
+        self.oled.fill(0)
+        for name in self.fields:
+            self.fields[name][3] = None
+        for name in self.sparklines:
+            bars = self.sparklines[name][5]
+            for i in range(len(bars)):
+                bars[i] = 0
+        self.mark_all()
+
+    def dirty(self):
+        for p in range(self.pages):
+            if self.lo[p] <= self.hi[p]:
+                return True
+        return False
+
+    def ms_until_frame(self):
+
+        """ Milliseconds until the frame-rate cap allows the next flush """
+
+        return max(0, time.ticks_diff(time.ticks_add(self.last_frame_ms, self.frame_ms), time.ticks_ms()))
+
+    def flush(self):
+
+        """ Send the dirty parts of the changed pages, returns the bytes sent """
+
+        oled = self.oled
+        width = oled.width
+        sent = 0
+        for p in range(self.pages):
+            lo = self.lo[p]
+            hi = self.hi[p]
+            if lo > hi:
+                continue
+            n = hi - lo + 1
+            if sent and sent + n + WINDOW_CMD_BYTES > self.budget_bytes:
+                break                       # over budget, left dirty for the next frame
+            oled.write_cmd(SET_COL_ADDR)
+            oled.write_cmd(lo + self.col_offset)
+            oled.write_cmd(hi + self.col_offset)
+            oled.write_cmd(SET_PAGE_ADDR)
+            oled.write_cmd(p)
+            oled.write_cmd(p)
+            oled.write_data(self.buffer[p * width + lo:p * width + hi + 1])
+            sent += n + WINDOW_CMD_BYTES
+            self.lo[p] = 0xff
+            self.hi[p] = 0
+        self.last_frame_ms = time.ticks_ms()
+        self.bytes_last_frame = sent
+        self.bytes_total += sent
+        if sent:
+            self.frames += 1
+        return sent
@@ -15,6 +15,7 @@
 #
 # License: MIT
 #
+import time
 
 SEQUENTIAL_ACCESS_ADDRESS = 0x10
 RANDOM_ACCESS_ADDRESS     = 0x11
@@ -43,6 +44,28 @@ RDA5807M_REG_TUNING_FLG_DIRECT = 0x0020      # 0 Directly Control Mode, Only use
 RDA5807M_REG_TUNING_FLG_TUNE = 0x0010        # Tune 1 = Enable
 RDA5807M_REG_TUNING_BAND_WIDE = 0x0008       # BITS[3:2] BAND[1:0] 10=76–108 MHz (world wide)
 RDA5807M_REG_TUNING_SPACE_100K = 0x0000      # BITS[1:0] SPACE[1:0] Channel Spacing. 00=100 kHz
+RDA5807M_REG_TUNING_MASK_CHAN = 0xffc0       # Channel Select. BITS[15:6]
+CHAN_MAX = 0x3ff                             # highest channel of the 10-bit CHAN field
+RDA5807M_REG_TUNING_MASK_BAND = 0x000c       # BITS[3:2] BAND[1:0]
+RDA5807M_REG_TUNING_MASK_SPACE = 0x0003      # BITS[1:0] SPACE[1:0]
+
+BAND_US_EU = 0                               # 00=87–108 MHz (US/Europe)
+BAND_JAPAN = 1                               # 01=76–91 MHz (Japan)
+BAND_WIDE = 2                                # 10=76–108 MHz (world wide)
+BAND_EAST_EU = 3                             # 11=65–76 MHz (East Europe)
+BAND_START_MHZ = (87.0, 76.0, 76.0, 65.0)
+BAND_END_MHZ = (108.0, 91.0, 108.0, 76.0)
+BAND_START_KHZ = (87000, 76000, 76000, 65000)
+BAND_END_KHZ = (108000, 91000, 108000, 76000)
+
+SPACE_100K = 0                               # 00=100 kHz
+SPACE_200K = 1                               # 01=200 kHz
+SPACE_50K = 2                                # 10=50 kHz
+SPACE_25K = 3                                # 11=25 kHz
+SPACE_MHZ = (0.1, 0.2, 0.05, 0.025)
+SPACE_KHZ = (100, 200, 50, 25)
+
+DEFAULT_VOLUME = 15                          # power-up volume of a profile without one
 
 RDA5807M_REG_GPIO   = 0x04
 RDA5807M_REG_GPIO_FLG_DE = 0x0800            # De-emphasis. 0=75µs(USA); 1=50µs(Japan/EU) 
@@ -63,11 +86,15 @@ RDA5807M_REG_I2S_DATA_DEFAULT   = 0x0000     # i2s default
 RDA5807M_REG_BLEND  = 0x07
 RDA5807M_REG_BLEND_MASK_TH_SOFRBLEND = 0x7c00 # BITS[14:10] Threshold for noise soft blend setting, unit 2dB
 RDA5807M_REG_BLEND_DATA_TH_SOFRBLEND = 0x4000 # default 10000
+RDA5807M_REG_BLEND_FLG_65M_50M_MODE = 0x0200  # default 1 If BAND=11, 1=65~76 MHz; 0=50~76 MHz
 RDA5807M_REG_BLEND_FLG_SOFTBLEND_EN = 0x0002  # default 1 If 1, Softblend enable 
 
 RDA5807M_REG_STATUS = 0x0A
+RDA5807M_REG_STATUS_FLG_RDSR = 0x8000        # RDS ready. 1 = New RDS/RBDS group ready
 RDA5807M_REG_STATUS_FLG_STC = 0x4000         # Seek/Tune Complete. 1 = Complete
 RDA5807M_REG_STATUS_FLG_SF = 0x2000          # Seek Fail. 1 = Seek failure
+RDA5807M_REG_STATUS_FLG_RDSS = 0x1000        # RDS Synchronization. 1 = RDS decoder synchronized
+RDA5807M_REG_STATUS_FLG_BLK_E = 0x0800       # When RDS enable. 1 = Block E has been found
 RDA5807M_REG_STATUS_FLG_ST = 0x0400          # Stereo Indicator 0 = Mono; 1 = Stereo
 RDA5807M_REG_STATUS_MASK_READCHAN = 0x03ff   # Read Channel. BITS[9:0]
 
@@ -75,31 +102,415 @@ RDA5807M_REG_RSSI = 0x0B
 RDA5807M_REG_RSSI_MASK_RSSI = 0xfe00         # RSSI（Received Signal Strength Indicator）0-127
 RDA5807M_REG_RSSI_FLG_FMTRUE = 0x0100        # 1=the current channel is a station
 RDA5807M_REG_RSSI_FLG_FMREADY = 0x0080       # 1=ready, 0=not ready
+RDA5807M_REG_RSSI_MASK_BLERA = 0x000c        # Block Errors Level of RDS_DATA_0. BITS[3:2]
+RDA5807M_REG_RSSI_MASK_BLERB = 0x0003        # Block Errors Level of RDS_DATA_1. BITS[1:0]
+
+RDA5807M_REG_RDSA = 0x0C                     # RDS block A
+RDA5807M_REG_RDSB = 0x0D                     # RDS block B
+RDA5807M_REG_RDSC = 0x0E                     # RDS block C
+RDA5807M_REG_RDSD = 0x0F                     # RDS block D
+
+# a sequential access read always starts at 0x0A, 6 registers = 0x0A-0x0F
+STATUS_BLOCK_REGS = 6
+
+# registers 0x02-0x07 are only ever written by us, so they can be shadowed in RAM
+SHADOW_FIRST_REG = RDA5807M_REG_CONFIG
+SHADOW_LAST_REG = RDA5807M_REG_BLEND
+# bits that the chip clears by itself (seek/tune/reset), never kept in the shadow
+SHADOW_VOLATILE_BITS = {
+    RDA5807M_REG_CONFIG: RDA5807M_REG_CONFIG_FLG_SEEK | RDA5807M_REG_CONFIG_FLG_RESET,
+    RDA5807M_REG_TUNING: RDA5807M_REG_TUNING_FLG_TUNE,
+}
+
+def is_pulse(reg, value):
+
+    """ True if writing value to reg has an effect of its own, so a later write must not replace it while queued
+
+    Every CONFIG write (RESET and SEEK act on their edges, clearing SEEK ends a
+    seek) and a TUNING write with TUNE.
+
+    """
+
+    return reg == RDA5807M_REG_CONFIG or (reg == RDA5807M_REG_TUNING and value & RDA5807M_REG_TUNING_FLG_TUNE != 0)
+
+def is_pulse_write(memaddr, buf):
+
+    """ is_pulse() of a register write as queued on the bus, the pulse policy of the tuner's i2cbus client """
+
+    return len(buf) >= 2 and is_pulse(memaddr, (buf[0] << 8) | buf[1])
+
+def format_khz(khz):
+
+    """ MHz text of a frequency in kHz without float rounding: 80300 -> '80.3', 87525 -> '87.525' """
+
+    text = str(khz // 1000) + '.' + '{:03d}'.format(khz % 1000)
+    while text[-1] == '0' and text[-2] != '.':
+        text = text[:-1]
+    return text
+
+def parse_mhz(text):
+
+    """ Frequency in kHz of a MHz text: '80.3' -> 80300, raises ValueError """
+
+    mhz, _, fraction = text.partition('.')
+    fraction = (fraction + '000')[:3]
+    return int(mhz) * 1000 + int(fraction)
+
+def khz_to_channel(khz, band, space):
+
+    """ Channel number of a frequency in kHz for a BAND_/SPACE_ setting, rounded to the nearest channel and clamped to the band edges
+
+    At 25 kHz spacing the wide band has more channels than CHAN can address,
+    its channels are clamped to CHAN_MAX.
+
+    """
+
+    start = BAND_START_KHZ[band]
+    step = SPACE_KHZ[space]
+    chan = (khz - start + step // 2) // step
+    if chan < 0:
+        return 0
+    last = min((BAND_END_KHZ[band] - start) // step, CHAN_MAX)
+    return last if chan > last else chan
+
+def probe(i2c, addr, retries=3, retry_ms=5):
+
+    """ True if a device acknowledges addr, asked up to retries times (devices still powering up NAK) """
+
+    for i in range(retries):
+        try:
+            i2c.writeto(addr, b'')          # address byte only
+            return True
+        except OSError:
+            if i < retries - 1:
+                time.sleep_ms(retry_ms)
+    return False
+
+class RadioStatus:
+
+    """ Snapshot of registers 0x0A-0x0F, updated in place by read_status_block """
+
+    def __init__(self):
+        self.channel = 0            # READCHAN
+        self.khz = 0                # frequency of READCHAN in kHz
+        self.stereo = False
+        self.rssi = 0               # 0-127
+        self.fm_true = False
+        self.fm_ready = False
+        self.stc = False            # seek/tune complete
+        self.sf = False             # seek fail
+        self.rdsr = False           # RDS group ready
+        self.blera = 0              # RDS block A errors 0 = none, 3 = uncorrectable
+        self.blerb = 0              # RDS block B errors
+        self.status = 0             # raw 0x0A
+        self.rssi_reg = 0           # raw 0x0B
+        self.rds = [0, 0, 0, 0]     # raw 0x0C-0x0F (RDS blocks A-D)
+
+class RadioProfile:
+
+    """ Full register image 0x02-0x07 of a receiver configuration
+
+    arguments:
+    band                    - BAND_US_EU, BAND_JAPAN, BAND_WIDE or BAND_EAST_EU
+    space                   - SPACE_100K, SPACE_200K, SPACE_50K or SPACE_25K
+    de_50us                 - de-emphasis True = 50µs (Japan/EU), False = 75µs (USA)
+    seek_threshold          - seek SNR threshold 0 to 15
+    softblend_threshold     - noise soft blend threshold 0 to 31 (unit 2dB), None = softblend off
+    volume                  - volume 0 to 15, None = keep the current volume (15 at power-up)
+    mute, mono, bass        - audio flags, None = keep the current flag (off at power-up)
+    rds                     - enable the RDS/RBDS decoder
+
+    The built-in profiles leave volume and audio flags at None, so switching
+    region at runtime keeps what the user has set.
+
+    """
+
+    def __init__(self, band=BAND_WIDE, space=SPACE_100K, de_50us=True, seek_threshold=8,
+                 softblend_threshold=16, volume=None, mute=None, mono=None, bass=None, rds=False):
+        self.band = band
+        self.space = space
+        self.de_50us = de_50us
+        self.seek_threshold = seek_threshold
+        self.softblend_threshold = softblend_threshold
+        self.volume = volume
+        self.mute = mute
+        self.mono = mono
+        self.bass = bass
+        self.rds = rds
+
+    def tuning_bits(self):
+
+        """ BAND and SPACE bits of the TUNING register """
+
+        return (self.band << 2) | self.space
+
+    def audio(self, volume=DEFAULT_VOLUME, mute=False, mono=False, bass=False):
+
+        """ (volume, mute, mono, bass) of the profile, the arguments stand in for its None settings """
+
+        return (volume if self.volume is None else self.volume, mute if self.mute is None else self.mute,
+                mono if self.mono is None else self.mono, bass if self.bass is None else self.bass)
+
+    def register_image(self, chan=None, audio=None):
+
+        """ Register values 0x02-0x07 as a list
+
+        chan = channel to tune in the same write, audio = (volume, mute, mono, bass) from audio()
+
+        """
+
+        volume, mute, mono, bass = audio if audio is not None else self.audio()
+        config = RDA5807M_REG_CONFIG_FLG_DHIZ | RDA5807M_REG_CONFIG_FLG_NEW | RDA5807M_REG_CONFIG_FLG_ENABLE
+        if not mute:
+            config |= RDA5807M_REG_CONFIG_FLG_DMUTE
+        if mono:
+            config |= RDA5807M_REG_CONFIG_FLG_MONO
+        if bass:
+            config |= RDA5807M_REG_CONFIG_FLG_BASS
+        if self.rds:
+            config |= RDA5807M_REG_CONFIG_FLG_RDS
+        tuning = self.tuning_bits()
+        if chan is not None:
+            tuning |= (min(chan, CHAN_MAX) << 6) | RDA5807M_REG_TUNING_FLG_TUNE
+        gpio = RDA5807M_REG_GPIO_FLG_SOFTMUTE_EN
+        if self.de_50us:
+            gpio |= RDA5807M_REG_GPIO_FLG_DE
+        volume = RDA5807M_REG_VOLUME_FLG_INTMODE | ((self.seek_threshold & 0xf) << 8) | (volume & 0xf)
+        blend = 0
+        if self.softblend_threshold is not None:
+            blend = ((self.softblend_threshold & 0x1f) << 10) | RDA5807M_REG_BLEND_FLG_SOFTBLEND_EN
+        if self.band == BAND_EAST_EU:
+            blend |= RDA5807M_REG_BLEND_FLG_65M_50M_MODE
+        return [config, tuning, gpio, volume, RDA5807M_REG_I2S_DATA_DEFAULT, blend]
+
+# 76–108 MHz, 100 kHz, 50µs (the original power-up configuration)
+PROFILE_JAPAN_WIDE = RadioProfile()
+# 76–91 MHz, 100 kHz, 50µs
+PROFILE_JAPAN = RadioProfile(band=BAND_JAPAN)
+# 87–108 MHz, 100 kHz, 50µs
+PROFILE_EU = RadioProfile(band=BAND_US_EU)
+# 87–108 MHz, 200 kHz, 75µs
+PROFILE_US = RadioProfile(band=BAND_US_EU, space=SPACE_200K, de_50us=False)
+
+SEEK_DOWN = 0
+SEEK_UP = 1
+
+ENGINE_IDLE = 0                 # nothing started
+ENGINE_TUNING = 1               # tune in progress
+ENGINE_SEEKING = 2              # seek in progress
+ENGINE_COMPLETE = 3             # STC set, tuned to READCHAN
+ENGINE_FAILED = 4               # STC and SF set, seek found no station
+ENGINE_TIMEOUT = 5              # STC not set within timeout_ms, operation stopped
+
+class TuneSeekEngine:
+
+    """ Non-blocking tune and seek state machine
+
+    start_tune()/start_seek() issue the command and return at once, poll() reads
+    the status block when the poll interval has elapsed and returns the state.
+
+    arguments:
+    radio                   - RadioRDA5807
+    tune_interval_ms        - status poll interval while tuning
+    seek_interval_ms        - status poll interval while seeking
+    tune_timeout_ms         - hard timeout of a tune
+    seek_timeout_ms         - hard timeout of a seek (a full band sweep)
+
+    """
+
+    def __init__(self, radio, tune_interval_ms=5, seek_interval_ms=20, tune_timeout_ms=500, seek_timeout_ms=10000):
+        self.radio = radio
+        self.tune_interval_ms = tune_interval_ms
+        self.seek_interval_ms = seek_interval_ms
+        self.tune_timeout_ms = tune_timeout_ms
+        self.seek_timeout_ms = seek_timeout_ms
+        self.state = ENGINE_IDLE
+        self.channel = 0
+        self.polls = 0
+        self.on_progress = None
+        self.on_complete = None
+        self.on_tuned = None            # on_tuned(status) after every successful tune or seek
+        self.status = None
+        self.interval_ms = 0
+        self.timeout_ms = 0
+        self.start_ms = 0
+        self.next_poll_ms = 0
+
+    def busy(self):
+
+        """ True while a tune or seek is in progress """
+
+        return self.state == ENGINE_TUNING or self.state == ENGINE_SEEKING
+
+    def start_tune(self, chan, on_progress=None, on_complete=None):
+
+        """ Start tuning to channel number chan """
+
+        self.abort()
+        data = (min(chan, CHAN_MAX) << 6) | RDA5807M_REG_TUNING_FLG_TUNE | self.radio.tuning_bits
+        self.radio.write_reg(RDA5807M_REG_TUNING, data)
+        self.begin(ENGINE_TUNING, on_progress, on_complete)
+
+    def start_seek(self, direction, on_progress=None, on_complete=None):
+
+        """ Start seeking, direction = SEEK_UP or SEEK_DOWN
+
+        on_progress(status)     - called with the RadioStatus of every poll (READCHAN sweeps)
+        on_complete(state)      - called once with ENGINE_COMPLETE, ENGINE_FAILED or ENGINE_TIMEOUT
+
+        """
+
+        self.abort()
+        up = RDA5807M_REG_CONFIG_FLG_SEEKUP if direction == SEEK_UP else 0
+        self.radio.update_reg(RDA5807M_REG_CONFIG,
+            (RDA5807M_REG_CONFIG_FLG_SEEKUP | RDA5807M_REG_CONFIG_FLG_SEEK),
+            (up | RDA5807M_REG_CONFIG_FLG_SEEK))
+        self.begin(ENGINE_SEEKING, on_progress, on_complete)
+
+    def begin(self, state, on_progress=None, on_complete=None):
+
+        """ Watch a tune or seek that was already written to the device """
+
+        self.state = state
+        self.on_progress = on_progress
+        self.on_complete = on_complete
+        self.polls = 0
+        if state == ENGINE_SEEKING:
+            self.interval_ms = self.seek_interval_ms
+            self.timeout_ms = self.seek_timeout_ms
+        else:
+            self.interval_ms = self.tune_interval_ms
+            self.timeout_ms = self.tune_timeout_ms
+        self.start_ms = time.ticks_ms()
+        self.next_poll_ms = time.ticks_add(self.start_ms, self.interval_ms)
+
+    def poll(self):
+
+        """ Advance the state machine, returns the current state """
+
+        if not self.busy():
+            return self.state
+        now = time.ticks_ms()
+        if time.ticks_diff(now, self.next_poll_ms) < 0:
+            return self.state
+        self.next_poll_ms = time.ticks_add(now, self.interval_ms)
+        self.polls += 1
+        st = self.radio.read_status_block()
+        self.status = st
+        self.channel = st.channel
+        if self.on_progress:
+            self.on_progress(st)
+        if st.stc:
+            if self.state == ENGINE_SEEKING and st.sf:
+                self.finish(ENGINE_FAILED)
+            else:
+                self.finish(ENGINE_COMPLETE)
+        elif time.ticks_diff(now, self.start_ms) >= self.timeout_ms:
+            self.stop()
+            self.finish(ENGINE_TIMEOUT)
+        return self.state
+
+    def abort(self):
+
+        """ Stop an operation in progress without a completion report """
+
+        if self.busy():
+            self.stop()
+            self.state = ENGINE_IDLE
+
+    def stop(self):
+
+        """ Clear the SEEK bit in the device (the shadow never holds it) """
+
+        if self.state == ENGINE_SEEKING:
+            self.radio.update_reg(RDA5807M_REG_CONFIG, RDA5807M_REG_CONFIG_FLG_SEEK, 0)
+
+    def finish(self, state):
+        profiler = self.radio.profiler
+        if profiler is not None:
+            profiler.engine_done(1 if self.state == ENGINE_SEEKING else 0, self.polls, state != ENGINE_COMPLETE)
+        self.state = state
+        on_complete = self.on_complete
+        self.on_progress = None
+        self.on_complete = None
+        if state == ENGINE_COMPLETE and self.on_tuned:
+            self.on_tuned(self.status)
+        if on_complete:
+            on_complete(state)
+
+    def ms_until_poll(self):
+
+        """ Milliseconds until the next status poll is due """
+
+        return max(0, time.ticks_diff(self.next_poll_ms, time.ticks_ms()))
+
+    def run(self):
+
+        """ Block until the operation ends, sleeping between polls. Returns the final state """
+
+        while self.busy():
+            time.sleep_ms(self.ms_until_poll())
+            self.poll()
+        return self.state
+
+    async def wait(self):
+
+        """ Awaitable version of run() """
+
+        try:                                # imported here: uasyncio costs boot time and the blocking API needs none
+            import uasyncio as asyncio
+        except ImportError:
+            import asyncio
+        while self.busy():
+            await asyncio.sleep(self.ms_until_poll() / 1000)
+            self.poll()
+        return self.state
 
 class RadioRDA5807:
 
     """ Access RDA5807M Device """
     
-    def __init__(self, i2c):
+    def __init__(self, i2c, shadow=True, profile=PROFILE_JAPAN_WIDE, khz=None):
 
         """ Configure RDA5807M Device
 
         arguments:
         i2c                     - an I2C bus object
+        shadow                  - keep a write-through copy of registers 0x02-0x07 in RAM
+        profile                 - RadioProfile written at power-up
+        khz                     - tune to this frequency in the same burst (blocks until tuning completes)
 
         """
 
         self.i2c = i2c
+        self.profiler = None                    # regprof.ProfilingI2C while profiling
         self.mute_flag = False
         self.bass_boost_flag = False
         self.mono_flag = False
 
-        #read i2c address and check
-        self.address_found = False
-        address = self.i2c.scan()
-        for i in address:
-            if i == RANDOM_ACCESS_ADDRESS:
-                self.address_found = True
+        #write-through register shadow
+        self.shadow_enabled = shadow
+        self.shadow = [0] * (SHADOW_LAST_REG + 1)
+        self.shadow_valid = 0                   # bit n set = shadow[n] is valid
+        self.shadow_reads_avoided = 0
+
+        #status snapshot buffers
+        self.status_buf = bytearray(STATUS_BLOCK_REGS * 2)
+        self.status_word = bytearray(2)         # STATUS alone, read_rdsr()
+        self.status_snapshot = RadioStatus()
+        self.image_buf = bytearray((SHADOW_LAST_REG - SHADOW_FIRST_REG + 1) * 2)
+        self.reg_buf = bytearray(2)             # one register of read_reg/write_reg
+        self.tuner = TuneSeekEngine(self)
+
+        self.profile = profile
+        self.tuning_bits = profile.tuning_bits()
+        self.start_khz = BAND_START_KHZ[profile.band]
+        self.space_khz = SPACE_KHZ[profile.space]
+        self.start_frequency_MHz = BAND_START_MHZ[profile.band]
+        self.frequency_spacing_MHz = SPACE_MHZ[profile.space]
+
+        #probe the two addresses of the chip instead of scanning the bus
+        self.address_found = probe(self.i2c, RANDOM_ACCESS_ADDRESS) and probe(self.i2c, SEQUENTIAL_ACCESS_ADDRESS)
         if not self.address_found:
             return
 
@@ -110,34 +521,126 @@ class RadioRDA5807:
             
         config = RDA5807M_REG_CONFIG_FLG_DHIZ | RDA5807M_REG_CONFIG_FLG_DMUTE | RDA5807M_REG_CONFIG_FLG_ENABLE
         self.write_reg(RDA5807M_REG_CONFIG, config | RDA5807M_REG_CONFIG_FLG_RESET)
-        self.start_frequency_MHz = 76.0
-        self.frequency_spacing_MHz = 0.1
-        self.write_reg(RDA5807M_REG_TUNING, 0x0000 | RDA5807M_REG_TUNING_BAND_WIDE | RDA5807M_REG_TUNING_SPACE_100K)
-        self.write_reg(RDA5807M_REG_GPIO, RDA5807M_REG_GPIO_FLG_DE | RDA5807M_REG_GPIO_FLG_SOFTMUTE_EN)
-        self.write_reg(RDA5807M_REG_VOLUME, RDA5807M_REG_VOLUME_FLG_INTMODE | RDA5807M_REG_VOLUME_DATA_SEEKTH | RDA5807M_REG_VOLUME_DATA_VOLUME)
-        self.write_reg(RDA5807M_REG_I2S, RDA5807M_REG_I2S_DATA_DEFAULT)
-        self.write_reg(RDA5807M_REG_BLEND, RDA5807M_REG_BLEND_DATA_TH_SOFRBLEND | RDA5807M_REG_BLEND_FLG_SOFTBLEND_EN)
-        config |= RDA5807M_REG_CONFIG_FLG_NEW
-        self.write_reg(RDA5807M_REG_CONFIG, config)
+        self.apply_profile(profile, khz=khz, keep_audio=False)
+
+    def apply_profile(self, profile, frequency_MHz=None, khz=None, keep_audio=True):
+
+        """ Write a RadioProfile with one sequential access burst
+
+        arguments:
+        profile                 - RadioProfile to switch to
+        frequency_MHz           - tune to this frequency in the same write (blocks until tuning completes)
+        khz                     - the same in kHz
+        keep_audio              - None volume and flags of the profile keep the current ones,
+                                  False = the power-up defaults
+
+        """
+
+        if keep_audio:
+            audio = profile.audio(self.get_volume(), self.mute_flag, self.mono_flag, self.bass_boost_flag)
+        else:
+            audio = profile.audio()
+
+        self.profile = profile
+        self.tuning_bits = profile.tuning_bits()
+        self.start_khz = BAND_START_KHZ[profile.band]
+        self.space_khz = SPACE_KHZ[profile.space]
+        self.start_frequency_MHz = BAND_START_MHZ[profile.band]
+        self.frequency_spacing_MHz = SPACE_MHZ[profile.space]
+        chan = None
+        if frequency_MHz is not None:
+            chan = self.frequency_to_channel(frequency_MHz)
+        elif khz is not None:
+            chan = self.khz_to_channel(khz)
+        self.tuner.abort()
+        self.write_regs(profile.register_image(chan, audio))
+        self.mute_flag = audio[1]
+        self.mono_flag = audio[2]
+        self.bass_boost_flag = audio[3]
+        if chan is not None:
+            self.tuner.begin(ENGINE_TUNING)
+            self.tuner.run()
+
+    def enable_profiling(self, trace_size=32):
+
+        """ Record register traffic and tune/seek polls, returns the regprof.ProfilingI2C """
+
+        if self.profiler is None:
+            import regprof
+            self.profiler = regprof.ProfilingI2C(self.i2c, trace_size)
+            self.i2c = self.profiler
+        return self.profiler
+
+    def disable_profiling(self):
+
+        """ Take the profiler off the register path, returns it (or None) """
+
+        profiler = self.profiler
+        if profiler is not None:
+            self.i2c = profiler.i2c
+            self.profiler = None
+        return profiler
+
+    def set_channel(self, chan):
+
+        """ Tune to a channel number of the current band (blocks until tuning completes or times out) """
+
+        self.tuner.start_tune(chan)
+        return self.tuner.run() == ENGINE_COMPLETE
+
+    def get_channel(self):
+
+        """ Get tuned channel number (READCHAN) """
+
+        return self.read_status_block().channel
+
+    def set_frequency_khz(self, khz):
+
+        """ Set tuned frequency in kHz, rounded to the nearest channel of the band """
+
+        return self.set_channel(self.khz_to_channel(khz))
+
+    def get_frequency_khz(self):
+
+        """ Get tuned frequency in kHz """
+
+        return self.read_status_block().khz
+
+    def channel_count(self):
+
+        """ Number of addressable channels of the current band and spacing """
+
+        return min((BAND_END_KHZ[self.profile.band] - self.start_khz) // self.space_khz, CHAN_MAX) + 1
+
+    def khz_to_channel(self, khz):
+
+        """ Channel number of a frequency in kHz in the current band, clamped to the band edges """
+
+        return khz_to_channel(khz, self.profile.band, self.profile.space)
+
+    def channel_to_khz(self, chan):
+
+        """ Frequency in kHz of a channel number in the current band """
+
+        return self.start_khz + chan * self.space_khz
 
     def set_frequency_MHz(self, frequency_MHz):
 
-        """ Set tuned frequency in MHz """
+        """ Set tuned frequency in MHz (blocks until tuning completes or times out) """
+
+        return self.set_channel(self.frequency_to_channel(frequency_MHz))
+
+    def frequency_to_channel(self, frequency_MHz):
+
+        """ Channel number of a frequency in MHz in the current band """
+
+        return self.khz_to_channel(round(frequency_MHz * 1000))
 
-        frequency_steps = round((frequency_MHz - self.start_frequency_MHz)/self.frequency_spacing_MHz)
-        data = ((frequency_steps << 6) | RDA5807M_REG_TUNING_FLG_TUNE | RDA5807M_REG_TUNING_BAND_WIDE | RDA5807M_REG_TUNING_SPACE_100K)
-        self.write_reg(RDA5807M_REG_TUNING, data)
-        while True:
-            data = self.read_reg(RDA5807M_REG_TUNING)
-            if not data & RDA5807M_REG_TUNING_FLG_TUNE:
-                break
-            
     def get_frequency_MHz(self):
 
         """ Get tuned frequency in MHz """
 
-        frequency = self.start_frequency_MHz + ((self.read_reg(RDA5807M_REG_STATUS) & RDA5807M_REG_STATUS_MASK_READCHAN) * self.frequency_spacing_MHz)
-        return frequency
+        return self.get_frequency_khz() / 1000
 
 
     def set_volume(self, volume):
@@ -151,7 +654,7 @@ class RadioRDA5807:
 
         """ Get Volume 0 to 15 """
 
-        return self.read_reg(RDA5807M_REG_VOLUME) & 0xf #bits 3:0
+        return self.read_reg_cached(RDA5807M_REG_VOLUME) & 0xf #bits 3:0
    
     def mute(self, mute):
 
@@ -183,56 +686,160 @@ class RadioRDA5807:
           self.update_reg(RDA5807M_REG_CONFIG, RDA5807M_REG_CONFIG_FLG_MONO, 0)
         self.mono_flag = mono
 
+    def config_flags(self, reg, data):
+
+        """ Follow a raw write of data to reg: a CONFIG write sets mute_flag, mono_flag and bass_boost_flag,
+            returns True when reg is CONFIG """
+
+        if reg != RDA5807M_REG_CONFIG:
+            return False
+        self.mute_flag = not data & RDA5807M_REG_CONFIG_FLG_DMUTE
+        self.mono_flag = bool(data & RDA5807M_REG_CONFIG_FLG_MONO)
+        self.bass_boost_flag = bool(data & RDA5807M_REG_CONFIG_FLG_BASS)
+        return True
+
     def seek_up(self):
 
-        """ Find next station (blocks until tuning completes) """
+        """ Find next station (blocks until tuning completes). Returns False on seek fail or timeout """
 
-        self.update_reg(RDA5807M_REG_CONFIG,
-            (RDA5807M_REG_CONFIG_FLG_SEEKUP | RDA5807M_REG_CONFIG_FLG_SEEK), 
-            (RDA5807M_REG_CONFIG_FLG_SEEKUP | RDA5807M_REG_CONFIG_FLG_SEEK))
-        while 1:
-            data = self.read_reg(RDA5807M_REG_STATUS)
-            if data & RDA5807M_REG_STATUS_FLG_STC:
-                break
+        self.tuner.start_seek(SEEK_UP)
+        return self.tuner.run() == ENGINE_COMPLETE
         
     def seek_down(self):
 
-        """ Find previous station (blocks until tuning completes) """
+        """ Find previous station (blocks until tuning completes). Returns False on seek fail or timeout """
 
-        self.update_reg(RDA5807M_REG_CONFIG,
-            (RDA5807M_REG_CONFIG_FLG_SEEKUP | RDA5807M_REG_CONFIG_FLG_SEEK),
-            RDA5807M_REG_CONFIG_FLG_SEEK)
-        while 1:
-            data = self.read_reg(RDA5807M_REG_STATUS)
-            if data & RDA5807M_REG_STATUS_FLG_STC:
-                break
+        self.tuner.start_seek(SEEK_DOWN)
+        return self.tuner.run() == ENGINE_COMPLETE
 
     def get_signal_strength(self):
 
         """ Recieved Signal Strength Indicator 0 = low, 127 = high (logarithmic)"""
 
-        rssi = self.read_reg(RDA5807M_REG_RSSI) >> 9
-        return rssi
+        return self.read_status_block().rssi
+
+    def read_status_block(self, i2c=None):
+
+        """ Read registers 0x0A-0x0F with one sequential access transaction
+
+        i2c is the bus to read through instead of the radio's (another i2cbus client)
+        returns the RadioStatus snapshot (the same object every call)
+
+        """
+
+        buf = self.status_buf
+        self.read_sequential(i2c, buf)
+        st = self.status_snapshot
+        status = (buf[0] << 8) | buf[1]
+        rssi = (buf[2] << 8) | buf[3]
+        st.status = status
+        st.rssi_reg = rssi
+        channel = status & RDA5807M_REG_STATUS_MASK_READCHAN
+        st.channel = channel
+        st.khz = self.start_khz + channel * self.space_khz
+        st.stereo = (status & RDA5807M_REG_STATUS_FLG_ST) != 0
+        st.stc = (status & RDA5807M_REG_STATUS_FLG_STC) != 0
+        st.sf = (status & RDA5807M_REG_STATUS_FLG_SF) != 0
+        st.rdsr = (status & RDA5807M_REG_STATUS_FLG_RDSR) != 0
+        st.rssi = rssi >> 9
+        st.fm_true = (rssi & RDA5807M_REG_RSSI_FLG_FMTRUE) != 0
+        st.fm_ready = (rssi & RDA5807M_REG_RSSI_FLG_FMREADY) != 0
+        st.blera = (rssi & RDA5807M_REG_RSSI_MASK_BLERA) >> 2
+        st.blerb = rssi & RDA5807M_REG_RSSI_MASK_BLERB
+        rds = st.rds
+        for i in range(4):
+            rds[i] = (buf[4 + i * 2] << 8) | buf[5 + i * 2]
+        return st
+
+    def read_sequential(self, i2c, buf):
+
+        """ Sequential read from 0x0A through i2c (None = the radio's), seen by the profiler either way """
+
+        if i2c is None:
+            self.i2c.readfrom_into(SEQUENTIAL_ACCESS_ADDRESS, buf)
+        elif self.profiler is not None:
+            self.profiler.readfrom_into_via(i2c, SEQUENTIAL_ACCESS_ADDRESS, buf)
+        else:
+            i2c.readfrom_into(SEQUENTIAL_ACCESS_ADDRESS, buf)
+
+    def read_rdsr(self, i2c=None):
+
+        """ True if an RDS group is ready, reads only STATUS (0x0A, 2 bytes) """
+
+        buf = self.status_word
+        self.read_sequential(i2c, buf)
+        return (buf[0] << 8 | buf[1]) & RDA5807M_REG_STATUS_FLG_RDSR != 0
 
     def update_reg(self, reg, mask, value):
 
         """ Update specific bits in I2C register """
 
-        data = self.read_reg(reg)
+        data = self.read_reg_cached(reg)
         data = (data & ~mask) | value
         self.write_reg(reg, data)
 
+    def read_reg_cached(self, reg):
+
+        """ Read register from the shadow if possible, otherwise from the i2c bus """
+
+        if self.shadow_valid & (1 << reg):
+            self.shadow_reads_avoided += 1
+            return self.shadow[reg]
+        data = self.read_reg(reg)
+        self.shadow_store(reg, data)
+        return data
+
+    def shadow_store(self, reg, data):
+
+        """ Keep the shadow coherent with a value known to be in the device """
+
+        if not self.shadow_enabled or reg < SHADOW_FIRST_REG or reg > SHADOW_LAST_REG:
+            return
+        if reg == RDA5807M_REG_CONFIG and data & RDA5807M_REG_CONFIG_FLG_RESET:
+            #soft reset returns every register to its power-on value
+            self.shadow_valid = 0
+        self.shadow[reg] = data & ~SHADOW_VOLATILE_BITS.get(reg, 0)
+        self.shadow_valid |= 1 << reg
+
+    def shadow_invalidate(self):
+
+        """ Forget the shadow, the next access of each register goes to the i2c bus """
+
+        self.shadow_valid = 0
+
+    def write_regs(self, values):
+
+        """ Write registers 0x02 onwards with one sequential access transaction """
+
+        buf = self.image_buf
+        n = len(values)
+        for i in range(n):
+            buf[i * 2] = values[i] >> 8
+            buf[i * 2 + 1] = values[i] & 0xff
+        self.i2c.writeto(SEQUENTIAL_ACCESS_ADDRESS, buf if n * 2 == len(buf) else buf[:n * 2])
+        for i in range(n):
+            self.shadow_store(SHADOW_FIRST_REG + i, values[i])
+
+    def read_regs(self, reg, buf):
+
+        """ Read len(buf)//2 consecutive registers from reg into buf (random access, auto increment) """
+
+        self.i2c.readfrom_mem_into(RANDOM_ACCESS_ADDRESS, reg, buf)
+
     def read_reg(self, reg):
 
-        """ Read data from i2c register """
+        """ Read data from i2c register (no heap allocation) """
 
-        self.i2c.writeto(RANDOM_ACCESS_ADDRESS, bytes([reg]))
-        data = self.i2c.readfrom(RANDOM_ACCESS_ADDRESS, 2)
-        return (data[0] << 8) | data[1]
+        buf = self.reg_buf
+        self.i2c.readfrom_mem_into(RANDOM_ACCESS_ADDRESS, reg, buf)
+        return (buf[0] << 8) | buf[1]
 
     def write_reg(self, reg, data):
 
-        """ Write data to i2c register """
+        """ Write data to i2c register (no heap allocation) """
 
-        data = bytes([reg, data >> 8, data&0xff])
-        self.i2c.writeto(RANDOM_ACCESS_ADDRESS, data)
\ No newline at end of file
+        buf = self.reg_buf
+        buf[0] = data >> 8
+        buf[1] = data & 0xff
+        self.i2c.writeto_mem(RANDOM_ACCESS_ADDRESS, reg, buf)
+        self.shadow_store(reg, data)
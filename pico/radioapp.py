@@ -0,0 +1,602 @@
+#
+# asyncio application core shared by pico/main.py and picow/main.py
+#
+# Copyright (c) 2025 ha864git
+#
+# License: MIT
+#
+# Tasks:
+#   input   - takes button events (or polls swf buttons) and posts commands
+#   command - executes commands against the radio
+#   tuner   - follows a tune/seek started by a command
+#   status  - polls RSSI and wakes the display/BLE only on change (adaptive rate
+#             and hysteresis with a sigmon.SignalMonitor)
+#   display - redraws the OLED when woken
+#   ble     - executes received BLE commands and sends status when woken
+#   scan    - refreshes a slice of the channel index per idle tick while muted
+#   rds     - polls RDS groups, the PS name is shown for stations without a preset
+#   bus     - sends the queued I2C writes of an i2cbus.BusManager in priority order
+#   flash   - the only flash writer: the listening state once it has been quiet
+#             a while, the blocks of the signal-quality log and the channel
+#             index, one write at a time, only while no tune or seek runs and
+#             yielding after each (a littlefs write stalls the loop for ms)
+#
+# Runs under uasyncio on the device and under asyncio on CPython.
+#
+try:
+    import uasyncio as asyncio
+except ImportError:
+    import asyncio
+
+import bleproto
+import button
+import oledview
+import radioRDA5807
+import sigmon
+import time
+
+CMD_VOLUME_UP = 0
+CMD_VOLUME_DOWN = 1
+CMD_SEEK_UP = 2
+CMD_SEEK_DOWN = 3
+CMD_NEXT_STATION = 4
+CMD_PREV_STATION = 5
+
+RELATIVE_ARGS = ('up', 'down')
+
+try:
+    ThreadSafeFlag = asyncio.ThreadSafeFlag
+except AttributeError:
+    class ThreadSafeFlag(asyncio.Event):
+
+        """ asyncio stand-in for uasyncio.ThreadSafeFlag: wait() clears the flag
+
+        The emulator sets it from threading.Timer threads (BLE writes, button
+        IRQs); asyncio.Event is not thread safe, so once a task waits, set()
+        hands the event to the loop of the waiter.
+
+        """
+
+        loop = None
+
+        def set(self):
+            loop = self.loop
+            if loop is None:
+                asyncio.Event.set(self)
+                return
+            try:
+                loop.call_soon_threadsafe(asyncio.Event.set, self)
+            except RuntimeError:                # loop closed
+                asyncio.Event.set(self)
+
+        async def wait(self):
+            self.loop = asyncio.get_running_loop()
+            await asyncio.Event.wait(self)
+            self.clear()
+
+class Queue:
+
+    """ Small bounded FIFO for uasyncio (which has no Queue) and asyncio
+
+    An item put with a key removes a queued item of the same key and is
+    appended, so only the latest of superseded commands (volume slider, station
+    clicks) is executed, and after the commands queued before it.
+    put_nowait() may be called from a callback (the BLE IRQ, scheduled): the
+    queue is one list of [key, item] entries, changed by single operations
+    only, and the waiting task is woken with a ThreadSafeFlag.
+
+    """
+
+    def __init__(self, maxsize=8):
+        self.maxsize = maxsize
+        self.entries = []                   # [key, item], oldest first
+        self.flag = ThreadSafeFlag()
+        self.dropped = 0
+        self.coalesced = 0
+        self.high_water = 0
+
+    def put_nowait(self, item, key=None):
+
+        """ Append an item, returns False (and counts a drop) when full """
+
+        entries = self.entries
+        if key is not None:
+            for entry in entries:
+                if entry[0] == key:
+                    try:
+                        entries.remove(entry)       # the new item goes to the tail, after the commands queued since
+                        self.coalesced += 1
+                    except ValueError:
+                        pass                        # taken by get() meanwhile
+                    break
+        if len(entries) >= self.maxsize:
+            self.dropped += 1
+            return False
+        entries.append([key, item])
+        if len(entries) > self.high_water:
+            self.high_water = len(entries)
+        self.flag.set()
+        return True
+
+    async def get(self):
+        while not self.entries:
+            await self.flag.wait()
+        return self.entries.pop(0)[1]
+
+    def get_nowait(self):
+
+        """ Oldest item or None when empty """
+
+        if not self.entries:
+            return None
+        return self.entries.pop(0)[1]
+
+    def qsize(self):
+        return len(self.entries)
+
+    def stats(self):
+
+        """ 'depth max dropped coalesced' """
+
+        return '{} {} {} {}'.format(len(self.entries), self.high_water, self.dropped, self.coalesced)
+
+class RadioApp:
+
+    """ Radio user interface built from cooperating tasks
+
+    arguments:
+    radio                   - RadioRDA5807 (radioRDA5807b for BLE status)
+    oled                    - SSD1306 display
+    buttons                 - list of (button, command) pairs, button has is_on_edge()
+    button_driver           - button.ButtonDriver of the buttons, events are taken from its ring buffer
+    stations                - stationdb.StationDB of the presets
+    ble                     - BLESimplePeripheral or None
+    ble_commands            - dispatch table of BLE text commands,
+                              {name: (function(args), number of arguments, coalesce)}
+    led                     - Pin showing the BLE connection or None
+    scanner                 - bandscan.BandScanner for idle rescans or None
+    navigator               - bandscan.StationNavigator for seek from the channel index or None
+    rds_poller              - rds.RDSPoller or None
+    monitor                 - sigmon.SignalMonitor for smoothed RSSI and the sparkline or None
+    bus                     - i2cbus.BusManager of the radio and OLED clients or None
+    journal                 - statejournal.StateJournal of the listening state or None
+    signal_log              - siglog.SignalLog fed with the monitor samples or None
+    input_interval_ms       - button polling interval, with a button_driver only while a button is
+                              held or debouncing, otherwise the input task waits for its irq
+    status_interval_ms      - RSSI polling interval without a monitor
+    scan_interval_ms        - idle rescan interval
+    scan_slice              - channels per idle rescan
+    index_save_ticks        - save learned index entries every this many scan intervals
+
+    """
+
+    def __init__(self, radio, oled, buttons, stations, ble=None, ble_commands=None, led=None,
+                 button_driver=None, scanner=None, navigator=None, rds_poller=None, monitor=None, bus=None, journal=None,
+                 signal_log=None, input_interval_ms=20,
+                 status_interval_ms=250, scan_interval_ms=2000, scan_slice=8, index_save_ticks=300):
+        self.radio = radio
+        self.oled = oled
+        self.view = oledview.OledView(oled)
+        self.view.add_field('rssi', 0, 0, 8)     # 'RSSI:127'
+        self.view.add_field('tune', 0, 16)
+        self.view.add_field('name', 0, 32)
+        self.view.add_sparkline('graph', 0, 48, oled.width, 16)
+        self.graph = bytearray(oled.width)  # RSSI history drawn below the fields
+        self.graph_serial = -1
+        self.buttons = buttons
+        self.button_driver = button_driver
+        self.button_commands = {}
+        self.input_flag = ThreadSafeFlag()
+        if button_driver is not None:
+            button_driver.flag = self.input_flag
+            for sw, cmd in buttons:
+                self.button_commands[sw.id] = cmd
+        self.stations = stations
+        self.ble = ble
+        self.ble_commands = ble_commands if ble_commands is not None else {}
+        self.led = led
+        self.input_interval_ms = input_interval_ms
+        self.status_interval_ms = status_interval_ms
+        self.scanner = scanner
+        self.scan_interval_ms = scan_interval_ms
+        self.scan_slice = scan_slice
+        self.navigator = navigator
+        self.index_save_ticks = index_save_ticks
+        self.rds_poller = rds_poller
+        if rds_poller is not None:
+            rds_poller.decoder.on_ps = self.on_rds_ps
+        self.monitor = monitor
+        self.bus = bus
+        self.journal = journal
+        self.signal_log = signal_log
+        self.index_save = False             # the channel index waits for the flash task
+        self.flash_writes = 0
+        self.flash_max_us = 0               # longest single flash write
+
+        self.commands = Queue()
+        self.ble_rx_queue = Queue()
+        self.display_event = asyncio.Event()
+        self.ble_status_event = asyncio.Event()
+        self.tuner_event = asyncio.Event()
+        self.seek_direction = None          # navigator step for the tuner task
+        self.tune_done = None               # on_complete of tune_channel()
+
+        self.chan = 0
+        self.khz = 0
+        self.name = ""
+        self.vm = radio.get_volume()
+        self.rssi = 0
+        self.redraws = 0
+
+        self.proto = None
+        if ble is not None:
+            self.proto = bleproto.BinaryProtocol(self)
+            ble.on_write(self.ble_rx)
+
+    def tuned(self):
+
+        """ Take channel, frequency and preset name from the device after a tune or seek """
+
+        st = self.radio.read_status_block()
+        self.chan = st.channel
+        self.khz = st.khz
+        self.name = self.stations.name(st.channel)
+        if self.rds_poller is not None:
+            self.rds_poller.decoder.reset()
+        if self.monitor is not None:
+            self.monitor.reset()
+        self.update()
+
+    def on_rds_ps(self, ps):
+        if self.stations.position(self.chan) < 0:
+            self.name = self.rds_poller.decoder.ps_text()
+            self.update()
+
+    def update(self, ble_status=True):
+
+        """ Wake the display (and BLE status) tasks """
+
+        self.display_event.set()
+        if ble_status:
+            self.ble_status_event.set()
+        if self.journal is not None:
+            radio = self.radio
+            self.journal.note(self.khz, self.vm, radio.mute_flag, radio.mono_flag, radio.bass_boost_flag,
+                              self.stations.position(self.chan))
+
+    def tune_channel(self, chan, on_complete=None):
+
+        """ Start tuning to channel number chan, the tuner task follows it to the end
+
+        on_complete(state) is called at the end, after the app has taken the new channel.
+
+        """
+
+        self.stop_scan()
+        self.tune_done = on_complete
+        self.radio.tuner.start_tune(chan, on_complete=self.on_tune_complete)
+        self.tuner_event.set()
+
+    def on_tune_complete(self, state):
+        self.tuned()
+        print(radioRDA5807.format_khz(self.khz), self.name)
+        done = self.tune_done
+        if done is not None:
+            self.tune_done = None
+            done(state)
+
+    def set_volume(self, vm):
+        if 0 <= vm <= 15:
+            self.radio.set_volume(vm)
+            self.vm = self.radio.get_volume()
+            print(self.vm)
+            self.update()
+
+    def start_seek(self, direction):
+
+        """ Start a seek, the tuner task follows it to the end
+
+        With a navigator the tuner task tunes the next known station directly
+        and the hardware seek is only the fallback.
+
+        """
+
+        self.stop_scan()
+        self.name = "-- seek up --" if direction == radioRDA5807.SEEK_UP else "-- seek down --"
+        self.update()
+        if self.navigator is not None:
+            self.seek_direction = direction
+        else:
+            self.radio.tuner.start_seek(direction, self.on_seek_progress, self.on_seek_complete)
+        self.tuner_event.set()
+
+    def on_seek_progress(self, status):
+        self.khz = status.khz
+        self.display_event.set()
+
+    def on_seek_complete(self, state):
+        self.tuned()
+        if state != radioRDA5807.ENGINE_COMPLETE:
+            self.name = "-- seek failed --"
+        print(radioRDA5807.format_khz(self.khz), self.name)
+        if self.ble is not None and not self.proto.active:
+            self.ble.send('frequency ' + radioRDA5807.format_khz(self.khz))
+        self.update()
+
+    def execute(self, cmd):
+        if cmd == CMD_VOLUME_UP:
+            self.set_volume(self.vm + 1)
+        elif cmd == CMD_VOLUME_DOWN:
+            self.set_volume(self.vm - 1)
+        elif cmd == CMD_SEEK_UP:
+            if not self.radio.tuner.busy() or self.scanning():
+                self.start_seek(radioRDA5807.SEEK_UP)
+        elif cmd == CMD_SEEK_DOWN:
+            if not self.radio.tuner.busy() or self.scanning():
+                self.start_seek(radioRDA5807.SEEK_DOWN)
+        elif cmd == CMD_NEXT_STATION:
+            self.tune_channel(self.stations.next(self.chan))
+        elif cmd == CMD_PREV_STATION:
+            self.tune_channel(self.stations.prev(self.chan))
+
+    def ble_rx(self, data):
+
+        """ BLE write callback, parses and queues the command, the ble task executes it
+
+        Nothing touches the radio or the I2C bus here. A queued command with an
+        absolute value (frequency, volume 7, mute on, ...) is replaced by a newer one.
+
+        """
+
+        if self.proto.is_frame(data):
+            self.ble_rx_queue.put_nowait((self.proto.handle, data), self.proto.coalesce_key(data))
+            return
+        try:
+            args = data.decode('utf-8').replace('\n', '').split(' ')
+        except ValueError:                  # UnicodeError, not a text command
+            self.ble_rx_queue.put_nowait((self.ble_unknown, ['?']))
+            return
+        entry = self.ble_commands.get(args[0])
+        if entry is None or len(args) - 1 != entry[1]:
+            self.ble_rx_queue.put_nowait((self.ble_unknown, args))
+            return
+        key = args[0] if entry[2] and args[-1] not in RELATIVE_ARGS else None
+        if not self.ble_rx_queue.put_nowait((entry[0], args), key):
+            print('ble queue full', args)
+
+    def ble_unknown(self, args):
+        print(args)
+        self.ble.send('?')
+
+    def ble_execute(self, function, args):
+
+        """ Run a queued BLE command, a failing one (bad arguments, bus error) is answered with 'error <command>' """
+
+        try:
+            function(args)
+        except Exception as e:
+            # remote input must never end the app
+            print('ble command failed', args, repr(e))
+            self.ble.send('error ' + args[0] if isinstance(args, list) else 'error')
+
+    # one step of each task, also driven directly by the benchmarks
+
+    def poll_input(self):
+
+        """ Post the commands of new button events """
+
+        driver = self.button_driver
+        if driver is None:
+            for sw, cmd in self.buttons:
+                if sw.is_on_edge():
+                    self.commands.put_nowait(cmd)
+            return
+        driver.poll()
+        code = driver.pop()
+        while code >= 0:
+            event = code & 0xf
+            if event == button.EVT_PRESS or event == button.EVT_REPEAT:
+                cmd = self.button_commands.get(code >> 4)
+                if cmd is not None:
+                    self.commands.put_nowait(cmd)
+            code = driver.pop()
+
+    def poll_status(self):
+
+        """ Read RSSI and wake the display and BLE status when it changed """
+
+        if not self.radio.tuner.busy() and not self.scanning():
+            monitor = self.monitor
+            if monitor is None:
+                rssi = self.radio.get_signal_strength()
+                if rssi != self.rssi:
+                    self.rssi = rssi
+                    self.update()
+            else:
+                events = monitor.poll()
+                if events & sigmon.EVT_HISTORY and self.signal_log is not None:
+                    self.signal_log.sample(self.radio.status_snapshot)     # the status block just read
+                if events & sigmon.EVT_CHANGED:
+                    self.rssi = monitor.rssi
+                    self.update()
+                elif events:
+                    self.display_event.set()    # new sparkline sample only
+        if self.led is not None:
+            self.led.value(1 if self.ble.is_connected() else 0)
+
+    def render(self):
+
+        """ Draw the fields and send the changed parts to the OLED """
+
+        view = self.view
+        view.set_text('rssi', 'RSSI:' + str(self.rssi))
+        view.set_text('tune', radioRDA5807.format_khz(self.khz) + 'MHz Vol:' + str(self.vm))
+        view.set_text('name', self.name)
+        monitor = self.monitor
+        if monitor is not None and monitor.serial != self.graph_serial:
+            self.graph_serial = monitor.serial
+            graph = self.graph
+            n = monitor.history(graph)
+            for i in range(n):
+                graph[i] &= sigmon.HISTORY_RSSI
+            view.set_sparkline('graph', graph, n)
+        view.flush()
+        self.redraws += 1
+        if view.dirty():
+            self.display_event.set()        # over the render budget, finish next frame
+
+    def send_status(self):
+        if not self.ble.is_connected():
+            self.proto.active = False
+        elif self.proto.active:
+            self.proto.status()             # changed fields only, packed in one notification
+        else:
+            self.ble.send(self.status_message())
+
+    async def input_task(self):
+        driver = self.button_driver
+        while True:
+            self.poll_input()
+            if driver is not None and driver.idle():
+                await self.input_flag.wait()    # set by the button irq, also when it came after idle()
+            else:
+                await asyncio.sleep(self.input_interval_ms / 1000)
+
+    async def command_task(self):
+        while True:
+            cmd = await self.commands.get()
+            self.execute(cmd)
+
+    async def tuner_task(self):
+        while True:
+            await self.tuner_event.wait()
+            self.tuner_event.clear()
+            direction = self.seek_direction
+            if direction is not None:
+                self.seek_direction = None
+                await self.navigator.run(direction, self.on_seek_progress, self.on_seek_complete)
+            await self.radio.tuner.wait()
+
+    async def status_task(self):
+        while True:
+            self.poll_status()
+            if self.monitor is None:
+                await asyncio.sleep(self.status_interval_ms / 1000)
+            else:
+                await asyncio.sleep(min(self.monitor.ms_until_due(), self.monitor.fast_ms) / 1000)
+
+    def scanning(self):
+        return self.scanner is not None and self.scanner.busy()
+
+    def stop_scan(self):
+
+        """ End an idle rescan before a user tune or seek, its restore tune would undo it """
+
+        if self.scanning():
+            self.scanner.stop()
+
+    async def scan_task(self):
+        scanner = self.scanner
+        index = scanner.index
+        ticks = 0
+        while True:
+            await asyncio.sleep(self.scan_interval_ms / 1000)
+            ticks += 1
+            index.poll_age()                # also while playing, when there are no sweeps
+            if ticks >= self.index_save_ticks and index.dirty:
+                # entries learned from tunes and seeks, saved rarely to spare the flash
+                self.index_save = True
+                ticks = 0
+            # a single tuner can only look at other channels while the user has muted it
+            if not self.radio.mute_flag or self.radio.tuner.busy():
+                continue
+            sweeps = index.sweeps
+            await scanner.run(self.scan_slice)
+            if index.sweeps != sweeps:
+                self.index_save = True
+                ticks = 0
+
+    def flash_writers(self):
+        writers = []
+        if self.journal is not None:
+            writers.append(self.journal.poll)
+        if self.signal_log is not None:
+            writers.append(self.signal_log.poll)
+        if self.scanner is not None:
+            writers.append(self.save_index)
+        return writers
+
+    def save_index(self):
+        if not self.index_save:
+            return False
+        self.index_save = False
+        self.scanner.index.save()
+        return True
+
+    async def flash_task(self):
+        writers = self.flash_writers()
+        tuner = self.radio.tuner
+        while True:
+            await asyncio.sleep(1)
+            for write in writers:
+                while tuner.busy():
+                    await asyncio.sleep(0.05)
+                t = time.ticks_us()
+                if write():
+                    us = time.ticks_diff(time.ticks_us(), t)
+                    self.flash_writes += 1
+                    if us > self.flash_max_us:
+                        self.flash_max_us = us
+                    await asyncio.sleep(0)
+
+    async def display_task(self):
+        view = self.view
+        view.clear()
+        while True:
+            await self.display_event.wait()
+            self.display_event.clear()
+            # frame-rate cap, changes arriving meanwhile go into the same frame
+            wait = view.ms_until_frame()
+            if wait:
+                await asyncio.sleep(wait / 1000)
+            self.render()
+
+    async def ble_task(self):
+        while True:
+            function, args = await self.ble_rx_queue.get()
+            self.ble_execute(function, args)
+
+    async def ble_status_task(self):
+        while True:
+            await self.ble_status_event.wait()
+            self.ble_status_event.clear()
+            self.send_status()
+
+    def status_message(self):
+        khz, stereo, rssi, volume, mute, bass, out_mono = self.radio.get_status()
+        return 'status ' + radioRDA5807.format_khz(khz) + ' ' + stereo + ' ' + str(rssi) + ' ' + str(volume) + ' ' + mute + ' ' + bass + ' ' + out_mono
+
+    async def main(self):
+        if self.radio.tuner.state == radioRDA5807.ENGINE_COMPLETE:
+            self.tuned()                    # tuned to the saved station by the power-up burst
+        elif len(self.stations):
+            self.tune_channel(self.stations.channels[0])
+        else:
+            self.tune_channel(0)            # no presets in the region: the bottom of the band
+        tasks = [self.input_task(), self.command_task(), self.tuner_task(),
+                 self.status_task(), self.display_task()]
+        if self.scanner is not None:
+            tasks.append(self.scan_task())
+        if self.rds_poller is not None:
+            tasks.append(self.rds_poller.run())
+        if self.bus is not None:
+            tasks.append(self.bus.run())
+        if self.journal is not None or self.signal_log is not None or self.scanner is not None:
+            tasks.append(self.flash_task())
+        if self.ble is not None:
+            tasks.append(self.ble_task())
+            tasks.append(self.ble_status_task())
+        await asyncio.gather(*tasks)
+
+    def run(self):
+        asyncio.run(self.main())
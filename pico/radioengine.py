@@ -0,0 +1,302 @@
+#
+# Radio engine on core 1: owns I2C(0), core 0 talks to it through mailboxes
+#
+# Copyright (c) 2025 ha864git
+#
+# License: MIT
+#
+# The engine thread (_thread, the second core of the RP2040) does every bus
+# transaction: it writes the registers posted by core 0, polls the status block
+# (every busy_ms while a tune or seek runs, else every status_ms) and pumps the
+# queued OLED writes of the i2cbus.BusManager. Core 0 keeps an ordinary
+# RadioRDA5807 whose I2C object is EngineI2C:
+#
+#   engine = radioengine.RadioEngine(bus)
+#   engine.start()
+#   radio = radioRDA5807.RadioRDA5807(engine.i2c(), profile=profile)
+#
+# so the tuner state machine, the app, RDS and BLE run unchanged and never wait
+# for the bus. Both mailboxes are preallocated and guarded by one lock that is
+# only held to copy a few bytes:
+#   command mailbox   reg/value pairs, a write to the register of the last
+#                     queued pair replaces it, unless that pair is a pulse
+#                     (radioRDA5807.is_pulse: any CONFIG, TUNING with TUNE)
+#                     that must reach the chip; a sequential write
+#                     (0x10, from 0x02) is one BURST entry and its bytes, sent
+#                     by core 1 as one transaction again
+#   status mailbox    image of registers 0x00-0x0F, 0x0A-0x0F refreshed by
+#                     every poll, 0x02-0x07 as last written
+# Until the engine has polled after the newest posted write, reads of 0x0A see
+# STC cleared, so a tune or seek is never taken as complete from an old snapshot.
+#
+# Runs on CPython threads with the emulator (bench/bench_dualcore.py).
+#
+import errno
+import time
+import _thread
+from array import array
+
+import i2cbus
+from radioRDA5807 import is_pulse, probe
+
+SEQUENTIAL_ACCESS_ADDRESS = 0x10
+RANDOM_ACCESS_ADDRESS = 0x11
+SEQUENTIAL_WRITE_REG = 0x02
+STATUS_REG = 0x0A
+IMAGE_REGS = 0x10
+STATUS_OFFSET = STATUS_REG * 2
+
+REG_CONFIG = 0x02
+REG_TUNING = 0x03
+CONFIG_SEEK = 0x0100
+TUNING_TUNE = 0x0010
+STATUS_STC_HI = 0x40            # STC in the high byte of 0x0A
+BURST = 0xff                    # command mailbox entry of the sequential write
+BURST_MAX = (STATUS_REG - SEQUENTIAL_WRITE_REG) * 2     # 0x02-0x09, the writable registers
+
+class EngineI2C:
+
+    """ machine.I2C interface of the RDA5807M on core 0, served from the engine mailboxes """
+
+    def __init__(self, engine):
+        self.engine = engine
+
+    def scan(self):
+        return self.engine.found
+
+    def readfrom_into(self, addr, buf, stop=True):
+        self.engine.read_image(STATUS_OFFSET, buf)
+
+    def readfrom_mem_into(self, addr, memaddr, buf, addrsize=8):
+        self.engine.read_image(memaddr * 2, buf)
+
+    def writeto_mem(self, addr, memaddr, buf, addrsize=8):
+        for i in range(0, len(buf) - 1, 2):
+            self.engine.post(memaddr + (i >> 1), (buf[i] << 8) | buf[i + 1])
+
+    def writeto(self, addr, buf, stop=True):
+        if not buf:                         # address probe, answered from the probe of start()
+            if addr not in self.engine.found:
+                raise OSError(errno.EIO)
+            return 1
+        if addr == SEQUENTIAL_ACCESS_ADDRESS and len(buf) <= BURST_MAX:
+            self.engine.post_burst(buf)
+        elif addr == SEQUENTIAL_ACCESS_ADDRESS:
+            self.writeto_mem(addr, SEQUENTIAL_WRITE_REG, buf)
+        else:
+            self.writeto_mem(addr, buf[0], memoryview(buf)[1:])
+
+class RadioEngine:
+
+    """ Bus owner thread of the RDA5807M and the OLED
+
+    arguments:
+    bus                     - i2cbus.BusManager of I2C(0), the engine pumps its queued writes
+    status_ms               - status poll interval while nothing is in progress
+    busy_ms                 - status poll interval while a tune or seek is in progress
+    slots                   - register writes the command mailbox holds
+
+    """
+
+    def __init__(self, bus, status_ms=20, busy_ms=2, slots=16):
+        self.bus = bus
+        self.i2c_client = bus.client(i2cbus.PRIO_TUNER)
+        self.status_ms = status_ms
+        self.busy_ms = busy_ms
+        self.slots = slots
+        self.lock = _thread.allocate_lock()
+        # command mailbox, core 0 -> core 1
+        self.regs = bytearray(slots)
+        self.values = array('H', [0] * slots)
+        self.count = 0
+        self.posted = 0                     # sequence number of the newest posted write
+        self.burst = bytearray(BURST_MAX)   # bytes of the BURST entry
+        self.burst_len = 0                  # 0 = no BURST entry queued
+        # status mailbox, core 1 -> core 0
+        self.image = bytearray(IMAGE_REGS * 2)
+        self.applied = 0                    # newest write the image status reflects
+        # engine side copies
+        self.take_regs = bytearray(slots)
+        self.take_values = array('H', [0] * slots)
+        self.status_buf = bytearray((IMAGE_REGS - STATUS_REG) * 2)
+        self.take_burst = bytearray(BURST_MAX)
+        self.take_burst_mv = memoryview(self.take_burst)
+        self.take_burst_len = 0
+        self.reg_buf = bytearray(2)
+        self.found = []
+        self.running = False
+        self.stopped = True
+        self.loops = 0
+        self.polls = 0
+        self.writes = 0
+        self.waits = 0                      # posts that waited for a free slot
+
+    def i2c(self):
+        return EngineI2C(self)
+
+    def start(self):
+
+        """ Probe the RDA5807M, read the register image and start the engine thread """
+
+        self.found = [addr for addr in (SEQUENTIAL_ACCESS_ADDRESS, RANDOM_ACCESS_ADDRESS) if probe(self.i2c_client, addr)]
+        if RANDOM_ACCESS_ADDRESS in self.found:
+            self.i2c_client.readfrom_mem_into(RANDOM_ACCESS_ADDRESS, 0, self.image)
+        self.running = True
+        self.stopped = False
+        _thread.start_new_thread(self.loop, ())
+
+    def stop(self):
+
+        """ Stop the engine thread and wait for it """
+
+        self.running = False
+        while not self.stopped:
+            time.sleep_ms(1)
+
+    # -- core 0 --
+
+    def post(self, reg, value):
+
+        """ Queue a register write for core 1 """
+
+        while True:
+            with self.lock:
+                n = self.count
+                if n and self.regs[n - 1] == reg and not is_pulse(reg, self.values[n - 1]):
+                    self.values[n - 1] = value
+                    self.posted += 1
+                    return
+                if n < self.slots:
+                    self.regs[n] = reg
+                    self.values[n] = value
+                    self.count = n + 1
+                    self.posted += 1
+                    return
+            self.waits += 1
+            time.sleep_ms(1)
+
+    def post_burst(self, buf):
+
+        """ Queue a sequential write of registers 0x02 onwards for core 1, sent as one transaction """
+
+        n = len(buf)
+        while True:
+            with self.lock:
+                count = self.count
+                if count and self.regs[count - 1] == BURST:         # replaces the queued burst
+                    self.burst[:n] = buf
+                    self.burst_len = n
+                    self.posted += 1
+                    return
+                if self.burst_len == 0 and count < self.slots:
+                    self.regs[count] = BURST
+                    self.count = count + 1
+                    self.burst[:n] = buf
+                    self.burst_len = n
+                    self.posted += 1
+                    return
+            self.waits += 1
+            time.sleep_ms(1)
+
+    def read_image(self, offset, buf):
+
+        """ Copy registers from the status mailbox, registers past 0x0F read as 0 """
+
+        with self.lock:
+            n = len(buf)
+            m = len(self.image) - offset
+            if m > n:
+                m = n
+            if m < 0:
+                m = 0
+            if m == n:
+                buf[:n] = self.image[offset:offset + n]
+            else:                           # never assign a shorter slice, it would resize buf
+                for i in range(n):
+                    buf[i] = self.image[offset + i] if i < m else 0
+            if self.applied != self.posted and offset <= STATUS_OFFSET < offset + n:
+                buf[STATUS_OFFSET - offset] &= ~STATUS_STC_HI
+
+    def pending(self):
+        return self.applied != self.posted
+
+    # -- core 1 --
+
+    def loop(self):
+        client = self.i2c_client
+        status_buf = self.status_buf
+        busy = False
+        next_ms = time.ticks_ms()
+        try:
+            while self.running:
+                self.loops += 1
+                with self.lock:
+                    n = self.count
+                    posted = self.posted
+                    for i in range(n):
+                        self.take_regs[i] = self.regs[i]
+                        self.take_values[i] = self.values[i]
+                    self.count = 0
+                    if self.burst_len:
+                        self.take_burst[:] = self.burst
+                        self.take_burst_len = self.burst_len
+                        self.burst_len = 0
+                for i in range(n):
+                    if self.write(self.take_regs[i], self.take_values[i]):
+                        busy = True
+                now = time.ticks_ms()
+                if n or time.ticks_diff(now, next_ms) >= 0:
+                    client.readfrom_into(SEQUENTIAL_ACCESS_ADDRESS, status_buf)
+                    self.polls += 1
+                    if status_buf[0] & STATUS_STC_HI:
+                        busy = False
+                    with self.lock:
+                        self.image[STATUS_OFFSET:] = status_buf
+                        self.applied = posted
+                    next_ms = time.ticks_add(now, self.busy_ms if busy else self.status_ms)
+                if not self.bus.pump():
+                    time.sleep_ms(1)
+        finally:
+            self.stopped = True
+
+    def write(self, reg, value):
+
+        """ Write one register (or the BURST), returns True if it starts a tune or seek """
+
+        if reg == BURST:
+            return self.write_burst()
+        buf = self.reg_buf
+        buf[0] = value >> 8
+        buf[1] = value & 0xff
+        self.i2c_client.writeto_mem(RANDOM_ACCESS_ADDRESS, reg, buf)
+        self.writes += 1
+        if reg < IMAGE_REGS:
+            with self.lock:
+                self.image[reg * 2] = buf[0]
+                self.image[reg * 2 + 1] = buf[1]
+        return (reg == REG_TUNING and value & TUNING_TUNE) or (reg == REG_CONFIG and value & CONFIG_SEEK)
+
+    def write_burst(self):
+
+        """ Send the taken sequential write in one transaction, returns True if it starts a tune or seek """
+
+        n = self.take_burst_len
+        buf = self.take_burst
+        self.i2c_client.writeto(SEQUENTIAL_ACCESS_ADDRESS, self.take_burst_mv[:n])
+        self.writes += 1
+        start = SEQUENTIAL_WRITE_REG * 2
+        with self.lock:
+            self.image[start:start + n] = self.take_burst_mv[:n]
+        busy = False
+        for i in range(0, n - 1, 2):
+            reg = SEQUENTIAL_WRITE_REG + (i >> 1)
+            value = (buf[i] << 8) | buf[i + 1]
+            if (reg == REG_TUNING and value & TUNING_TUNE) or (reg == REG_CONFIG and value & CONFIG_SEEK):
+                busy = True
+        return busy
+
+    def stats(self):
+
+        """ 'loops polls writes waits' """
+
+        return '{} {} {} {}'.format(self.loops, self.polls, self.writes, self.waits)
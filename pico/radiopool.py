@@ -0,0 +1,203 @@
+#
+# Several RDA5807M tuners: one plays while the others survey the band
+#
+# Copyright (c) 2025 ha864git
+#
+# License: MIT
+#
+# Every tuner is a RadioRDA5807 on its own bus (I2C(0), I2C(1) or a SoftI2C),
+# since the chip has fixed addresses. One tuner has ROLE_LISTEN and plays, the
+# others have ROLE_SCAN: they stay muted and sweep the band without pause with
+# a BandScanner each, all recording into one ChannelIndex:
+#
+#   radios = [radioRDA5807.RadioRDA5807(I2C(0, sda=Pin(4), scl=Pin(5)), profile=profile),
+#             radioRDA5807.RadioRDA5807(I2C(1, sda=Pin(6), scl=Pin(7)), profile=profile)]
+#   pool = radiopool.RadioPool(radios, index)
+#   pool.on_swap = app_follows_the_new_listener
+#
+# A channel a scanner measured within fresh_ms with FM_TRUE and enough RSSI is
+# verified. select(chan) of a verified channel does not retune the listener:
+#   SELECT_SWAP       a scanner is sitting on chan, it is unmuted at once and
+#                     the listener becomes a scanner
+#   SELECT_PREPARE    a scanner tunes to chan muted while the listener keeps
+#                     playing, the roles swap when it is locked (poll())
+#   SELECT_DIRECT     not verified, the listener tunes as with a single tuner
+# The new listener takes volume, mono, bass and mute of the old one and is
+# unmuted before the old one is muted, so there is no silent gap.
+#
+try:
+    import uasyncio as asyncio
+except ImportError:
+    import asyncio
+import time
+from array import array
+
+import bandscan
+import radioRDA5807
+
+ROLE_LISTEN = 0
+ROLE_SCAN = 1
+
+SELECT_SWAP = 0
+SELECT_PREPARE = 1
+SELECT_DIRECT = 2
+
+class RadioPool:
+
+    """ Listen and scan roles over several tuners sharing a ChannelIndex
+
+    arguments:
+    radios                  - RadioRDA5807 on different buses, radios[0] starts listening
+    index                   - ChannelIndex for the band/spacing of the radios
+    fresh_ms                - a scanner measurement this recent verifies a channel
+    rssi_threshold          - minimum RSSI of a verified channel
+    settle_ms               - BandScanner wait before a channel is measured
+
+    """
+
+    def __init__(self, radios, index, fresh_ms=30000, rssi_threshold=20, settle_ms=30):
+        self.radios = list(radios)
+        self.index = index
+        self.fresh_ms = fresh_ms
+        self.rssi_threshold = rssi_threshold
+        self.roles = bytearray(len(self.radios))
+        self.scanners = []
+        for radio in self.radios:
+            scanner = bandscan.BandScanner(radio, index, settle_ms, mute=False)
+            scanner.on_measured = self.measured
+            self.scanners.append(scanner)
+        self.seen = bytearray(index.nchan)          # 1 = seen_ms[chan] is valid
+        self.seen_ms = array('L', [0] * index.nchan)
+        self.listening = 0                          # index of the listener
+        self.pending = None                         # index of the scanner tuning for a swap
+        self.pending_chan = 0
+        self.on_swap = None                         # called with the new listener
+        self.swaps = 0
+        self.prepared = 0
+        self.direct = 0
+        for i in range(len(self.radios)):
+            self.roles[i] = ROLE_LISTEN if i == 0 else ROLE_SCAN
+            if i:
+                self.radios[i].mute(True)
+                self.scanners[i].start(restore=False)
+
+    @property
+    def listener(self):
+        return self.radios[self.listening]
+
+    def measured(self, chan, status):
+        self.seen[chan] = 1
+        self.seen_ms[chan] = time.ticks_ms()
+
+    def verified(self, chan):
+
+        """ True if a scanner found a station on chan within fresh_ms """
+
+        index = self.index
+        return (self.seen[chan] and time.ticks_diff(time.ticks_ms(), self.seen_ms[chan]) <= self.fresh_ms
+                and index.fm_true(chan) and index.rssi[chan] >= self.rssi_threshold)
+
+    def select(self, chan):
+
+        """ Go to chan, returns SELECT_SWAP, SELECT_PREPARE or SELECT_DIRECT """
+
+        self.cancel()
+        if self.verified(chan):
+            for i in range(len(self.radios)):
+                scanner = self.scanners[i]
+                if self.roles[i] == ROLE_SCAN and scanner.state == bandscan.SCAN_SETTLING and scanner.chan == chan:
+                    scanner.stop()
+                    self.swap(i)
+                    return SELECT_SWAP
+            for i in range(len(self.radios)):
+                if self.roles[i] == ROLE_SCAN:
+                    self.scanners[i].stop()
+                    self.radios[i].tuner.start_tune(chan)
+                    self.pending = i
+                    self.pending_chan = chan
+                    self.prepared += 1
+                    return SELECT_PREPARE
+        self.direct += 1
+        self.listener.tuner.start_tune(chan)
+        return SELECT_DIRECT
+
+    def cancel(self):
+
+        """ Drop a prepared swap, the scanner goes back to its sweep """
+
+        if self.pending is not None:
+            self.radios[self.pending].tuner.abort()
+            self.scanners[self.pending].start(restore=False)
+            self.pending = None
+
+    def swap(self, i):
+
+        """ Make radios[i] the listener with the audio settings of the current one """
+
+        old = self.listener
+        new = self.radios[i]
+        new.set_volume(old.get_volume())
+        new.mono(old.mono_flag)
+        new.bass_boost(old.bass_boost_flag)
+        new.mute(old.mute_flag)                     # both play for one transaction
+        old.mute(True)
+        self.roles[self.listening] = ROLE_SCAN
+        self.scanners[self.listening].start(restore=False)
+        self.roles[i] = ROLE_LISTEN
+        self.listening = i
+        self.swaps += 1
+        if self.on_swap is not None:
+            self.on_swap(new)
+
+    def poll(self):
+
+        """ Advance the scans, a prepared swap and a direct tune of the listener """
+
+        listener = self.listener.tuner
+        if listener.busy():
+            listener.poll()
+        for i in range(len(self.radios)):
+            if self.roles[i] == ROLE_SCAN and i != self.pending:
+                scanner = self.scanners[i]
+                if not scanner.poll():
+                    scanner.start(restore=False)    # the next sweep
+        if self.pending is not None:
+            i = self.pending
+            state = self.radios[i].tuner.poll()
+            if state >= radioRDA5807.ENGINE_COMPLETE:
+                self.pending = None
+                if state == radioRDA5807.ENGINE_COMPLETE:
+                    self.swap(i)
+                else:
+                    self.scanners[i].start(restore=False)
+                    self.direct += 1
+                    self.listener.tuner.start_tune(self.pending_chan)
+
+    def ms_until_poll(self):
+        ms = 1000
+        if self.listener.tuner.busy():
+            ms = self.listener.tuner.ms_until_poll()
+        for i in range(len(self.radios)):
+            if self.roles[i] == ROLE_SCAN:
+                if i == self.pending:
+                    ms = min(ms, self.radios[i].tuner.ms_until_poll())
+                else:
+                    ms = min(ms, self.scanners[i].ms_until_poll())
+        return ms
+
+    def stats(self):
+
+        """ 'listener swaps prepared direct scanned' """
+
+        scanned = 0
+        for scanner in self.scanners:
+            scanned += scanner.scanned
+        return '{} {} {} {} {}'.format(self.listening, self.swaps, self.prepared, self.direct, scanned)
+
+    async def run(self):
+
+        """ Pool task: keeps the scanners sweeping and completes prepared swaps """
+
+        while True:
+            self.poll()
+            await asyncio.sleep(self.ms_until_poll() / 1000)
@@ -0,0 +1,238 @@
+#
+# Incremental RDS/RBDS decoder for the RDA5807M
+#
+# Copyright (c) 2025 ha864git
+#
+# License: MIT
+#
+# Groups are taken from the status block (0x0A-0x0F, one sequential read), groups
+# with block errors are dropped, and PI, Programme Service name (0A/0B),
+# RadioText (2A/2B) and clock time (4A) are assembled in preallocated buffers.
+# decode() has no hardware dependency, so recorded group streams can be replayed
+# on CPython.
+#
+try:
+    import uasyncio as asyncio
+except ImportError:
+    import asyncio
+
+PS_LEN = 8
+RT_LEN = 64
+RT_LEN_B = 32                   # 2B groups carry 2 characters at addresses 0-15
+
+GROUP_PS = 0
+GROUP_RT = 2
+GROUP_CT = 4
+
+def ascii_text(buf):
+
+    """ Text of RDS characters, those outside printable ASCII (the RDS character set) become '?' """
+
+    out = bytearray(buf)
+    for i in range(len(out)):
+        if out[i] < 0x20 or out[i] > 0x7e:
+            out[i] = 0x3f
+    return out.decode().strip()
+
+class RDSDecoder:
+
+    """ Assembles PI, PS, RadioText and clock time from RDS groups
+
+    arguments:
+    max_bler                - highest BLERA/BLERB level accepted (0 = error free blocks only)
+    on_pi(pi)               - called when the PI code changes
+    on_ps(ps)               - called with the complete PS name (bytearray) when it changes
+    on_rt(rt)               - called with the complete RadioText (bytearray) when it changes
+    on_ct(decoder)          - called when a clock time group is received
+
+    """
+
+    def __init__(self, max_bler=0, on_pi=None, on_ps=None, on_rt=None, on_ct=None):
+        self.max_bler = max_bler
+        self.on_pi = on_pi
+        self.on_ps = on_ps
+        self.on_rt = on_rt
+        self.on_ct = on_ct
+        self.ps = bytearray(b' ' * PS_LEN)          # last complete PS name
+        self.ps_work = bytearray(b' ' * PS_LEN)
+        self.rt = bytearray(b' ' * RT_LEN)          # last complete RadioText
+        self.rt_work = bytearray(b' ' * RT_LEN)
+        self.last = [0, 0, 0, 0]
+        self.groups = 0
+        self.dropped = 0
+        self.reset()
+
+    def reset(self):
+
+        """ Forget the station (call after every tune) """
+
+        self.pi = -1
+        self.ps_mask = 0
+        self.rt_mask = 0
+        self.rt_ab = -1
+        self.rt_end = RT_LEN                        # of rt_work
+        self.rt_len = RT_LEN                        # of the published rt
+        self.ps_valid = False
+        self.rt_valid = False
+        self.mjd = 0
+        self.hour = 0
+        self.minute = 0
+        self.offset = 0                             # local time offset in half hours
+        for i in range(PS_LEN):
+            self.ps[i] = 0x20
+            self.ps_work[i] = 0x20
+        for i in range(RT_LEN):
+            self.rt[i] = 0x20
+            self.rt_work[i] = 0x20
+        self.last[0] = self.last[1] = self.last[2] = self.last[3] = 0
+
+    def feed(self, st):
+
+        """ Take the group of a RadioStatus snapshot, returns True if a new group was decoded """
+
+        if not st.rdsr:
+            return False
+        rds = st.rds
+        last = self.last
+        if rds[0] == last[0] and rds[1] == last[1] and rds[2] == last[2] and rds[3] == last[3]:
+            return False                            # same group read twice
+        last[0] = rds[0]
+        last[1] = rds[1]
+        last[2] = rds[2]
+        last[3] = rds[3]
+        if st.blera > self.max_bler or st.blerb > self.max_bler:
+            self.dropped += 1
+            return False
+        self.decode(rds[0], rds[1], rds[2], rds[3])
+        return True
+
+    def decode(self, a, b, c, d):
+
+        """ Decode one group of blocks A-D """
+
+        self.groups += 1
+        if a != self.pi:
+            if self.pi >= 0:
+                self.reset()
+            self.pi = a
+            if self.on_pi:
+                self.on_pi(a)
+        group = b >> 12
+        version_b = (b & 0x0800) != 0
+        if group == GROUP_PS:
+            self.ps_segment(b & 0x03, d)
+        elif group == GROUP_RT:
+            self.rt_segment(b, c, d, version_b)
+        elif group == GROUP_CT and not version_b:
+            self.mjd = ((b & 0x03) << 15) | (c >> 1)
+            self.hour = ((c & 0x01) << 4) | (d >> 12)
+            self.minute = (d >> 6) & 0x3f
+            self.offset = -(d & 0x1f) if d & 0x20 else d & 0x1f
+            if self.on_ct:
+                self.on_ct(self)
+
+    def ps_segment(self, address, d):
+        work = self.ps_work
+        work[address * 2] = d >> 8
+        work[address * 2 + 1] = d & 0xff
+        self.ps_mask |= 1 << address
+        if self.ps_mask != 0x0f:
+            return
+        self.ps_mask = 0
+        if self.ps_valid and work == self.ps:
+            return
+        self.ps[:] = work
+        self.ps_valid = True
+        if self.on_ps:
+            self.on_ps(self.ps)
+
+    def rt_segment(self, b, c, d, version_b):
+        work = self.rt_work
+        ab = (b >> 4) & 0x01
+        if ab != self.rt_ab:
+            # text A/B flag toggled, a new RadioText follows
+            self.rt_ab = ab
+            self.rt_mask = 0
+            self.rt_end = RT_LEN_B if version_b else RT_LEN
+            for i in range(RT_LEN):
+                work[i] = 0x20
+        address = b & 0x0f
+        if version_b:
+            pos = address * 2
+        else:
+            pos = address * 4
+            self.rt_char(pos, c >> 8)
+            self.rt_char(pos + 1, c & 0xff)
+            pos += 2
+        self.rt_char(pos, d >> 8)
+        self.rt_char(pos + 1, d & 0xff)
+        self.rt_mask |= 1 << address
+        step = 2 if version_b else 4
+        end = min(self.rt_end, RT_LEN_B if version_b else RT_LEN)
+        needed = (1 << ((end + step - 1) // step)) - 1
+        if self.rt_mask & needed != needed:
+            return
+        self.rt_mask = 0
+        if self.rt_valid and work == self.rt and self.rt_len == self.rt_end:
+            return
+        self.rt[:] = work
+        self.rt_len = self.rt_end
+        self.rt_valid = True
+        if self.on_rt:
+            self.on_rt(self.rt)
+
+    def rt_char(self, pos, ch):
+        if ch == 0x0d:
+            self.rt_end = pos                       # end of RadioText
+            ch = 0x20
+        self.rt_work[pos] = ch
+
+    def ps_text(self):
+        return ascii_text(self.ps) if self.ps_valid else ''
+
+    def rt_text(self):
+        return ascii_text(self.rt[:self.rt_len]) if self.rt_valid else ''
+
+    def replay(self, groups):
+
+        """ Decode an iterable of (a, b, c, d) groups, e.g. a recorded stream """
+
+        for a, b, c, d in groups:
+            self.decode(a, b, c, d)
+
+class RDSPoller:
+
+    """ Polls the radio for RDS groups without busy-waiting
+
+    At 11.4 groups/s a group lasts 87.6 ms, polling every interval_ms (well
+    below that) catches every group. A poll reads STATUS alone (2 bytes) and
+    the status block only when RDSR is set, so a station without RDS costs
+    one 2-byte read per poll.
+
+    arguments:
+    radio                   - RadioRDA5807
+    decoder                 - RDSDecoder
+    interval_ms             - time between status block reads
+    i2c                     - bus to read through, e.g. an i2cbus client at PRIO_RDS, None = the radio's
+
+    """
+
+    def __init__(self, radio, decoder, interval_ms=40, i2c=None):
+        self.radio = radio
+        self.decoder = decoder
+        self.interval_ms = interval_ms
+        self.i2c = i2c
+
+    def poll(self):
+
+        """ STATUS read, and the status block when RDSR is set, returns True if a new group was decoded """
+
+        if not self.radio.read_rdsr(self.i2c):
+            return False
+        return self.decoder.feed(self.radio.read_status_block(self.i2c))
+
+    async def run(self):
+        while True:
+            if not self.radio.tuner.busy():
+                self.poll()
+            await asyncio.sleep(self.interval_ms / 1000)
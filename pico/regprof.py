@@ -0,0 +1,206 @@
+#
+# Register I/O profiler and transaction trace for RadioRDA5807
+#
+# Copyright (c) 2025 ha864git
+#
+# License: MIT
+#
+# radio.enable_profiling() puts a ProfilingI2C between the driver and the bus,
+# disable_profiling() takes it out again, so the register path costs nothing
+# while profiling is off. Status reads through another bus client (RDS polls,
+# read_status_block(i2c)) are recorded as well. Recorded:
+#   per-register read and write counts (registers 0x00-0x3F)
+#   ticks_us latency histograms of read and write transactions
+#   status polls of every tune and seek (TuneSeekEngine busy-wait iterations)
+#   a ring buffer of the last TRACE_SIZE transactions
+#
+# Reports are text lines, sent by the 'stats'/'trace' BLE commands or printed
+# on the console (after Ctrl-C the REPL still has 'radio'):
+#   >>> radio.profiler.report()
+#   >>> radio.profiler.trace()
+#
+import time
+from array import array
+
+NREGS = 0x40
+# latency buckets: < 64, 128, 256, 512, 1024, 2048, 4096 us and >= 4096 us
+BUCKETS = 8
+BUCKET_MIN_US = 64
+TRACE_SIZE = 32
+
+SEQUENTIAL_ACCESS_ADDRESS = 0x10
+RANDOM_ACCESS_ADDRESS = 0x11
+SEQUENTIAL_WRITE_REG = 0x02
+SEQUENTIAL_READ_REG = 0x0A
+
+TRACE_READ = 0
+TRACE_WRITE = 1
+
+ENGINE_TUNE = 0
+ENGINE_SEEK = 1
+
+def bucket(us):
+    i = 0
+    limit = BUCKET_MIN_US
+    while us >= limit and i < BUCKETS - 1:
+        i += 1
+        limit <<= 1
+    return i
+
+class ProfilingI2C:
+
+    """ I2C proxy recording the register traffic of the RDA5807M
+
+    arguments:
+    i2c                     - the I2C bus of the radio
+    trace_size              - transactions kept in the ring buffer
+
+    """
+
+    def __init__(self, i2c, trace_size=TRACE_SIZE):
+        self.i2c = i2c
+        self.reads = array('L', [0] * NREGS)
+        self.writes = array('L', [0] * NREGS)
+        self.read_hist = array('L', [0] * BUCKETS)
+        self.write_hist = array('L', [0] * BUCKETS)
+        self.engine_ops = array('L', [0, 0])         # tunes, seeks
+        self.engine_polls = array('L', [0, 0])       # status polls of all tunes, seeks
+        self.engine_max = array('L', [0, 0])         # most polls of one tune, seek
+        self.engine_failed = array('L', [0, 0])      # failed or timed out
+        self.trace_size = trace_size
+        self.trace_us = array('L', [0] * trace_size)
+        self.trace_op = bytearray(trace_size)        # TRACE_READ/TRACE_WRITE << 7 | address
+        self.trace_reg = bytearray(trace_size)
+        self.trace_len = bytearray(trace_size)
+        self.trace_lat = array('H', [0] * trace_size)
+        self.trace_head = 0
+        self.trace_count = 0
+        self.pointer = 0                             # random access register pointer of the chip
+        self.start_us = time.ticks_us()
+
+    def clear(self):
+        for a in (self.reads, self.writes, self.read_hist, self.write_hist,
+                  self.engine_ops, self.engine_polls, self.engine_max, self.engine_failed):
+            for i in range(len(a)):
+                a[i] = 0
+        self.trace_head = 0
+        self.trace_count = 0
+        self.start_us = time.ticks_us()
+
+    def record(self, op, addr, reg, nbytes, t0):
+        lat = time.ticks_diff(time.ticks_us(), t0)
+        nregs = nbytes >> 1
+        counts = self.writes if op == TRACE_WRITE else self.reads
+        for i in range(nregs):
+            counts[(reg + i) & (NREGS - 1)] += 1
+        hist = self.write_hist if op == TRACE_WRITE else self.read_hist
+        hist[bucket(lat)] += 1
+        i = self.trace_head
+        self.trace_us[i] = t0
+        self.trace_op[i] = (op << 7) | addr
+        self.trace_reg[i] = reg
+        self.trace_len[i] = min(nbytes, 255)
+        self.trace_lat[i] = min(lat, 0xffff)
+        self.trace_head = (i + 1) % self.trace_size
+        if self.trace_count < self.trace_size:
+            self.trace_count += 1
+
+    def engine_done(self, seek, polls, failed):
+
+        """ Called by TuneSeekEngine.finish """
+
+        self.engine_ops[seek] += 1
+        self.engine_polls[seek] += polls
+        if polls > self.engine_max[seek]:
+            self.engine_max[seek] = polls
+        if failed:
+            self.engine_failed[seek] += 1
+
+    # -- machine.I2C --
+
+    def scan(self):
+        return self.i2c.scan()
+
+    def writeto(self, addr, buf, stop=True):
+        t0 = time.ticks_us()
+        n = self.i2c.writeto(addr, buf)
+        if not buf:
+            return n                        # address probe
+        if addr == SEQUENTIAL_ACCESS_ADDRESS:
+            self.record(TRACE_WRITE, addr, SEQUENTIAL_WRITE_REG, len(buf), t0)
+        else:
+            reg = buf[0]
+            self.record(TRACE_WRITE, addr, reg, len(buf) - 1, t0)
+            self.pointer = reg + ((len(buf) - 1) >> 1)
+        return n
+
+    def writeto_mem(self, addr, memaddr, buf, addrsize=8):
+        t0 = time.ticks_us()
+        self.i2c.writeto_mem(addr, memaddr, buf)
+        self.record(TRACE_WRITE, addr, memaddr, len(buf), t0)
+        self.pointer = memaddr + (len(buf) >> 1)
+
+    def readfrom_mem_into(self, addr, memaddr, buf, addrsize=8):
+        t0 = time.ticks_us()
+        self.i2c.readfrom_mem_into(addr, memaddr, buf)
+        self.pointer = memaddr
+        self.read_done(addr, len(buf), t0)
+
+    def readfrom(self, addr, nbytes, stop=True):
+        t0 = time.ticks_us()
+        data = self.i2c.readfrom(addr, nbytes)
+        self.read_done(addr, nbytes, t0)
+        return data
+
+    def readfrom_into(self, addr, buf, stop=True):
+        t0 = time.ticks_us()
+        self.i2c.readfrom_into(addr, buf)
+        self.read_done(addr, len(buf), t0)
+
+    def readfrom_into_via(self, i2c, addr, buf):
+
+        """ readfrom_into through another bus client of the radio (the RDS poller's), recorded like the own reads """
+
+        t0 = time.ticks_us()
+        i2c.readfrom_into(addr, buf)
+        self.read_done(addr, len(buf), t0)
+
+    def read_done(self, addr, nbytes, t0):
+        if addr == SEQUENTIAL_ACCESS_ADDRESS:
+            self.record(TRACE_READ, addr, SEQUENTIAL_READ_REG, nbytes, t0)
+        else:
+            self.record(TRACE_READ, addr, self.pointer, nbytes, t0)
+            self.pointer += nbytes >> 1
+
+    # -- reports --
+
+    def report(self, out=print):
+
+        """ Send the statistics as text lines to out """
+
+        out('stats time ' + str(time.ticks_diff(time.ticks_us(), self.start_us) // 1000) + ' ms')
+        for reg in range(NREGS):
+            if self.reads[reg] or self.writes[reg]:
+                out('stats reg {:02x} r {} w {}'.format(reg, self.reads[reg], self.writes[reg]))
+        out('stats hist r ' + ' '.join(str(n) for n in self.read_hist))
+        out('stats hist w ' + ' '.join(str(n) for n in self.write_hist))
+        for i, name in ((ENGINE_TUNE, 'tune'), (ENGINE_SEEK, 'seek')):
+            out('stats {} n {} polls {} max {} failed {}'.format(
+                name, self.engine_ops[i], self.engine_polls[i], self.engine_max[i], self.engine_failed[i]))
+        out('stats end')
+
+    def trace(self, out=print):
+
+        """ Send the transaction ring, oldest first, as 'trace <dt_us> <r|w> <addr> <reg> <bytes> <us>' """
+
+        n = self.trace_count
+        first = (self.trace_head - n) % self.trace_size
+        t_prev = self.trace_us[first]
+        for k in range(n):
+            i = (first + k) % self.trace_size
+            op = self.trace_op[i]
+            out('trace {} {} {:02x} {:02x} {} {}'.format(
+                time.ticks_diff(self.trace_us[i], t_prev), 'w' if op >> 7 else 'r', op & 0x7f,
+                self.trace_reg[i], self.trace_len[i], self.trace_lat[i]))
+            t_prev = self.trace_us[i]
+        out('trace end')
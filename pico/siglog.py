@@ -0,0 +1,280 @@
+#
+# Signal-quality logger: fixed-size records in a bounded ring file on flash
+#
+# Copyright (c) 2025 ha864git
+#
+# License: MIT
+#
+# Every interval_ms the app hands the status block the SignalMonitor has just
+# read (no extra bus transaction) to sample(), which packs one record into a RAM
+# block. Flash is only written by poll() (the log task of the app): a full
+# block at once, the partly filled block every flush_ms, so sample() never
+# waits for the flash and a block is rewritten only a few times.
+#
+# The file is a ring of blocks; record serial s is in block s // BLOCK_RECORDS,
+# stored in slot (s // BLOCK_RECORDS) % blocks, so the file never grows beyond
+# blocks * BLOCK_SIZE bytes and the oldest block is overwritten first. Serials
+# only ever grow (also across reboots), so an export can resume at any serial.
+#
+# Block format (256 bytes, big endian):
+#   magic(H) count(B) band_space(B) first(I) record[31]
+#   band_space: band << 2 | space of the channel numbers
+# Record format (8 bytes, big endian):
+#   time(I) channel(H) rssi(B) flags(B)
+#   time: boot << 24 | seconds since boot (saturating at 0xFFFFFF)
+#   flags: bit0 FM_TRUE, bit1 stereo
+# The Pico has no battery backed clock, time.time() is not a date unless
+# something set the RTC, so records carry the time since boot and a boot
+# counter (the boot of the newest record + 1, mod 256) instead.
+#
+# Export, in chunks from a serial (first = 0 starts at the oldest record kept):
+#   text (BLE 'log <first>' or siglog.export(print, first, n) on the console)
+#     log <serial> <hex of records>
+#     log next <next serial> <end serial> <band> <space>
+#   binary (bleproto OP_LOG) and read(first, buf)
+# tools/siglog_csv.py turns the ring file or a text capture into CSV.
+#
+import struct
+import time
+
+LOG_FILE = 'siglog.bin'
+BLOCK_SIZE = 256
+BLOCK_HEADER = '>HBBI'
+HEADER_SIZE = 8
+BLOCK_MAGIC = 0x514D            # 'QM', 'QL' blocks had time.time() records
+RECORD = '>IHBB'
+RECORD_SIZE = 8
+BLOCK_RECORDS = (BLOCK_SIZE - HEADER_SIZE) // RECORD_SIZE
+BOOT_SHIFT = 24
+UPTIME_MAX = (1 << BOOT_SHIFT) - 1
+
+FLG_FMTRUE = 0x01
+FLG_STEREO = 0x02
+
+class SignalLog:
+
+    """ Channel, RSSI, stereo and FM_TRUE records in a ring file
+
+    arguments:
+    path                    - ring file
+    band, space             - BAND_/SPACE_ setting of the channel numbers
+    blocks                  - blocks of the ring, the file is at most blocks * BLOCK_SIZE bytes
+    interval_ms             - time between records
+    flush_ms                - a partly filled block is written at most this often
+
+    """
+
+    def __init__(self, path=LOG_FILE, band=0, space=0, blocks=64, interval_ms=5000, flush_ms=60000):
+        self.path = path
+        self.band_space = (band << 2) | space
+        self.blocks = blocks
+        self.interval_ms = interval_ms
+        self.flush_ms = flush_ms
+        self.buf = bytearray(BLOCK_SIZE)        # block being filled
+        self.full = bytearray(BLOCK_SIZE)       # full block waiting for poll()
+        self.full_pending = False
+        self.block = 0                          # block number of buf
+        self.count = 0                          # records in buf
+        self.written = 0                        # records of buf already on flash
+        self.next_ms = time.ticks_ms()
+        self.flushed_ms = self.next_ms
+        self.uptime_ms = self.next_ms           # ticks_ms counts from reset, kept past its wrap
+        self.uptime_ticks = self.next_ms
+        self.boot = 0
+        self.header = bytearray(HEADER_SIZE)
+        self.samples = 0
+        self.block_writes = 0
+        self.overruns = 0                       # full blocks written by sample()
+        self.load()
+
+    def load(self):
+
+        """ Continue after the newest block of the file, with the boot counter of its last record + 1 """
+
+        newest = -1
+        count = 0
+        header = self.header
+        try:
+            with open(self.path, 'rb') as f:
+                for slot in range(self.blocks):
+                    f.seek(slot * BLOCK_SIZE)
+                    if f.readinto(header) != HEADER_SIZE:
+                        break
+                    magic, n, band_space, first = struct.unpack(BLOCK_HEADER, header)
+                    if magic == BLOCK_MAGIC and 0 < n <= BLOCK_RECORDS and first // BLOCK_RECORDS > newest:
+                        newest = first // BLOCK_RECORDS
+                        count = n
+                if newest >= 0:
+                    f.seek((newest % self.blocks) * BLOCK_SIZE)
+                    f.readinto(self.buf)
+                    t = struct.unpack_from(RECORD, self.buf, HEADER_SIZE + (count - 1) * RECORD_SIZE)[0]
+                    self.boot = ((t >> BOOT_SHIFT) + 1) & 0xff
+        except OSError:
+            pass
+        if newest < 0:
+            self.start_block(0)
+        elif count < BLOCK_RECORDS:
+            self.block = newest
+            self.count = count
+            self.written = count
+        else:
+            self.start_block(newest + 1)
+
+    def start_block(self, block):
+        self.block = block
+        self.count = 0
+        self.written = 0
+
+    def end(self):
+
+        """ Serial of the next record """
+
+        return self.block * BLOCK_RECORDS + self.count
+
+    def oldest(self):
+
+        """ Serial of the oldest record kept """
+
+        return max(0, (self.block - self.blocks + 1) * BLOCK_RECORDS)
+
+    def sample(self, status):
+
+        """ Take a RadioStatus if interval_ms has passed, no flash access """
+
+        now = time.ticks_ms()
+        if time.ticks_diff(now, self.next_ms) < 0:
+            return False
+        self.next_ms = time.ticks_add(now, self.interval_ms)
+        self.uptime_ms += time.ticks_diff(now, self.uptime_ticks)
+        self.uptime_ticks = now
+        flags = (FLG_FMTRUE if status.fm_true else 0) | (FLG_STEREO if status.stereo else 0)
+        struct.pack_into(RECORD, self.buf, HEADER_SIZE + self.count * RECORD_SIZE,
+                         (self.boot << BOOT_SHIFT) | min(self.uptime_ms // 1000, UPTIME_MAX),
+                         status.channel, status.rssi, flags)
+        self.count += 1
+        self.samples += 1
+        if self.count == BLOCK_RECORDS:
+            if self.full_pending:
+                self.overruns += 1
+                self.write_full()
+            self.buf, self.full = self.full, self.buf
+            self.set_header(self.full, self.block, BLOCK_RECORDS)
+            self.full_pending = True
+            self.start_block(self.block + 1)
+        return True
+
+    def set_header(self, block, number, count):
+        struct.pack_into(BLOCK_HEADER, block, 0, BLOCK_MAGIC, count, self.band_space, number * BLOCK_RECORDS)
+
+    def write_block(self, block):
+        number = struct.unpack_from(BLOCK_HEADER, block)[3] // BLOCK_RECORDS
+        offset = (number % self.blocks) * BLOCK_SIZE
+        try:
+            f = open(self.path, 'r+b')
+        except OSError:
+            f = open(self.path, 'wb')
+        with f:
+            f.seek(offset)
+            f.write(block)
+        self.block_writes += 1
+
+    def write_full(self):
+        self.write_block(self.full)
+        self.full_pending = False
+
+    def poll(self):
+
+        """ Write a full block, or the partly filled one every flush_ms, returns True if written """
+
+        if self.full_pending:
+            self.write_full()
+            self.flushed_ms = time.ticks_ms()
+            return True
+        if time.ticks_diff(time.ticks_ms(), self.flushed_ms) < self.flush_ms:
+            return False
+        return self.flush()
+
+    def flush(self):
+
+        """ Write everything that is only in RAM """
+
+        if self.full_pending:
+            self.write_full()
+        self.flushed_ms = time.ticks_ms()
+        if self.count == self.written:
+            return False
+        self.set_header(self.buf, self.block, self.count)
+        self.write_block(self.buf)
+        self.written = self.count
+        return True
+
+    def read(self, first, buf):
+
+        """ Copy records from serial first into buf, returns (serial of the first copied, records copied)
+
+        first is moved up to the oldest record kept. Records not yet on flash are included.
+
+        """
+
+        first = max(first, self.oldest())
+        end = self.end()
+        n = 0
+        room = len(buf) // RECORD_SIZE
+        f = None
+        try:
+            while n < room and first + n < end:
+                serial = first + n
+                number = serial // BLOCK_RECORDS
+                i = serial % BLOCK_RECORDS
+                take = min(room - n, BLOCK_RECORDS - i, end - serial)
+                src = HEADER_SIZE + i * RECORD_SIZE
+                if number == self.block:
+                    block = self.buf
+                elif self.full_pending and number == self.block - 1:
+                    block = self.full
+                else:
+                    if f is None:
+                        f = open(self.path, 'rb')
+                    f.seek((number % self.blocks) * BLOCK_SIZE)
+                    f.readinto(self.header)
+                    magic, count, band_space, start = struct.unpack(BLOCK_HEADER, self.header)
+                    if magic != BLOCK_MAGIC or start != number * BLOCK_RECORDS or count <= i:
+                        break                   # lost in a power cut, the export ends here
+                    take = min(take, count - i)
+                    f.seek((number % self.blocks) * BLOCK_SIZE + src)
+                    f.readinto(memoryview(buf)[n * RECORD_SIZE:(n + take) * RECORD_SIZE])
+                    n += take
+                    if i + take < BLOCK_RECORDS:
+                        break
+                    continue
+                buf[n * RECORD_SIZE:(n + take) * RECORD_SIZE] = block[src:src + take * RECORD_SIZE]
+                n += take
+        except OSError:
+            pass
+        finally:
+            if f is not None:
+                f.close()
+        return first, n
+
+    def export(self, out, first=0, count=BLOCK_RECORDS, per_line=2):
+
+        """ Send count records from serial first to out as 'log' text lines, returns the next serial """
+
+        buf = bytearray(per_line * RECORD_SIZE)
+        sent = 0
+        while sent < count:
+            serial, n = self.read(first, memoryview(buf)[:min(per_line, count - sent) * RECORD_SIZE])
+            if n == 0:
+                break
+            out('log {} '.format(serial) + ''.join('{:02x}'.format(b) for b in buf[:n * RECORD_SIZE]))
+            first = serial + n
+            sent += n
+        first = max(first, self.oldest())
+        out('log next {} {} {} {}'.format(first, self.end(), self.band_space >> 2, self.band_space & 3))
+        return first
+
+    def stats(self):
+
+        """ 'oldest end samples block_writes overruns' """
+
+        return '{} {} {} {} {}'.format(self.oldest(), self.end(), self.samples, self.block_writes, self.overruns)
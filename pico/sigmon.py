@@ -0,0 +1,139 @@
+#
+# Adaptive RSSI/stereo monitor with hysteresis and a history ring buffer
+#
+# Copyright (c) 2025 ha864git
+#
+# License: MIT
+#
+# The status block is sampled every fast_ms right after a tune, and the interval
+# doubles with every quiet sample up to slow_ms. RSSI is smoothed with an integer
+# EMA (x16 fixed point, no floats) and a change is only reported when the
+# smoothed value moves by hysteresis or more; stereo has to hold for
+# stereo_samples samples. Every history_ms one byte is stored in the ring:
+#   bits[6:0] smoothed RSSI, bit7 stereo
+#
+import time
+from array import array
+
+EVT_CHANGED = 0x01              # rssi or stereo changed, redraw and send status
+EVT_HISTORY = 0x02              # a history sample was added
+
+HISTORY_STEREO = 0x80
+HISTORY_RSSI = 0x7f
+
+class SignalMonitor:
+
+    """ Smoothed RSSI and stereo of the tuned station
+
+    arguments:
+    radio                   - RadioRDA5807
+    history_size            - samples kept in the history ring
+    history_ms              - interval of the history samples
+    fast_ms                 - sampling interval after a tune or a change
+    slow_ms                 - sampling interval of a stable signal
+    ema_shift               - EMA weight of a new sample is 1 / 2**ema_shift
+    hysteresis              - smallest RSSI change reported
+    stereo_samples          - samples a new stereo state has to hold
+
+    """
+
+    def __init__(self, radio, history_size=128, history_ms=1000, fast_ms=100, slow_ms=1000,
+                 ema_shift=2, hysteresis=2, stereo_samples=2):
+        self.radio = radio
+        self.history_size = history_size
+        self.history_ms = history_ms
+        self.fast_ms = fast_ms
+        self.slow_ms = slow_ms
+        self.ema_shift = ema_shift
+        self.hysteresis = hysteresis
+        self.stereo_samples = stereo_samples
+        self.ring = array('B', bytes(history_size))
+        self.samples = 0
+        self.events = 0
+        self.serial = 0                     # incremented with every history sample, never reset
+        self.reset()
+
+    def reset(self):
+
+        """ Start over after a tune: sample now and fast, clear the history """
+
+        now = time.ticks_ms()
+        self.primed = False
+        self.ema = 0                        # smoothed RSSI x16
+        self.rssi = 0                       # last reported RSSI
+        self.stereo = False                 # last reported stereo state
+        self.stereo_count = 0
+        self.interval_ms = self.fast_ms
+        self.next_ms = now
+        self.history_next_ms = now
+        self.head = 0
+        self.count = 0
+
+    def ms_until_due(self):
+        return max(0, time.ticks_diff(self.next_ms, time.ticks_ms()))
+
+    def poll(self):
+
+        """ Sample if due, returns EVT_CHANGED | EVT_HISTORY flags (0 if nothing happened) """
+
+        now = time.ticks_ms()
+        if time.ticks_diff(now, self.next_ms) < 0:
+            return 0
+        return self.sample(now)
+
+    def sample(self, now):
+        st = self.radio.read_status_block()
+        self.samples += 1
+        events = 0
+        if not self.primed:
+            self.primed = True
+            self.ema = st.rssi << 4
+            self.rssi = st.rssi
+            self.stereo = st.stereo
+            events = EVT_CHANGED
+        else:
+            self.ema += ((st.rssi << 4) - self.ema) >> self.ema_shift
+            rssi = (self.ema + 8) >> 4
+            if rssi - self.rssi >= self.hysteresis or self.rssi - rssi >= self.hysteresis:
+                self.rssi = rssi
+                events = EVT_CHANGED
+            if st.stereo != self.stereo:
+                self.stereo_count += 1
+                if self.stereo_count >= self.stereo_samples:
+                    self.stereo = st.stereo
+                    self.stereo_count = 0
+                    events = EVT_CHANGED
+            else:
+                self.stereo_count = 0
+        if events:
+            self.events += 1
+            self.interval_ms = self.fast_ms
+        elif self.interval_ms < self.slow_ms:
+            self.interval_ms = min(self.interval_ms * 2, self.slow_ms)
+        self.next_ms = time.ticks_add(now, self.interval_ms)
+        if time.ticks_diff(now, self.history_next_ms) >= 0:
+            self.add_history(((self.ema + 8) >> 4) | (HISTORY_STEREO if self.stereo else 0))
+            self.history_next_ms = time.ticks_add(now, self.history_ms)
+            events |= EVT_HISTORY
+        return events
+
+    def add_history(self, value):
+        self.ring[self.head] = value
+        self.head = (self.head + 1) % self.history_size
+        if self.count < self.history_size:
+            self.count += 1
+        self.serial += 1
+
+    def history(self, buf, first=0):
+
+        """ Copy history samples first.. (0 = oldest) into buf, returns the number copied """
+
+        n = min(len(buf), self.count - first)
+        if n <= 0:
+            return 0
+        ring = self.ring
+        size = self.history_size
+        start = self.head - self.count + first
+        for i in range(n):
+            buf[i] = ring[(start + i) % size]
+        return n
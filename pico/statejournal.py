@@ -0,0 +1,163 @@
+#
+# Append-only journal of the listening state, restored at power-up
+#
+# Copyright (c) 2025 ha864git
+#
+# License: MIT
+#
+# Each state change (station, volume, mute/mono/bass, preset position) is kept
+# in RAM and appended to the journal only after the state has been quiet for
+# debounce_ms, so a volume ramp or a burst of station clicks costs one record.
+# Records that equal the last written one are not written. When the file
+# reaches max_records it is compacted to the current record (temporary file,
+# then rename). A torn append only loses the newest record: it fails the check
+# or is a short tail, which makes the next write compact the file.
+#
+# Record format (10 bytes, big endian):
+#   magic(B) seq(B) kHz(I) volume(B) flags(B) preset(b) check(B)
+#   flags: bit0 mute, bit1 mono, bit2 bass
+#   check: sum of the first 9 bytes & 0xff
+#
+# At boot the last valid record is applied to the RadioProfile and the radio
+# is brought up with one sequential access burst that also tunes the station:
+#
+#   journal = statejournal.StateJournal()
+#   khz = journal.restore(profile)          # None on a first boot
+#   radio = radioRDA5807.RadioRDA5807(i2c, profile=profile, khz=khz)
+#
+import os
+import struct
+import time
+
+STATE_FILE = 'state.bin'
+RECORD = '>BBIBBbB'
+RECORD_SIZE = 10
+RECORD_MAGIC = 0xA5
+
+FLG_MUTE = 0x01
+FLG_MONO = 0x02
+FLG_BASS = 0x04
+
+def checksum(buf, n):
+    s = 0
+    for i in range(n):
+        s += buf[i]
+    return s & 0xff
+
+class StateJournal:
+
+    """ Last station, volume and flags in a flash journal
+
+    arguments:
+    path                    - journal file
+    debounce_ms             - quiet time before a changed state is written
+    max_records             - records in the file before it is compacted
+
+    """
+
+    def __init__(self, path=STATE_FILE, debounce_ms=3000, max_records=64):
+        self.path = path
+        self.debounce_ms = debounce_ms
+        self.max_records = max_records
+        self.buf = bytearray(RECORD_SIZE)
+        self.seq = 0
+        self.records = 0                    # records in the file
+        self.khz = 0
+        self.volume = 0
+        self.flags = 0
+        self.preset = -1
+        self.written = None                 # (khz, volume, flags, preset) of the last record
+        self.dirty = False
+        self.changed_ms = 0
+        self.writes = 0
+        self.compactions = 0
+        self.load()
+
+    def load(self):
+
+        """ Take the last valid record of the journal, returns True if there was one """
+
+        buf = self.buf
+        found = False
+        for path in (self.path, self.path + '.tmp'):
+            self.records = 0
+            try:
+                with open(path, 'rb') as f:
+                    n = f.readinto(buf)
+                    while n == RECORD_SIZE:
+                        self.records += 1
+                        if buf[0] == RECORD_MAGIC and buf[RECORD_SIZE - 1] == checksum(buf, RECORD_SIZE - 1):
+                            magic, self.seq, self.khz, self.volume, self.flags, self.preset, check = struct.unpack(RECORD, buf)
+                            found = True
+                        n = f.readinto(buf)
+                    if n:
+                        self.records = self.max_records     # torn tail, compact on the next write
+            except OSError:
+                continue
+            if found:
+                if path != self.path:
+                    os.rename(path, self.path)    # compaction was cut off before the rename
+                break
+        if found:
+            self.written = (self.khz, self.volume, self.flags, self.preset)
+        return found
+
+    def restore(self, profile):
+
+        """ Put the saved volume and flags into a RadioProfile, returns the saved kHz or None """
+
+        if self.written is None:
+            return None
+        profile.volume = self.volume
+        profile.mute = (self.flags & FLG_MUTE) != 0
+        profile.mono = (self.flags & FLG_MONO) != 0
+        profile.bass = (self.flags & FLG_BASS) != 0
+        return self.khz
+
+    def note(self, khz, volume, mute, mono, bass, preset):
+
+        """ Take the current state, written by poll() once it has been quiet for debounce_ms """
+
+        flags = (FLG_MUTE if mute else 0) | (FLG_MONO if mono else 0) | (FLG_BASS if bass else 0)
+        if khz == self.khz and volume == self.volume and flags == self.flags and preset == self.preset:
+            return
+        self.khz = khz
+        self.volume = volume
+        self.flags = flags
+        self.preset = preset
+        self.dirty = True
+        self.changed_ms = time.ticks_ms()
+
+    def poll(self):
+
+        """ Write the state if it changed and has been quiet long enough, returns True if written """
+
+        if not self.dirty or time.ticks_diff(time.ticks_ms(), self.changed_ms) < self.debounce_ms:
+            return False
+        return self.flush()
+
+    def flush(self):
+
+        """ Write the state now if it differs from the last record """
+
+        self.dirty = False
+        state = (self.khz, self.volume, self.flags, self.preset)
+        if state == self.written:
+            return False
+        self.seq = (self.seq + 1) & 0xff
+        struct.pack_into(RECORD, self.buf, 0, RECORD_MAGIC, self.seq, self.khz, self.volume, self.flags, self.preset, 0)
+        self.buf[RECORD_SIZE - 1] = checksum(self.buf, RECORD_SIZE - 1)
+        if self.records >= self.max_records:
+            tmp = self.path + '.tmp'
+            with open(tmp, 'wb') as f:
+                f.write(self.buf)
+            os.rename(tmp, self.path)
+            self.records = 1
+            self.compactions += 1
+        else:
+            with open(self.path, 'ab') as f:
+                f.write(self.buf)
+            self.records += 1
+        self.written = state
+        self.writes += 1
+        return True
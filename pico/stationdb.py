@@ -0,0 +1,105 @@
+#
+# Station presets keyed by integer channel number
+#
+# Copyright (c) 2025 ha864git
+#
+# License: MIT
+#
+# stations.json is the one preset file shared by the Pico, the Pico W and the
+# WebBLE page (which fetches it or receives it over BLE):
+#
+#   {"version": 1, "default_region": "kanto",
+#    "regions": {"kanto": {"band": 2, "space": 0,
+#                          "stations": [[76400, "RADIO BERRY", "RADIO BERRY"], ...]}}}
+#
+# Each station is [frequency_kHz, OLED name (ASCII), WebBLE label (UTF-8)].
+#
+import json
+
+import radioRDA5807
+
+STATIONS_FILE = 'stations.json'
+STATIONS_VERSION = 1
+
+class StationDB:
+
+    """ Presets of one region, looked up by channel number
+
+    arguments:
+    path                    - stations.json
+    region                  - region name, None = default_region of the file
+
+    """
+
+    def __init__(self, path=STATIONS_FILE, region=None):
+        with open(path) as f:
+            self.data = json.load(f)
+        if self.data.get('version') != STATIONS_VERSION:
+            raise ValueError('stations.json version')
+        self.select_region(region if region is not None else self.data['default_region'])
+
+    def regions(self):
+        return list(self.data['regions'])
+
+    def select_region(self, region):
+
+        """ Switch to the presets of region and rebuild the channel tables """
+
+        r = self.data['regions'][region]
+        self.region = region
+        self.band = r['band']
+        self.space = r['space']
+        presets = sorted(r['stations'])
+        self.khz = [p[0] for p in presets]
+        self.labels = [p[2] for p in presets]
+        self.channels = [radioRDA5807.khz_to_channel(p[0], self.band, self.space) for p in presets]
+        self.names = {}                     # channel -> OLED name
+        self.positions = {}                 # channel -> preset position
+        for i in range(len(presets)):
+            self.names[self.channels[i]] = presets[i][1]
+            self.positions[self.channels[i]] = i
+
+    def __len__(self):
+        return len(self.channels)
+
+    def name(self, chan, default="------"):
+
+        """ OLED name of the preset on chan """
+
+        return self.names.get(chan, default)
+
+    def position(self, chan):
+
+        """ Preset position of chan, -1 if chan is not a preset """
+
+        return self.positions.get(chan, -1)
+
+    def next(self, chan):
+
+        """ Channel of the next preset above chan (wraps to the lowest), chan if there are no presets """
+
+        channels = self.channels
+        if not channels:
+            return chan
+        pos = self.positions.get(chan)
+        if pos is not None:
+            return channels[(pos + 1) % len(channels)]
+        for c in channels:
+            if c > chan:
+                return c
+        return channels[0]
+
+    def prev(self, chan):
+
+        """ Channel of the next preset below chan (wraps to the highest), chan if there are no presets """
+
+        channels = self.channels
+        if not channels:
+            return chan
+        pos = self.positions.get(chan)
+        if pos is not None:
+            return channels[pos - 1]
+        for i in range(len(channels) - 1, -1, -1):
+            if channels[i] < chan:
+                return channels[i]
+        return channels[-1]
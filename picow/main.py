@@ -1,73 +1,66 @@
-import bluetooth
-from ble_simple_peripheral import BLESimplePeripheral
+import bootlog
+# boot milestones in ticks_ms, printed when the app starts and sent by the 'boot' command
+boot = bootlog.BootLog()
+
 import radioRDA5807
-import swf
-import ssd1306
+from radioRDA5807b import radioRDA5807b
+import stationdb
+import statejournal
+import i2cbus
 
+import machine
 from machine import Pin, I2C
-import time
-
-class radioRDA5807b(radioRDA5807.RadioRDA5807):
-    def __init__(self, i2c):
-        super().__init__(i2c)
-    def get_status(self):
-        conf = self.read_reg(radioRDA5807.RDA5807M_REG_CONFIG)
-        mute = 'mute' if (conf & radioRDA5807.RDA5807M_REG_CONFIG_FLG_DMUTE) == 0 else 'unmute'
-        bass = 'bass' if (conf & radioRDA5807.RDA5807M_REG_CONFIG_FLG_BASS) != 0 else 'nobass'
-        out_mono = 'out_mono' if (conf & radioRDA5807.RDA5807M_REG_CONFIG_FLG_MONO) != 0 else 'out_stereo'
-        data = self.read_reg(radioRDA5807.RDA5807M_REG_STATUS)
-        frequency = self.start_frequency_MHz + ((data & radioRDA5807.RDA5807M_REG_STATUS_MASK_READCHAN) * self.frequency_spacing_MHz)
-        stereo = 'stereo' if (data & radioRDA5807.RDA5807M_REG_STATUS_FLG_ST) != 0 else 'mono'
-        rssi = self.read_reg(radioRDA5807.RDA5807M_REG_RSSI) >> 9
-        volume = self.get_volume()
-        return frequency, stereo, rssi, volume, mute, bass, out_mono
-
-stations = [
-    [76.4,"RADIO BERRY"],
-    [79.5,"NACK5"],
-    [78.0,"bayfm"],
-    [80.0,"TOKYO FM"],
-    [80.3,"NHK FM UTUNOMIYA"],
-    [80.7,"NHK FM CHIBA"],
-    [81.3,"J-WAVE"],
-    [81.6,"NHK FM GUNMA"],
-    [81.9,"NHK FM KANAGAWA"],
-    [82.5,"NHK FM TOKYO"],
-    [83.0,"FM-Fuji"],
-    [83.2,"NHK FM IBARAKI"],
-    [84.7,"Fm yokohama"],
-    [85.1,"NHK FM SAITAMA"],
-    [85.6,"NHK FM YAMANASHI"],
-    [86.3,"FM GUNMA"],
-    [89.7,"Inter FM"],
-    [90.5,"TBS RADIO"],
-    [90.9,"YAMANASHI HOUSOU"],
-    [91.6,"BUNKA HOUSOU"],
-    [92.4,"R-F-RADIO NIPPON"],
-    [93.0,"NIPPON HOUSOU"],
-    [94.1,"TOCHIGI HOUSOU"],
-    [94.6,"LuckyFM IBARAKI"]
-]
 
-ble = bluetooth.BLE()
-p = BLESimplePeripheral(ble)
+# True: the radio engine owns the bus on core 1, the UI and BLE on core 0 never wait for I2C
+DUAL_CORE = False
 
-led = machine.Pin("LED", machine.Pin.OUT)
+OLED_ADDRESS = 0x3C
 
 # setup the I2C communication
 i2c = I2C(0, sda=Pin(4), scl=Pin(5))
+# the tuner and the OLED share the bus: tuner writes first, frame data in chunks, volume ramps combined
+bus = i2cbus.BusManager(i2c)
+
+# station presets shared with the WebBLE page (stations.json)
+stations = stationdb.StationDB(stationdb.STATIONS_FILE)
 
-# Set up the OLED display (128x64 pixels) on the I2C bus
+# initialize RDA5807 with the boot profile in one burst write
+profile = radioRDA5807.RadioProfile(
+    band=stations.band,         # band and spacing of the preset region
+    space=stations.space,
+    volume=3,                   # volume(0 - 15)
+    mono=True,                  # force mono
+    bass=True,                  # enable bass boost
+    rds=True)                   # enable RDS/RBDS
+# last station, volume and flags: restored into the profile, tuned in the same burst
+journal = statejournal.StateJournal(statejournal.STATE_FILE)
+khz = journal.restore(profile)
+if khz is None and len(stations):
+    khz = stations.khz[0]       # first boot: the first preset
+if DUAL_CORE:
+    import radioengine
+    engine = radioengine.RadioEngine(bus)
+    engine.start()
+    radio_i2c = engine.i2c()
+else:
+    radio_i2c = bus.client(i2cbus.PRIO_TUNER, defer=True, pulse=radioRDA5807.is_pulse_write)
+radio = radioRDA5807b(radio_i2c, profile=profile, khz=khz)
+
+boot.mark('audio' if radio.address_found else 'no radio')
+
+# Set up the OLED display (128x64 pixels) on the I2C bus, after the radio is playing
 # SSD1306_I2C is a subclass of FrameBuffer. FrameBuffer provides support for graphics primitives.
 # http://docs.micropython.org/en/latest/pyboard/library/framebuf.html
-oled = ssd1306.SSD1306_I2C(128, 64, i2c)
+import ssd1306
+oled_i2c = bus.client(i2cbus.PRIO_DISPLAY, defer=True, chunk=128)
+if not radioRDA5807.probe(oled_i2c, OLED_ADDRESS):
+    print("OLED not found")
+oled = ssd1306.SSD1306_I2C(128, 64, oled_i2c)
 
 # Clear the display by filling it with black
 oled.fill(0)
 oled.show()
-
-# initialize RDA5807
-radio = radioRDA5807b(i2c)
+boot.mark('oled')
 
 # RDA5807 check
 if not radio.address_found:
@@ -76,175 +69,190 @@ if not radio.address_found:
         oled.text("Check the power", 0, 0)
         oled.text("switch.", 0, 16)
         oled.show()
+        bus.flush()
+
+# BLE and the rest are not needed for audio
+import bluetooth
+from ble_simple_peripheral import BLESimplePeripheral
+import bandscan
+import button
+import radioapp
+import rds
+import siglog
+import sigmon
 
-radio.set_volume(3)             # volume(0 - 15)
-radio.mono(True)                # force mono
-out_mono = True
-radio.bass_boost(True)          # enable bass boost
+ble = bluetooth.BLE()
+p = BLESimplePeripheral(ble)
+boot.mark('ble')
+
+led = machine.Pin("LED", machine.Pin.OUT)
+
+buttons = button.ButtonDriver()
+volume_up = buttons.add(21, repeat=True)    # button volume up      --> GP21 (hold to ramp)
+volume_down = buttons.add(20, repeat=True)  # button volume down    --> GP20 (hold to ramp)
+seek_station = buttons.add(19)              # button seek station   --> GP19
+select_station = buttons.add(18)            # button select station --> GP18 
+
+commands = [
+    (volume_up, radioapp.CMD_VOLUME_UP),
+    (volume_down, radioapp.CMD_VOLUME_DOWN),
+    (seek_station, radioapp.CMD_SEEK_UP),
+    (select_station, radioapp.CMD_NEXT_STATION),
+]
 
-station = 0
-radio.set_frequency_MHz(stations[station][0])
-name = stations[station][1]
-fout = radio.get_frequency_MHz()
-print(fout, name)
+# BLE text commands, executed by the ble task of the app (never in the BLE callback)
 
-vm = radio.get_volume()
-print(vm)
+def send_reg(reg):
+    p.send('reg ' + str(reg) + ' ' + '{:04X}'.format(radio.read_reg(reg)))
 
-volume_up = swf.swf(21)         # button volume up      --> GP21
-volume_down = swf.swf(20)       # button volume down    --> GP20
-seek_station = swf.swf(19)      # button seek station   --> GP19
-select_station = swf.swf(18)    # button select station --> GP18 
+def cmd_read(args):                 # read reg <reg>
+    if args[1] == 'reg':
+        p.send('read reg ' + args[2])
+        send_reg(int(args[2]))
 
-update_disp = True
-last_rssi = 0
+def cmd_write(args):                # write reg <reg> <value>
+    if args[1] == 'reg':
+        p.send('write reg ' + args[2] + ' ' + args[3])
+        reg, value = int(args[2]), int(args[3])
+        radio.write_reg(reg, value)
+        if radio.config_flags(reg, value):
+            app.update()            # mute/bass/mono changed under the app
+        send_reg(reg)
 
-def get_station_name(frequency):
-    name = "------"
-    station = -1
+def cmd_update(args):               # update reg <reg> <mask> <value>
+    if args[1] == 'reg':
+        p.send('update reg ' + args[2] + ' ' + args[3] + ' ' + args[4])
+        reg = int(args[2])
+        radio.update_reg(reg, int(args[3]), int(args[4]))
+        if radio.config_flags(reg, radio.read_reg_cached(reg)):
+            app.update()
+        send_reg(reg)
+
+def cmd_frequency(args):            # frequency <MHz>, answered when the tune is done
+    app.tune_channel(radio.khz_to_channel(radioRDA5807.parse_mhz(args[1])), send_frequency)
+
+def send_frequency(state):
+    p.send('frequency ' + radioRDA5807.format_khz(app.khz))
+
+def cmd_seek(args):                 # seek up|down
+    if args[1] not in ('up', 'down'):
+        raise ValueError(args[1])
+    if not radio.tuner.busy() or app.scanning():
+        app.start_seek(radioRDA5807.SEEK_UP if args[1] == 'up' else radioRDA5807.SEEK_DOWN)
+
+def on_off(function):
+    def command(args):              # <name> on|off
+        if args[1] == 'on':
+            function(True)
+        elif args[1] == 'off':
+            function(False)
+        app.update()
+    return command
+
+def cmd_volume(args):               # volume up|down|<0-15>
+    if args[1] == 'up':
+        app.set_volume(app.vm + 1)
+    elif args[1] == 'down':
+        app.set_volume(app.vm - 1)
+    else:
+        app.set_volume(int(args[1]))
+    p.send('volume ' + str(app.vm))
+
+def cmd_status(args):
+    p.send(app.status_message())
+
+def cmd_stations(args):
+    # the WebBLE page takes its preset buttons from the device
     for i in range(len(stations)):
-        if frequency == stations[i][0]:
-            name = stations[i][1]
-            station = i
-            break
-    return name, station
-
-def on_rx(data):
-    global vm, update_disp, fout, name, station
-    cmd = data.decode('utf-8').replace('\n','')
-    print(cmd)
-    args = cmd.split(' ')
-
-    if len(args) == 3:
-        if args[0] == 'read':
-            if args[1] == 'reg':
-                p.send('read reg ' + args[2])
-                data = radio.read_reg(int(args[2]))
-                p.send('reg ' + args[2] + ' ' + '{:04X}'.format(data))
-    elif len(args) == 4:
-        if args[0] == 'write':
-            if args[1] == 'reg':
-                p.send('write reg ' + args[2] + ' ' + args[3])
-                radio.write_reg(int(args[2]), int(args[3]))
-                data = radio.read_reg(int(args[2]))
-                p.send('reg ' + args[2] + ' ' + '{:04X}'.format(data))
-    elif len(args) == 5:
-        if args[0] == 'update':
-            if args[1] == 'reg':
-                p.send('update reg ' + args[2] + ' ' + args[3] + ' ' + args[4])
-                radio.update_reg(int(args[2]), int(args[3]), int(args[4]))
-                data = radio.read_reg(int(args[2]))
-                p.send('reg ' + args[2] + ' ' + '{:04X}'.format(data))                                   
-    elif len(args) == 2:
-        if args[0] == 'frequency':
-            radio.set_frequency_MHz(float(args[1]))
-            name = '-----'
-            fout = radio.get_frequency_MHz()
-            p.send('frequency ' + '{:.01f}'.format(fout))
-            name, station = get_station_name(fout)
-        elif args[0] == 'seek':
-            if args[1] == 'up':
-                radio.seek_up()
-            elif args[1] == 'down':
-                radio.seek_down()
-            fout = radio.get_frequency_MHz()
-            p.send('frequency ' + '{:.01f}'.format(fout))
-            name, station = get_station_name(fout)
-        elif args[0] == 'mute':
-            if args[1] == 'on':
-                radio.mute(True)
-            elif args[1] == 'off':
-                radio.mute(False)
-        elif args[0] == 'mono':
-            if args[1] == 'on':
-                radio.mono(True)
-            elif args[1] == 'off':
-                radio.mono(False)
-        elif args[0] == 'bass':
-            if args[1] == 'on':
-                radio.bass_boost(True)
-            elif args[1] == 'off':
-                radio.bass_boost(False)
-        elif args[0] == 'volume':
-            vm = radio.get_volume()
-            if args[1] == 'up':
-                if vm < 15:
-                    vm += 1
-                    radio.set_volume(vm)
-            elif args[1] == 'down':
-                if vm > 0:
-                    vm -= 1
-                    radio.set_volume(vm)
-            else:
-                vm = int(args[1])
-                radio.set_volume(vm)
-            update_disp = True
-            p.send('volume ' + str(vm))
-    elif len(args) == 1:
-        if args[0] == 'status':
-            frequency, stereo, rssi, volume, mute, bass, out_mono = radio.get_status()
-            p.send('status ' + '{:.01f}'.format(frequency) + ' ' + stereo + ' ' + str(rssi) + ' ' + str(volume) + ' ' + mute + ' ' + bass+ ' ' + out_mono)
+        p.send('station ' + str(stations.khz[i]) + ' ' + stations.labels[i])
+    p.send('stations ' + str(len(stations)))
+
+def cmd_stats(args):                # register counts, latency histograms and tune/seek polls
+    if radio.profiler is None:
+        p.send('stats off')
     else:
-            p.send('?')
-                   
-p.on_write(on_rx)
-
-while True:
-
-    if volume_up.is_on_edge():
-        if vm < 15:
-            vm += 1
-            radio.set_volume(vm)
-            vm = radio.get_volume()
-            print(vm)
-            update_disp = True
-
-    if volume_down.is_on_edge():
-        if vm > 0:
-            vm -= 1
-            radio.set_volume(vm)
-            vm = radio.get_volume()
-            print(vm)
-            update_disp = True
-
-    if seek_station.is_on_edge():
-        oled.fill(0)
-        oled.text("-- seek up --", 0, 0)
-        oled.show()
-        radio.seek_up()
-        fout = radio.get_frequency_MHz()
-        name, station = get_station_name(fout)
-        print(fout, name)
-        update_disp = True
-        
-    if select_station.is_on_edge():
-        station += 1
-        if station >= len(stations):
-            station = 0
-        radio.set_frequency_MHz(stations[station][0])
-        name = stations[station][1]
-        fout = radio.get_frequency_MHz()
-        print(fout, name)
-        update_disp = True
-
-    rssi = radio.get_signal_strength()
-    if rssi != last_rssi:
-        last_rssi = rssi
-        update_disp = True
-    
-    if update_disp:
-        oled.fill(0)
-        oled.text('RSSI:' + str(rssi), 0, 0)
-        oled.text(str(fout) + 'MHz Vol:' + str(vm), 0, 16)
-        oled.text(name, 0, 32)
-        oled.show()
-        frequency, stereo, rssi, volume, mute, bass, out_mono = radio.get_status()
-        p.send('status ' + '{:.01f}'.format(frequency) + ' ' + stereo + ' ' + str(rssi) + ' ' + str(volume) + ' ' + mute + ' ' + bass + ' ' + out_mono)
-        update_disp = False
+        radio.profiler.report(p.send)
 
-    if p.is_connected():
-        led.on()
+def cmd_trace(args):                # the last register transactions
+    if radio.profiler is None:
+        p.send('trace off')
     else:
-        led.off()
+        radio.profiler.trace(p.send)
+
+def cmd_profile(args):              # profile on|off|clear
+    if args[1] == 'on':
+        radio.enable_profiling()
+    elif args[1] == 'off':
+        radio.disable_profiling()
+    elif args[1] == 'clear' and radio.profiler is not None:
+        radio.profiler.clear()
+    p.send('profile ' + ('on' if radio.profiler is not None else 'off'))
+
+def cmd_bus(args):                  # queued writes, high water, transactions, chunks, combined writes
+    p.send('bus ' + bus.stats())
+
+def cmd_history(args):              # RSSI history, oldest first, bit7 = stereo
+    n = monitor.history(history_buf)
+    for i in range(0, n, 16):
+        p.send('history {} '.format(i) + ''.join('{:02x}'.format(v) for v in history_buf[i:min(i + 16, n)]))
+    p.send('history end')
+
+def cmd_log(args):                  # log <first>: signal log records from serial first, resume at 'log next'
+    signal_log.export(p.send, int(args[1]))
+
+def cmd_boot(args):                 # boot milestones: ms since reset, ms since main.py started
+    boot.report(p.send)
+
+def cmd_flash(args):                # flash writes of the flash task, longest write in us
+    p.send('flash {} {}'.format(app.flash_writes, app.flash_max_us))
+
+def cmd_queue(args):                # queue depth, high water, drops and coalesced commands
+    p.send('queue ' + app.ble_rx_queue.stats())
+
+# name: (function, number of arguments, a newer queued command replaces an older one)
+ble_commands = {
+    'read': (cmd_read, 2, False),
+    'write': (cmd_write, 3, False),
+    'update': (cmd_update, 4, False),
+    'frequency': (cmd_frequency, 1, True),
+    'seek': (cmd_seek, 1, False),
+    'mute': (on_off(radio.mute), 1, True),
+    'mono': (on_off(radio.mono), 1, True),
+    'bass': (on_off(radio.bass_boost), 1, True),
+    'volume': (cmd_volume, 1, True),
+    'status': (cmd_status, 0, False),
+    'stations': (cmd_stations, 0, False),
+    'queue': (cmd_queue, 0, False),
+    'flash': (cmd_flash, 0, False),
+    'boot': (cmd_boot, 0, False),
+    'log': (cmd_log, 1, False),
+    'history': (cmd_history, 0, False),
+    'bus': (cmd_bus, 0, False),
+    'stats': (cmd_stats, 0, False),
+    'trace': (cmd_trace, 0, False),
+    'profile': (cmd_profile, 1, False),
+}
+
+# channel-quality index, refreshed by idle rescans while muted
+index = bandscan.ChannelIndex.load(bandscan.INDEX_FILE, profile.band, profile.space)
+scanner = bandscan.BandScanner(radio, index)
+# seek button jumps to the next known station, learned from every tune and seek
+navigator = bandscan.StationNavigator(radio, index)
+# RDS groups, the PS name is shown for stations without a preset
+# (read at PRIO_RDS: after the queued tuner writes, never behind OLED frame chunks;
+# with the engine the status mailbox serves them)
+rds_poller = rds.RDSPoller(radio, rds.RDSDecoder(), i2c=None if DUAL_CORE else bus.client(i2cbus.PRIO_RDS))
+# smoothed RSSI sampled fast after a tune and slower when stable, with the sparkline history
+monitor = sigmon.SignalMonitor(radio)
+# channel, RSSI, stereo and FM_TRUE every 5 s into a 16 KB ring file, from the monitor samples
+signal_log = siglog.SignalLog(siglog.LOG_FILE, profile.band, profile.space)
+history_buf = bytearray(monitor.history_size)
 
-    time.sleep(0.1)
\ No newline at end of file
+app = radioapp.RadioApp(radio, oled, commands, stations, ble=p, ble_commands=ble_commands, led=led,
+                        button_driver=buttons, scanner=scanner,
+                        navigator=navigator, rds_poller=rds_poller, monitor=monitor,
+                        bus=None if DUAL_CORE else bus, journal=journal,
+                        signal_log=signal_log)
+boot.mark('app')
+boot.report()
+app.run()
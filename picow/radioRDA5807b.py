@@ -0,0 +1,23 @@
+#
+# RadioRDA5807 with the status report of the BLE text protocol
+#
+# Copyright (c) 2025 ha864git
+#
+# License: MIT
+#
+import radioRDA5807
+
+class radioRDA5807b(radioRDA5807.RadioRDA5807):
+    def __init__(self, i2c, profile=radioRDA5807.PROFILE_JAPAN_WIDE, khz=None):
+        super().__init__(i2c, profile=profile, khz=khz)
+    def get_status(self):
+        conf = self.read_reg_cached(radioRDA5807.RDA5807M_REG_CONFIG)
+        mute = 'mute' if (conf & radioRDA5807.RDA5807M_REG_CONFIG_FLG_DMUTE) == 0 else 'unmute'
+        bass = 'bass' if (conf & radioRDA5807.RDA5807M_REG_CONFIG_FLG_BASS) != 0 else 'nobass'
+        out_mono = 'out_mono' if (conf & radioRDA5807.RDA5807M_REG_CONFIG_FLG_MONO) != 0 else 'out_stereo'
+        st = self.read_status_block()
+        khz = st.khz
+        stereo = 'stereo' if st.stereo else 'mono'
+        rssi = st.rssi
+        volume = self.get_volume()
+        return khz, stereo, rssi, volume, mute, bass, out_mono
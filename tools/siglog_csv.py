@@ -0,0 +1,93 @@
+#
+# Signal-quality log to CSV, on the host
+#
+# Copyright (c) 2025 ha864git
+#
+# License: MIT
+#
+# Reads the ring file of pico/siglog.py (copied from the flash, e.g.
+# mpremote cp :siglog.bin .) or a text capture of its export ('log ...' lines
+# from the BLE 'log' command or signal_log.export(print) on the serial console,
+# other lines are skipped) and writes one CSV row per record, oldest first.
+# Records seen twice (overlapping resumed exports) are written once.
+#
+# The device has no clock that knows the date: the time of a record is the
+# boot it was taken in (a counter, mod 256) and the seconds since that boot.
+#
+#   python tools/siglog_csv.py siglog.bin > survey.csv
+#   python tools/siglog_csv.py capture.txt -o survey.csv
+#
+import argparse
+import csv
+import os
+import struct
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'pico'))
+
+import radioRDA5807
+import siglog
+
+def block_records(data):
+
+    """ (serial, record bytes, band, space) of every valid block of a ring file """
+
+    for offset in range(0, len(data) - siglog.BLOCK_SIZE + 1, siglog.BLOCK_SIZE):
+        magic, count, band_space, first = struct.unpack_from(siglog.BLOCK_HEADER, data, offset)
+        if magic != siglog.BLOCK_MAGIC or not 0 < count <= siglog.BLOCK_RECORDS:
+            continue
+        for i in range(count):
+            start = offset + siglog.HEADER_SIZE + i * siglog.RECORD_SIZE
+            yield first + i, data[start:start + siglog.RECORD_SIZE], band_space >> 2, band_space & 3
+
+def text_records(text, band, space):
+
+    """ (serial, record bytes, band, space) of the 'log' lines of an export capture """
+
+    pending = []
+    for line in text.splitlines():
+        words = line[line.find('log '):].split() if 'log ' in line else []
+        if len(words) == 6 and words[1] == 'next':
+            band, space = int(words[4]), int(words[5])
+        elif len(words) == 3 and words[1].isdigit():
+            data = bytes.fromhex(words[2])
+            for i in range(len(data) // siglog.RECORD_SIZE):
+                pending.append((int(words[1]) + i, data[i * siglog.RECORD_SIZE:(i + 1) * siglog.RECORD_SIZE]))
+    # band and space come with the 'log next' line at the end of each chunk
+    for serial, record in pending:
+        yield serial, record, band, space
+
+def main():
+    parser = argparse.ArgumentParser(description='Decode a signal-quality log (ring file or text export) to CSV')
+    parser.add_argument('input', help='siglog.bin or a capture of log lines')
+    parser.add_argument('-o', '--output', help='CSV file (default stdout)')
+    parser.add_argument('--band', type=int, default=radioRDA5807.BAND_WIDE, help='band of a capture without a "log next" line')
+    parser.add_argument('--space', type=int, default=radioRDA5807.SPACE_100K, help='spacing of a capture without a "log next" line')
+    args = parser.parse_args()
+
+    with open(args.input, 'rb') as f:
+        data = f.read()
+    if len(data) >= 2 and struct.unpack_from('>H', data)[0] == siglog.BLOCK_MAGIC:
+        records = block_records(data)
+    else:
+        records = text_records(data.decode('utf-8', 'replace'), args.band, args.space)
+    rows = {}
+    for serial, record, band, space in records:
+        t, chan, rssi, flags = struct.unpack(siglog.RECORD, record)
+        khz = radioRDA5807.BAND_START_KHZ[band] + chan * radioRDA5807.SPACE_KHZ[space]
+        rows[serial] = (serial, t >> siglog.BOOT_SHIFT, t & siglog.UPTIME_MAX, chan, radioRDA5807.format_khz(khz), rssi,
+                        1 if flags & siglog.FLG_STEREO else 0, 1 if flags & siglog.FLG_FMTRUE else 0)
+
+    out = open(args.output, 'w', newline='') if args.output else sys.stdout
+    try:
+        writer = csv.writer(out)
+        writer.writerow(('serial', 'boot', 'uptime_s', 'channel', 'mhz', 'rssi', 'stereo', 'fm_true'))
+        for serial in sorted(rows):
+            writer.writerow(rows[serial])
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())